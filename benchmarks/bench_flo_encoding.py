@@ -0,0 +1,108 @@
+"""
+    Compare disk size and read throughput of flow storage formats:
+    plain .flo files against compact .floq files (float16/int16, with or
+    without zlib) and packed .flopack sequences.
+    Usage: python3 benchmarks/bench_flo_encoding.py [--width W] [--height H] [--frames N]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import flowvid as fv
+
+
+def synthetic_flow(n, h, w, seed=0):
+    """ Smooth flow fields with some noise, similar to real estimations """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w] / max(h, w)
+    for i in range(n):
+        phase = rng.uniform(0, 2 * np.pi)
+        u = 20 * np.sin(3 * x + phase) + 5 * y
+        v = 15 * np.cos(2 * y + phase) - 3 * x
+        flow = np.stack((u, v), axis=2) + rng.normal(scale=0.05, size=(h, w, 2))
+        yield flow.astype(np.float32)
+
+
+def dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def read_all(path, mmap):
+    """ :returns: (seconds, frames) to read and decode all frames (best of 3) """
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        frames = 0
+        for flow in fv.input.flo(path, mmap=mmap):
+            flow.sum()  # touch the data, so mmap actually reads it
+            frames += 1
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flow storage formats benchmark')
+    parser.add_argument('--width', type=int, default=1024)
+    parser.add_argument('--height', type=int, default=436)
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--max-error', type=float, default=0.01,
+                        help='Maximum error in pixels for lossy encodings')
+    args = parser.parse_args()
+
+    frames = list(synthetic_flow(args.frames, args.height, args.width))
+    raw_mb = sum(f.nbytes for f in frames) / 1e6
+    tmp = tempfile.mkdtemp(prefix='flowvid_bench_')
+
+    # (name, output kwargs for fv.output.flo or None for .flopack, mmap)
+    variants = [('flo', dict(), False),
+                ('flo (mmap)', dict(), True),
+                ('floq float16', dict(encoding='float16'), False),
+                ('floq float16+zlib', dict(encoding='float16', compression='zlib'), False),
+                ('floq int16', dict(encoding='int16'), False),
+                ('floq int16+zlib', dict(encoding='int16', compression='zlib'), False),
+                ('flopack float32', None, True),
+                ('flopack int16+zlib', None, False)]
+
+    print('{n} frames of {w}x{h} ({mb:.1f} MB as float32)\n'.format(
+        n=args.frames, w=args.width, h=args.height, mb=raw_mb))
+    print('{:<20} {:>10} {:>8} {:>10} {:>10} {:>12}'.format(
+        'format', 'disk MB', 'ratio', 'frames/s', 'MB/s', 'max error'))
+    try:
+        for name, kwargs, mmap in variants:
+            path = os.path.join(tmp, name.replace(' ', '_').replace('+', '_'))
+            if kwargs is None:
+                path += '.flopack'
+                lossy = 'int16' in name
+                with fv.output.flo_pack(path, compression='zlib' if lossy else None,
+                                        encoding='int16' if lossy else 'float32',
+                                        max_error=args.max_error if lossy else None) as out:
+                    for flow in frames:
+                        out.save_file(flow)
+            else:
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+                    if 'encoding' in kwargs:
+                        kwargs['max_error'] = args.max_error
+                    out = fv.output.flo(path, **kwargs)
+                    for flow in frames:
+                        out.save_file(flow)
+
+            elapsed, n = read_all(path, mmap)
+            error = max(np.abs(a - b).max()
+                        for a, b in zip(frames, fv.input.flo(path)))
+            size_mb = dir_size(path) / 1e6
+            print('{:<20} {:>10.1f} {:>8.2f} {:>10.1f} {:>10.1f} {:>12.5f}'.format(
+                name, size_mb, raw_mb / size_mb, n / elapsed, raw_mb / elapsed, error))
+    finally:
+        shutil.rmtree(tmp)
+    print('\nFiles are read from a warm page cache, so frames/s measures decoding cost.\n'
+          'When reading from disk or network storage, read time grows with disk MB.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+    Compare image decoding throughput of fv.input.rgb(...): serial decoding,
+    decoding in threads (prefetch/workers) and decoding in worker processes
+    that return frames through shared memory (processes).
+    Each input is iterated several times: the first iteration also starts the
+    worker processes, which the next ones reuse (e.g. normalize_video passes)
+    Usage: python3 benchmarks/bench_rgb_decoding.py [--width W] [--height H] [--frames N] [--processes P]
+                                                    [--repeats R]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import imageio
+import flowvid as fv
+
+
+def synthetic_images(n, h, w, seed=0):
+    """ Gradients with some noise, so PNG compression is similar to real frames """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w] / max(h, w)
+    for i in range(n):
+        phase = rng.uniform(0, 2 * np.pi)
+        image = np.stack((np.sin(8 * x + phase), np.cos(6 * y + phase), np.sin(4 * (x + y))), axis=2)
+        image = 127.5 + 100 * image + rng.normal(scale=8, size=(h, w, 3))
+        yield np.clip(image, 0, 255).astype(np.uint8)
+
+
+def read_all(path, repeats, **kwargs):
+    """
+        Iterate over the same input repeats times
+        :returns: (seconds of the first iteration, best seconds of the next ones, frames)
+    """
+    times = []
+    with fv.input.rgb(path, **kwargs) as images:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            frames = 0
+            for image in images:
+                image.sum()  # something to do with each frame
+                frames += 1
+            times.append(time.perf_counter() - start)
+    return times[0], min(times[1:], default=times[0]), frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RGB decoding benchmark')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--frames', type=int, default=40)
+    parser.add_argument('--processes', type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    parser.add_argument('--repeats', type=int, default=4, help='Iterations over each input')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='flowvid_bench_')
+    p = args.processes
+    # (name, fv.input.rgb kwargs)
+    variants = [('serial', dict()),
+                ('threads x{p}'.format(p=p), dict(prefetch=2 * p, workers=p)),
+                ('processes x{p}'.format(p=p), dict(processes=p))]
+
+    try:
+        for i, image in enumerate(synthetic_images(args.frames, args.height, args.width)):
+            imageio.imwrite(os.path.join(tmp, '{:04}.png'.format(i)), image)
+        mb = args.frames * args.width * args.height * 3 / 1e6
+        print('{n} PNG images of {w}x{h} ({mb:.1f} MB decoded), {c} CPUs\n'.format(
+            n=args.frames, w=args.width, h=args.height, mb=mb, c=os.cpu_count()))
+        # first: iteration that starts the input, repeated: best of the next ones
+        print('{:<16} {:>14} {:>14} {:>10} {:>10}'.format(
+            'variant', 'first frames/s', 'repeated f/s', 'MB/s', 'speedup'))
+        serial = None
+        for name, kwargs in variants:
+            [first, elapsed, n] = read_all(tmp, args.repeats, **kwargs)
+            serial = elapsed if serial is None else serial
+            print('{:<16} {:>14.1f} {:>14.1f} {:>10.1f} {:>10.2f}'.format(
+                name, n / first, n / elapsed, mb / elapsed, serial / elapsed))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from .input import *  # make this syntax possible: fv.input.flo(...)
 from .output import *  # make this syntax possible: fv.output.video(...)
 from . import core  # make this syntax possible: fv.normalize_frame(...)
+from . import datasets  # make this syntax possible: fv.datasets.sintel(...)
 from .core import *
 
 __version__ = '0.4.1'
\ No newline at end of file
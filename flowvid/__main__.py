@@ -10,6 +10,8 @@ from .presets.preset_plot_epe import preset_plot_epe
 from .presets.preset_track_points import preset_track_points
 from .presets.preset_track_side_by_side import preset_track_side_by_side
 from .presets.utils import load_config, save_config
+from .commands.pack import command_pack
+from .commands.merge import command_merge
 
 DEBUG = 0  # debug levels (0: no debug, 1: extended traceback on exception, 2: profiling)
 
@@ -24,9 +26,19 @@ description = textwrap.dedent(
     * plot_epe: Generate a pyplot plot with the EPE distribution in all frames
     * track_points: Place points in a image and see how flow moves them
     * track_side_by_side: Place points in a image and see how flow can track them
+
+    Other commands (use python3 -m flowvid <command> -h for their options):
+    * pack: Pack directories of .flo files into single .flopack files
+    * merge: Merge the segments of a video rendered in shards (see --shard)
     '''
 )
 
+# commands other than presets have their own arguments
+commands = {'pack': command_pack, 'merge': command_merge}
+if len(sys.argv) > 1 and sys.argv[1] in commands:
+    commands[sys.argv[1]](sys.argv[2:])
+    exit(0)
+
 parser = argparse.ArgumentParser(prog='flowvid',
                                  formatter_class=argparse.RawDescriptionHelpFormatter,
                                  description=description)
@@ -47,6 +59,9 @@ group_input.add_argument('--flo-gt-dir', type=str, required=False, metavar='<pat
 
 group_input.add_argument('--image-dir', type=str, required=False, metavar='<path/to/image/dir>',
                          help='Directory to look for image files')
+group_input.add_argument('--proxy', type=float, required=False, metavar='(0.0..1.0]',
+                         help='Read flow and images at this fraction of their resolution, for fast previews '
+                              '(e.g. 0.25). Not saved in the configuration, so it can be used with --config')
 
 # Core / main processing
 group_core = parser.add_argument_group('processing')
@@ -56,6 +71,9 @@ group_core.add_argument('--norm-clamp', type=float, required=False, metavar='[0.
                         help='Clamp percentage (0-1) when applying clamp-gamma curve in video normalization')
 group_core.add_argument('--norm-gamma', type=float, required=False, metavar='[0.0..]',
                         help='Gamma factor (>0) when applying clamp-gamma curve in video normalization')
+group_core.add_argument('--norm-stats', type=str, required=False, metavar='<path/to/stats.yaml>',
+                        help='File with the video\'s maximum for video normalization: read if it exists, otherwise '
+                             'computed and saved, so all shards use the same one. Not saved in the configuration')
 
 group_core.add_argument('--plot-cumulative', type=str, choices=('y', 'n'), required=False,
                         help='Use cumulative data for the given plot')
@@ -83,6 +101,10 @@ group_output.add_argument('--output-framerate', type=int, required=False, metava
                           help='Frames per second for the specified output type')
 group_output.add_argument('--output-filename', type=str, required=False, metavar='<path/to/video.mp4>',
                           help='Filename generated for video output type')
+group_output.add_argument('--shard', type=str, required=False, metavar='i/N',
+                          help='Only render the i-th of N parts of the video (i in 0..N-1), saved as '
+                               '<output-filename>.shard-i-of-N, e.g. on different machines. Then join them with '
+                               'python3 -m flowvid merge <output-filename>. Not saved in the configuration')
 
 # parsing
 args = parser.parse_args()
@@ -98,6 +120,10 @@ presets = {'color_flow': preset_color_flow,
 if video_type not in presets:
     print(description)
     exit(1)
+# points are chosen when the preset runs, so each shard would have different ones
+if args.shard is not None and video_type not in ('color_flow', 'color_epe', 'flow_arrows'):
+    print('--shard can only be used with the color_flow, color_epe and flow_arrows presets')
+    exit(1)
 
 # try to load config from file
 config = load_config(args.config)
@@ -106,6 +132,9 @@ if config is None:
     config_from_file = False
 else:
     config_from_file = True
+    config['proxy'] = args.proxy
+    config['shard'] = args.shard
+    config['norm_stats'] = args.norm_stats
 
 # execute and save
 try:
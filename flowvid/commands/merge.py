@@ -0,0 +1,82 @@
+import argparse
+import glob
+import os
+import re
+import subprocess
+import tempfile
+import imageio_ffmpeg
+
+# Segment names made by presets with --shard (see presets.utils.shard_filename)
+_shard_pattern = re.compile(r'\.shard-(\d+)-of-(\d+)$')
+
+
+def find_segments(out_path):
+    """
+        Find the segments of a video rendered in shards (out.shard-i-of-N.mp4 for out.mp4)
+        :param out_path: Final video
+        :returns: List of the segments' paths, in order
+    """
+    (root, ext) = os.path.splitext(out_path)
+    segments = {}
+    for path in glob.glob(glob.escape(root) + '.shard-*-of-*' + ext):
+        match = _shard_pattern.search(os.path.splitext(path)[0])
+        if match is not None:
+            segments[(int(match[1]), int(match[2]))] = path
+
+    counts = set(count for (_, count) in segments)
+    if not counts:
+        raise AssertionError('There are no segments of {f} ({r}.shard-i-of-N{e})'.format(
+            f=out_path, r=root, e=ext))
+    if len(counts) > 1:
+        raise AssertionError('Segments of {f} were split in different numbers of shards: {c}'.format(
+            f=out_path, c=', '.join(str(c) for c in sorted(counts))))
+    count = counts.pop()
+    missing = [str(i) for i in range(count) if (i, count) not in segments]
+    if missing:
+        raise AssertionError('Missing segments {m} of {c} for {f}'.format(
+            m=', '.join(missing), c=count, f=out_path))
+    return [segments[(i, count)] for i in range(count)]
+
+
+def merge_segments(segments, out_path):
+    """
+        Concatenate video segments into one video without encoding them again
+        (ffmpeg's concat demuxer). Segments should have the same codec, size and
+        framerate, e.g. all shards of the same preset and configuration
+        :param segments: List of video paths, in order
+        :param out_path: Video to generate
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as list_file:
+        for path in segments:
+            # quotes in paths are escaped as '\''
+            list_file.write("file '{p}'\n".format(p=os.path.abspath(path).replace("'", "'\\''")))
+    try:
+        command = [imageio_ffmpeg.get_ffmpeg_exe(), '-v', 'error', '-y', '-f', 'concat', '-safe', '0',
+                   '-i', list_file.name, '-c', 'copy', out_path]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    finally:
+        os.remove(list_file.name)
+    if result.returncode != 0:
+        raise AssertionError('Could not merge segments into {f}: {e}'.format(
+            f=out_path, e=result.stderr.decode('utf-8', errors='replace').strip()))
+
+
+def command_merge(argv):
+    parser = argparse.ArgumentParser(prog='flowvid merge',
+                                     description='Merge the segments of a video rendered in shards '
+                                                 '(python3 -m flowvid <preset> --shard i/N) into the final video, '
+                                                 'without encoding it again')
+    parser.add_argument('out', type=str, metavar='<out>',
+                        help='Final video, i.e. the --output-filename of the preset')
+    parser.add_argument('segments', type=str, nargs='*', metavar='<segment>',
+                        help='Segments to merge, in order (default: all <out>.shard-i-of-N segments)')
+    parser.add_argument('--delete', action='store_true',
+                        help='Delete the segments after merging them')
+    args = parser.parse_args(argv)
+
+    segments = args.segments or find_segments(args.out)
+    merge_segments(segments, args.out)
+    print('Merged {n} segments into {f}'.format(n=len(segments), f=args.out))
+    if args.delete:
+        for path in segments:
+            os.remove(path)
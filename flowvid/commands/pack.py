@@ -0,0 +1,67 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from ..input.flo_data import FloData
+from ..output.flo_pack_output import FloPackOutput
+
+
+def pack_directory(flo_dir, out_path, compression, level, workers, encoding=None, max_error=None):
+    """
+        Pack all .flo files from a directory into one .flopack file
+        :param flo_dir: Directory with .flo files
+        :param out_path: Packed file to generate
+        :param compression: None or 'zlib'
+        :param level: zlib compression level (0-9)
+        :param workers: Threads used to read and compress frames
+        :param encoding: float32, float16 or int16 (see fv.output.flo_pack(...))
+        :param max_error: Maximum absolute error allowed for lossy encodings
+        :returns: Number of packed frames
+    """
+    flo_data = FloData(flo_dir, extensions=('.flo', '.floq'), dir_first=0,
+                       prefetch=2 * workers, workers=workers)
+    with FloPackOutput(out_path, compression, level, encoding, max_error) as out:
+        out.save_all(flo_data, workers=workers)
+    return len(flo_data)
+
+
+def command_pack(argv):
+    parser = argparse.ArgumentParser(prog='flowvid pack',
+                                     description='Pack directories of .flo files into single .flopack files '
+                                                 '(see fv.input.flo(...) and fv.output.flo_pack(...))')
+    parser.add_argument('flo_dirs', type=str, nargs='+', metavar='<flo_dir>',
+                        help='Directory with .flo files')
+    parser.add_argument('out', type=str, metavar='<out>',
+                        help='Output .flopack file, or output directory if multiple directories are given')
+    parser.add_argument('--compression', type=str, choices=('none', 'zlib'), default='none',
+                        help='Per-frame compression (default: none)')
+    parser.add_argument('--level', type=int, default=6, metavar='[0..9]',
+                        help='zlib compression level (default: 6)')
+    parser.add_argument('--encoding', type=str, choices=('float32', 'float16', 'int16'), default='float32',
+                        help='How flow values are stored, float16 and int16 are lossy (default: float32)')
+    parser.add_argument('--max-error', type=float, default=None, metavar='<pixels>',
+                        help='Maximum absolute error allowed for lossy encodings')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, metavar='[1..]',
+                        help='Threads used to read and compress frames of each directory')
+    parser.add_argument('--jobs', type=int, default=4, metavar='[1..]',
+                        help='Directories packed in parallel when multiple are given (default: 4)')
+    args = parser.parse_args(argv)
+
+    if len(args.flo_dirs) == 1:
+        jobs = [(args.flo_dirs[0], args.out)]
+    else:
+        if not os.path.isdir(args.out):
+            raise AssertionError(
+                '{p} should be a directory when packing multiple directories.'.format(p=args.out))
+        jobs = [(flo_dir, os.path.join(args.out, os.path.basename(os.path.normpath(flo_dir)) + '.flopack'))
+                for flo_dir in args.flo_dirs]
+
+    def pack(job):
+        (flo_dir, out_path) = job
+        n = pack_directory(flo_dir, out_path, args.compression, args.level,
+                           args.workers, args.encoding, args.max_error)
+        print('Packed {n} frames from {d} into {f}'.format(
+            n=n, d=flo_dir, f=out_path))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(args.jobs, len(jobs)))) as executor:
+        # list(...) so exceptions from any job are raised here
+        list(executor.map(pack, jobs))
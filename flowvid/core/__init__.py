@@ -3,10 +3,14 @@ import numpy as np
 from typing import Union
 
 from .filterable import Filterable
+from .pipeline import Sink
+from .compiler import CompiledPipeline
+from . import pipeline
 
-from .filters.normalize_flow import NormalizeFlowFrame, NormalizeFlowVideo
-from .filters.normalize_epe import NormalizeEPEFrame, NormalizeEPEVideo
+from .filters.normalize_flow import NormalizeFlowFrame, NormalizeFlowVideo, find_max_flow
+from .filters.normalize_epe import NormalizeEPEFrame, NormalizeEPEVideo, find_max_epe
 from .filters.accum_flow import AccumFlow
+from .filters.crop import Crop
 
 from .conversion.flow_to_rgb import FlowToRGB
 from .conversion.epe_to_rgb import EPEToRGB
@@ -43,7 +47,8 @@ def normalize_frame(data):
         return data._add_filter(NormalizeEPEFrame())
 
 
-def normalize_video(data, clamp_pct: float = 1.0, gamma: float = 1.0, verbose: bool = False):
+def normalize_video(data, clamp_pct: float = 1.0, gamma: float = 1.0, verbose: bool = False,
+                    max_value: float = None):
     """
         Normalize flow/epe (so module ranges from 0..1 instead of 0..n)
         with the video's maximum. Can also apply a gamma curve with
@@ -52,15 +57,37 @@ def normalize_video(data, clamp_pct: float = 1.0, gamma: float = 1.0, verbose: b
         :param clamp_pct: Modules higher than max * clamp_pct are clamped to 1
         :param gamma: Exponential curve (module01 = module01 ** gamma)
         :param verbose: Log console messages for progress
+        :param max_value: Video's maximum, if it is already known (see fv.video_max(...)),
+                          so the whole video isn't read to find it. E.g. parts of a video
+                          rendered separately use the maximum of the whole one
         :returns: List of flow/epe data, normalized.
     """
     if not isinstance(data, Filterable):
         raise AssertionError('data should be a flow/epe data list')
     data.assert_type('flo', 'epe')
+    if max_value is not None and max_value < 0:
+        raise AssertionError('max_value should be 0 or bigger but it is {n}'.format(n=max_value))
     if data.get_type() == 'flo':
-        return data._add_filter(NormalizeFlowVideo(data, clamp_pct, gamma, verbose))
+        return data._add_filter(NormalizeFlowVideo(data, clamp_pct, gamma, verbose, max_value))
     else:
-        return data._add_filter(NormalizeEPEVideo(data, clamp_pct, gamma, verbose))
+        return data._add_filter(NormalizeEPEVideo(data, clamp_pct, gamma, verbose, max_value))
+
+
+def video_max(data, verbose: bool = False):
+    """
+        Largest flow vector module/endpoint error in all frames, which is what
+        fv.normalize_video(...) normalizes with
+        :param data: List of flo/epe data, see fv.input.flo(...) or fv.endpoint_error(...)
+        :param verbose: Log console messages for progress
+        :returns: Maximum (float)
+    """
+    if not isinstance(data, Filterable):
+        raise AssertionError('data should be a flow/epe data list')
+    data.assert_type('flo', 'epe')
+    if data.get_type() == 'flo':
+        return float(find_max_flow(data, verbose))
+    else:
+        return float(find_max_epe(data, verbose))
 
 
 def accumulate(flow, interpolate: bool = False):
@@ -79,6 +106,33 @@ def accumulate(flow, interpolate: bool = False):
     return flow._add_filter(AccumFlow(flow, interpolate))
 
 
+def crop(data, x0: int, y0: int, x1: int, y1: int):
+    """
+        Crop a region of interest of each frame, so the next steps
+        (normalization, conversions, EPE, arrows...) only process that region.
+        If data comes straight from an input (with no filters), the input only
+        reads the region (e.g. only rows y0..y1 of .flo files, see fv.input.flo(...))
+        Point and rectangle data are moved so they are relative to the region
+        :param data: List of flo/rgb/epe/mask/point/rect data
+        :param x0: Left side of the region (included)
+        :param y0: Top side of the region (included)
+        :param x1: Right side of the region (excluded)
+        :param y1: Bottom side of the region (excluded)
+        :returns: List of data, cropped to [y0:y1, x0:x1]
+    """
+    if not isinstance(data, Filterable):
+        raise AssertionError('data should be a flo/rgb/epe/mask/point/rect data list')
+    data.assert_type('flo', 'rgb', 'epe', 'mask', 'point', 'rect')
+    if x0 < 0 or y0 < 0 or x1 <= x0 or y1 <= y0:
+        raise AssertionError('Invalid crop region ({x0}, {y0}) - ({x1}, {y1})'.format(
+            x0=x0, y0=y0, x1=x1, y1=y1))
+    box = (int(x0), int(y0), int(x1), int(y1))
+    cropped = data._pushdown_crop(box)
+    if cropped is not None:
+        return cropped
+    return data._add_filter(Crop(data.get_type(), *box))
+
+
 """
     Conversion
 """
@@ -217,15 +271,21 @@ def add_flow_points(points, flow, interpolate: bool = True, accumulate: bool = T
     return AddFlowPoints(points, flow, interpolate, accumulate)
 
 
-def endpoint_error(flow_est, flow_gt):
+def endpoint_error(flow_est, flow_gt, valid=None):
     """
         Operator. Given estimated flow data and its ground truth,
         calculate Average Endpoint Error for all frames
         :param flow_est: Estimated flow, see fv.input.flo(...)
         :param flow_gt: Flow ground truth, see fv.input.flo(...)
+                        (use prefetch in both inputs so they are read in parallel)
+        :param valid: List of masks with the pixels that have valid ground truth,
+                      the rest of pixels have zero error. If None, use the ground truth's
+                      masks if its format has them (e.g. KITTI, see flow_gt.valid_masks())
         :returns: Iterable object with EPE per pixel and frame
     """
-    return EndPointError(flow_est, flow_gt)
+    if valid is None and hasattr(flow_gt, 'valid_masks'):
+        valid = flow_gt.valid_masks()
+    return EndPointError(flow_est, flow_gt, valid)
 
 
 def track_from_first(point_data, image_data, color: Union[str, tuple] = 'random',
@@ -256,3 +316,51 @@ def synthesize_image(image, accum_flow_data):
     # TODO remove when finished
     raise NotImplementedError("synthesize_image hasn't been finished yet.")
     # return SynthesizeImage(image, accum_flow_data)
+
+
+"""
+    Execution
+"""
+
+
+def run(sinks, verbose: bool = False, pipelined: bool = False, queue_size: int = 4, workers: int = 1):
+    """
+        Consume several outputs in a single pass over their data: each frame of
+        a source (or operator) that is used more than once, by one output or by many,
+        is read (computed) only once. Example:
+            flo_data = fv.input.flo('flo')
+            rgb_data = fv.flow_to_rgb(fv.normalize_frame(flo_data))
+            fv.run([fv.output.video('flow.mp4').sink(rgb_data),
+                    fv.output.flo('flo_copy').sink(flo_data)])
+        :param sinks: Sink or list of sinks, see output.sink(...) (e.g. VideoOutput.sink)
+        :param verbose: Show progress bar
+        :param pipelined: Run each stage at the same time, in its own thread: reading each
+                          input, computing each operator/conversion and saving each output
+                          (figures are made and saved in the calling thread). Total time gets
+                          close to the one of the slowest stage, instead of the sum of all
+        :param queue_size: Frames each stage can compute ahead of the next one (if pipelined)
+        :param workers: Compute frames in this many processes, each one a different chunk of
+                        consecutive frames, and save them here in order. Data must be picklable
+                        and stateless: each frame can't depend on the previous ones (accumulated
+                        flow/points, point trails), otherwise it runs as usual with a warning.
+                        Figures are drawn in the workers and reach outputs as rgb images.
+                        Frames are not shared between outputs (each one computes its own).
+                        It can't be used with pipelined
+        :returns: List of dicts with the queue stats of each stage, if pipelined: its name,
+                  capacity, queued frames at the end and on average, frames produced and
+                  seconds waiting for the next stage (producer_wait) or the other way around
+                  (consumer_wait). A stage that is rarely waited for is the slowest one
+    """
+    return pipeline.run(sinks, verbose, pipelined, queue_size, workers)
+
+
+def compile(data):
+    """
+        Fuse the per-pixel stages at the end of a pipeline (crops, normalizations,
+        conversions to rgb and endpoint error), so they are computed together on small
+        tiles of each frame with float32 values instead of one whole frame at a time.
+        Results are the same except for float32 rounding (rgb values can be one unit apart)
+        :param data: List of data, e.g. fv.flow_to_rgb(fv.normalize_video(flo_data))
+        :returns: List of the same data. Use its explain() to see which stages were fused
+    """
+    return CompiledPipeline(data)
@@ -0,0 +1,335 @@
+import copy
+import numpy as np
+from .filterable import Filterable
+from .filters.crop import Crop
+from .filters.normalize_flow import NormalizeFlowFrame, NormalizeFlowVideo
+from .filters.normalize_epe import NormalizeEPEFrame, NormalizeEPEVideo
+from .conversion.flow_to_rgb import FlowToRGB
+from .conversion.epe_to_rgb import EPEToRGB
+from .operators.endpoint_error import EndPointError
+from .util.color_flow import flow_to_rgb
+
+# Pixels computed at once by fused stages, so intermediate values stay in cache
+TILE_PIXELS = 1 << 14
+
+
+class _Stage:
+    """
+        Per-pixel stage of a compiled pipeline, applied to float32 tiles of the frame.
+        Stages that need a value of the whole frame (e.g. its maximum) compute it
+        first with reduce, which is then passed to each apply
+        Results are float32, but saved to the frame with the same type the
+        original stage gives (dtype, or None if it keeps its input's)
+    """
+
+    reduction = False
+    dtype = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def reduce(self, tiles):
+        """
+            :param tiles: Iterator over the tiles of the frame (input of this stage)
+            :returns: Value passed to apply for all tiles of this frame
+        """
+        return None
+
+    def apply(self, tile, value):
+        """
+            :param tile: [th, tw, ...] float32 input of this stage
+            :param value: Result of reduce for this frame (or None)
+            :returns: [th, tw, ...] output of this stage
+        """
+        raise NotImplementedError("Whoops. Contact the owner of the repo.")
+
+
+class _CropStage(_Stage):
+    """ Crops only change which region of the frame is computed (see CompiledPipeline) """
+
+    def __init__(self, name, box):
+        _Stage.__init__(self, name)
+        self.box = box
+
+    def apply(self, tile, value):
+        return tile
+
+
+class _NormalizeFlowFrameStage(_Stage):
+    reduction = True
+    dtype = np.float64
+
+    def reduce(self, tiles):
+        # add small epsilon for float accuracy (same as NormalizeFlowFrame)
+        return max(np.sqrt(t[..., 0] ** 2 + t[..., 1] ** 2).max() for t in tiles) + 1e-3
+
+    def apply(self, tile, fmax):
+        return tile / np.float32(fmax)
+
+
+class _NormalizeFlowVideoStage(_Stage):
+    dtype = np.float64
+
+    def __init__(self, name, clamp, inv_gamma):
+        _Stage.__init__(self, name)
+        self._clamp = np.float32(clamp)
+        self._inv_gamma = inv_gamma
+
+    def apply(self, tile, value):
+        norm = tile / self._clamp
+        if self._inv_gamma != 1.0:
+            norm = np.sign(norm) * (np.abs(norm) ** np.float32(self._inv_gamma))
+        return np.where(tile > self._clamp, np.float32(1), norm)
+
+
+class _NormalizeEPEFrameStage(_Stage):
+    reduction = True
+
+    def reduce(self, tiles):
+        return max(t.max() for t in tiles)
+
+    def apply(self, tile, emax):
+        if emax == 0:
+            return tile
+        return tile / emax
+
+
+class _NormalizeEPEVideoStage(_Stage):
+    dtype = np.float64
+
+    def __init__(self, name, clamp, inv_gamma):
+        _Stage.__init__(self, name)
+        self._clamp = np.float32(clamp)
+        self._inv_gamma = inv_gamma
+
+    def apply(self, tile, value):
+        norm = tile / self._clamp
+        if self._inv_gamma != 1.0:
+            norm = norm ** np.float32(self._inv_gamma)
+        return np.where(tile > self._clamp, np.float32(1), norm)
+
+
+class _FlowToRGBStage(_Stage):
+    dtype = np.uint8
+
+    def apply(self, tile, value):
+        return flow_to_rgb(tile, dtype=np.float32)
+
+
+class _EPEToRGBStage(_Stage):
+    dtype = np.uint8
+
+    def __init__(self, name, color):
+        _Stage.__init__(self, name)
+        self._color = np.array(color, dtype=np.float32)
+
+    def apply(self, tile, value):
+        return (tile[..., np.newaxis] * self._color).astype(np.uint8)
+
+
+def _filter_stage(f):
+    """ :returns: Stage that computes the filter f, or None if it can't be fused """
+    name = type(f).__name__
+    if isinstance(f, Crop) and f._data_type not in ('point', 'rect'):
+        return _CropStage(name, f._box)
+    if type(f) is NormalizeFlowFrame:
+        return _NormalizeFlowFrameStage(name)
+    if type(f) is NormalizeFlowVideo:
+        return _NormalizeFlowVideoStage(name, f._clamp, f._inv_gamma)
+    if type(f) is NormalizeEPEFrame:
+        return _NormalizeEPEFrameStage(name)
+    if type(f) is NormalizeEPEVideo:
+        return _NormalizeEPEVideoStage(name, f._clamp, f._inv_gamma)
+    return None
+
+
+def _without_filters(data, count):
+    """ :returns: data with only its first count filters (the rest are fused) """
+    if count == len(data._filters):
+        return data
+    other = copy.copy(data)
+    other._filters = data._filters[:count]
+    return other
+
+
+def _plan(data):
+    """
+        Find the per-pixel stages at the end of data's pipeline
+        :param data: Filterable
+        :returns: (sources, epe, stages) where sources are the filterables the first stage
+                  reads, which is the endpoint error of them if epe is true
+    """
+    stages = []
+    node = data
+    while True:
+        # fuse filters from the last one, until one that can't be fused
+        count = len(node._filters)
+        while count > 0:
+            stage = _filter_stage(node._filters[count - 1])
+            if stage is None:
+                break
+            stages.insert(0, stage)
+            count -= 1
+        if count > 0:
+            return ((_without_filters(node, count),), None, stages)
+
+        if type(node) is FlowToRGB:
+            stages.insert(0, _FlowToRGBStage('FlowToRGB'))
+            node = node._flo_data
+        elif type(node) is EPEToRGB:
+            stages.insert(0, _EPEToRGBStage('EPEToRGB', node._color))
+            node = node._epe_data
+        elif type(node) is EndPointError:
+            sources = (node._flow_est, node._flow_gt)
+            if node._valid is not None:
+                sources = sources + (node._valid,)
+            return (sources, node, stages)
+        else:
+            return ((_without_filters(node, 0),), None, stages)
+
+
+def _crop_region(region, box):
+    """
+        :param region: (x0, y0, x1, y1) absolute region of the frame
+        :param box: (x0, y0, x1, y1) crop, relative to region
+        :returns: Absolute region after the crop
+    """
+    [rx0, ry0, rx1, ry1] = region
+    [x0, y0, x1, y1] = box
+    return (rx0 + x0, ry0 + y0, max(rx0 + x0, min(rx1, rx0 + x1)), max(ry0 + y0, min(ry1, ry0 + y1)))
+
+
+class CompiledPipeline(Filterable):
+    """
+        Same data as a pipeline, where its last per-pixel stages (normalizations,
+        crops, conversions to rgb and endpoint error) are fused: they are computed
+        together on small tiles of each frame with float32 values, instead of
+        allocating and going through whole float64 frames for each stage.
+        Results are the same as the original pipeline's, except for float32 rounding
+        (rgb values can be one unit apart)
+    """
+
+    def __init__(self, data):
+        Filterable.__init__(self)
+        if not isinstance(data, Filterable):
+            raise AssertionError('data should contain a list of data')
+        self._data = data
+        [self._sources, self._epe, self._stages] = _plan(data)
+
+    def _fused(self):
+        return self._epe is not None or any(not isinstance(s, _CropStage) for s in self._stages)
+
+    def _items(self):
+        if not self._fused():
+            return iter(self._data)  # nothing to gain
+        if len(self._sources) == 1:
+            return (self._compute((frame,)) for frame in self._sources[0])
+        return (self._compute(frames) for frames in zip(*self._sources))
+
+    def _get_item(self, index):
+        if not self._fused():
+            return self._data[index]
+        return self._compute(tuple(source[index] for source in self._sources))
+
+    def _upstream(self):
+        if not self._fused():
+            return (self._data,)
+        return self._sources
+
+    def _length(self):
+        return self._data._length()
+
+    def get_type(self):
+        return self._data.get_type()
+
+    @property
+    def scale(self):
+        return self._data.scale
+
+    @property
+    def shape(self):
+        return self._filtered_shape(self._data.shape)
+
+    def _tiles(self, frames, region, values, out=None):
+        """
+            Compute the first len(values) stages on each tile (rows) of region
+            :param frames: Frames read from the sources
+            :param region: (x0, y0, x1, y1) absolute region to compute
+            :param values: Result of reduce for each stage to apply (see _Stage)
+            :param out: Where to save the tiles (ndarray with the region's size), or None
+            :returns: Iterator over the computed tiles
+        """
+        [x0, y0, x1, y1] = region
+        rows = max(1, TILE_PIXELS // max(1, x1 - x0))
+        for ty in range(y0, y1, rows):
+            ty1 = min(y1, ty + rows)
+            tile = self._read_tile(frames, (x0, ty, x1, ty1))
+            for (stage, value) in zip(self._stages, values):
+                tile = stage.apply(tile, value)
+            if out is not None:
+                out[ty - y0:ty1 - y0] = tile
+            yield tile
+
+    def _read_tile(self, frames, region):
+        """ :returns: float32 input of the first stage in region (flow or endpoint error) """
+        [x0, y0, x1, y1] = region
+        if self._epe is None:
+            return frames[0][y0:y1, x0:x1].astype(np.float32, copy=False)
+        dif = (frames[0][y0:y1, x0:x1].astype(np.float32, copy=False) -
+               frames[1][y0:y1, x0:x1].astype(np.float32, copy=False))
+        epe = np.sqrt(dif[..., 0] ** 2 + dif[..., 1] ** 2)
+        if self._epe.scale != 1.0:
+            epe /= np.float32(self._epe.scale)
+        if len(frames) > 2:
+            epe[~frames[2][y0:y1, x0:x1]] = 0
+        return epe
+
+    def _empty_result(self, frames, region):
+        """ :returns: Uninitialized frame for the result of all stages in region """
+        [x0, y0, x1, y1] = region
+        shape = (y1 - y0, x1 - x0)
+        # same type as the original pipeline's result
+        dtype = frames[0].dtype
+        for stage in self._stages:
+            if stage.dtype is not None:
+                dtype = stage.dtype
+        if dtype == np.uint8:
+            return np.empty(shape + (3,), dtype=dtype)  # rgb
+        if self._epe is None:
+            return np.empty(shape + (2,), dtype=dtype)
+        return np.empty(shape, dtype=dtype)
+
+    def _compute(self, frames):
+        [h, w] = frames[0].shape[0:2]
+        region = (0, 0, w, h)
+        values = []  # values of the whole frame (e.g. maximum) needed by each stage
+        for stage in self._stages:
+            if isinstance(stage, _CropStage):
+                region = _crop_region(region, stage.box)
+            if stage.reduction:
+                values.append(stage.reduce(self._tiles(frames, region, values)))
+            else:
+                values.append(None)
+
+        result = self._empty_result(frames, region)
+        for _ in self._tiles(frames, region, values, result):
+            pass
+        return result
+
+    def explain(self):
+        """
+            :returns: Text description of the compiled pipeline: which stages are
+                      fused, and which run as usual (before them)
+        """
+        lines = ['{n} ({t} data, {c} frames)'.format(
+            n=type(self._data).__name__, t=self.get_type(), c=len(self))]
+        for source in self._sources:
+            names = [type(source).__name__] + [type(f).__name__ for f in source._filters]
+            lines.append('  not fused: ' + ' -> '.join(names))
+        if not self._fused():
+            lines.append('  nothing to fuse, computed as usual')
+            return '\n'.join(lines)
+        names = ([] if self._epe is None else ['EndPointError']) + [s.name for s in self._stages]
+        lines.append('  fused ({p} pixel float32 tiles): {s}'.format(
+            p=TILE_PIXELS, s=' -> '.join(names)))
+        return '\n'.join(lines)
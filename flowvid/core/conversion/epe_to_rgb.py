@@ -23,22 +23,36 @@ class EPEToRGB(Filterable):
     def _items(self):
         return (self._epe_to_rgb(epe) for epe in self._epe_data)
 
-    def __len__(self):
-        return len(self._epe_data)
+    def _get_item(self, index):
+        return self._epe_to_rgb(self._epe_data[index])
+
+    def _upstream(self):
+        return (self._epe_data,)
+
+    def _item_batches(self, n):
+        return (self._epe_to_rgb(batch, batch_dims=1) for batch in self._epe_data.iter_batches(n))
+
+    def _length(self):
+        return self._epe_data._length()
+
+    @property
+    def scale(self):
+        return self._epe_data.scale
 
     def get_type(self):
         return 'rgb'
 
-    def _epe_to_rgb(self, epe):
+    @property
+    def shape(self):
+        return self._filtered_shape(self._epe_data.shape[0:2] + (3,))
+
+    def _epe_to_rgb(self, epe, batch_dims=0):
         """
             :param data: [h, w] ndarray (epe data, normalized)
-            :returns: [h, w, 3] ndarray (rgb data)
+                         or [n, h, w] ndarray with batch_dims=1
+            :returns: [h, w, 3] ndarray (rgb data), or [n, h, w, 3]
         """
-        if not isinstance(epe, np.ndarray) or not epe.ndim == 2:
+        if not isinstance(epe, np.ndarray) or not epe.ndim == 2 + batch_dims:
             raise AssertionError('Data should be [h, w] epe data ndarray')
 
-        def mult(f):
-            return [self._color[0] * f, self._color[1] * f, self._color[2] * f]
-
-        image = np.array(list(map(mult, epe))).astype(np.uint8)
-        return np.swapaxes(image, 1, 2)
+        return (epe[..., np.newaxis] * np.array(self._color)).astype(np.uint8)
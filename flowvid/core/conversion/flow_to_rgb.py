@@ -25,8 +25,25 @@ class FlowToRGB(Filterable):
     def _items(self):
         return (flow_to_rgb(flo) for flo in self._flo_data)
 
-    def __len__(self):
-        return len(self._flo_data)
+    def _get_item(self, index):
+        return flow_to_rgb(self._flo_data[index])
+
+    def _upstream(self):
+        return (self._flo_data,)
+
+    def _item_batches(self, n):
+        return (flow_to_rgb(batch) for batch in self._flo_data.iter_batches(n))
+
+    def _length(self):
+        return self._flo_data._length()
+
+    @property
+    def scale(self):
+        return self._flo_data.scale
 
     def get_type(self):
         return 'rgb'
+
+    @property
+    def shape(self):
+        return self._filtered_shape(self._flo_data.shape[0:2] + (3,))
@@ -24,34 +24,48 @@ class SplitUV(Filterable):
     def _items(self):
         return (self._split_uv(flo) for flo in self._flo_data)
 
-    def __len__(self):
-        return len(self._flo_data)
+    def _get_item(self, index):
+        return self._split_uv(self._flo_data[index])
+
+    def _upstream(self):
+        return (self._flo_data,)
+
+    def _item_batches(self, n):
+        return (self._split_uv(batch, batch_dims=1) for batch in self._flo_data.iter_batches(n))
+
+    def _length(self):
+        return self._flo_data._length()
+
+    @property
+    def scale(self):
+        return self._flo_data.scale
 
     def get_type(self):
         return self._output_type
 
-    def _split_uv(self, data):
+    def _split_uv(self, data, batch_dims=0):
         """
             :param data: [h, w, 2] flow data ndarray
+                         (or [n, h, w, 2] for a batch of n frames, with batch_dims=1)
             :returns: U or V channel with specified data type (see constructor)
         """
-        if not isinstance(data, np.ndarray) or not data.ndim == 3 or not data.shape[2] == 2:
+        if not isinstance(data, np.ndarray) or not data.ndim == 3 + batch_dims or not data.shape[-1] == 2:
             raise AssertionError('Data should be [h, w, 2] flow data ndarray')
 
         dim = 0 if self._channel == 'u' else 1
-        split = data[:, :, dim]
+        split = data[..., dim]
 
         if self._output_type == 'rgb':
             if not self._ignore_rgb_warning and max(split.max(), split.min() * -1) > 1:
                 print('Warning: split_uv assumes that flow data is normalized. This might lead to incorrect images.')
                 print('Consider using a normalization filter (see fv.normalize_frame(...) or fv.normalize_video(...)).')
-            split = np.expand_dims(split, 2)
-            split = np.repeat(split, 3, axis=2)
+            split = np.expand_dims(split, -1)
+            split = np.repeat(split, 3, axis=-1)
             return (split * 127.5 + 127.5).astype(np.uint8)
         elif self._output_type == 'flo':
-            split = np.expand_dims(split, 2)
-            split = np.repeat(split, 2, axis=2)
-            split[:, :, 1 - dim] = 0
+            split = np.expand_dims(split, -1)
+            split = np.repeat(split, 2, axis=-1)
+            split[..., 1 - dim] = 0
             return split
         else:  # assume self._output_type == 'ndarray'
             return split
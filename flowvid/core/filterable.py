@@ -1,5 +1,9 @@
 from ..core.filters.base_filter import Filter
+from .pipeline import shared_items
+from .util.async_iter import aiterate
+from .util.progress import UNBOUNDED_LENGTH
 import copy
+import numpy as np
 
 
 class Filterable:
@@ -9,31 +13,185 @@ class Filterable:
           where filters can be applied on iterations.
         Filterables should implement the following:
         - _items
-        - __len__
+        - _length, which is UNBOUNDED_LENGTH if the number of elements
+          isn't known (e.g. streams), so len() raises TypeError for them
         - get_type, which should return a string from this list:
-            * flo, rgb, rect, point, epe, figure
-        Optionally, it can also implement the __getitem__ function
-          if the elements can be indexed
+            * flo, rgb, rect, point, epe, mask, figure
+        Optionally, it can also implement the _get_item function
+          if the elements can be computed in any order (random access),
+          and the shape/dtype properties if they can be known without
+          computing the first element
+        Operators with random access should list the data they read in
+          _upstream, and the ones whose elements depend on the previous
+          ones (e.g. accumulated points) should override _random_access
+        Filterables are not modified once they are built: adding a filter
+          makes a shallow copy (see _add_filter), which shares its data and
+          filters with the original
     """
 
     def __init__(self):
-        self._filters = []
+        self._filters = ()
+        # filtered copies share the source of their elements (see fv.run)
+        self._source_id = object()
 
     def __iter__(self):
-        return (self._apply_filters(item) for item in self._items())
+        filters = self._iteration_filters()
+        return (self._apply_filters(item, filters) for item in shared_items(self))
+
+    def __aiter__(self):
+        """
+            Iterate with "async for" from asyncio code: elements are read and
+            computed in the event loop's default executor, so it is not blocked
+            (see util.async_iter.aiterate to use another executor)
+        """
+        return aiterate(self)
+
+    def iter_batches(self, n):
+        """
+            Iterate over groups of n consecutive elements, stacked in one ndarray
+            (e.g. [n, h, w, 2] for flo data), so filters, conversions and operators
+            that support it (see Filter.apply_batch) process them in one vectorized call
+            :param n: Number of elements per batch (the last batch can be smaller)
+            :returns: Iterator over [k, ...] ndarrays, with k <= n
+        """
+        if n < 1:
+            raise AssertionError(
+                'n should be bigger than 0 but it is {n}'.format(n=n))
+        if self.get_type() == 'figure':
+            raise AssertionError('figure data can\'t be stacked in batches')
+        filters = self._iteration_filters()
+        return (self._apply_filters_batch(batch, filters) for batch in self._item_batches(n))
+
+    def _item_batches(self, n):
+        """
+            Filterables that can compute batches of elements at once should
+            override it (e.g. with the batches of the data they convert)
+            :returns: Iterator over [k, ...] ndarrays of elements (before applying filters)
+        """
+        batch = []
+        for item in self._items():
+            batch.append(item)
+            if len(batch) == n:
+                yield np.stack(batch)
+                batch = []
+        if batch:
+            yield np.stack(batch)
 
     def _items(self):
         raise NotImplementedError("Whoops. Contact the owner of the repo.")
 
     def __len__(self):
+        n = self._length()
+        if n >= UNBOUNDED_LENGTH:
+            raise TypeError('The number of {t} elements is not known (e.g. a stream without frames)'.format(
+                t=self.get_type()))
+        return n
+
+    def _length(self):
+        """ :returns: Number of elements, or UNBOUNDED_LENGTH if it isn't known """
+        if type(self).__len__ is not Filterable.__len__:
+            return len(self)  # subclasses that implement __len__ instead
         raise NotImplementedError("Whoops. Contact the owner of the repo.")
 
     def get_type(self):
         raise NotImplementedError("Whoops. Contact the owner of the repo.")
 
     def __getitem__(self, index):
-        raise TypeError("'{s}' object can't be indexed, use an iterator instead".format(
-            s=self.__class__.__name__))
+        """
+            data[i] returns element i, and data[a:b:k] a lazy view of elements
+            a, a + k, ... (see FrameSlice) that only computes those elements.
+            With random access (see _random_access) elements are computed directly,
+            otherwise (e.g. accumulated flow, where each element depends on
+            the previous ones) all elements up to the requested one are computed in order
+        """
+        if isinstance(index, slice):
+            return FrameSlice(self, index)
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= self._length():
+            raise IndexError('Index out of range')
+        return next(self._iter_at([index]))
+
+    def _get_item(self, index):
+        """
+            Implement it if elements can be computed in any order
+            :param index: Element index, in 0..len-1
+            :returns: Element index, before applying filters
+        """
+        raise NotImplementedError("Whoops. Contact the owner of the repo.")
+
+    def _upstream(self):
+        """ :returns: Filterables that _get_item reads elements from (e.g. the inputs of an operator) """
+        return ()
+
+    def _random_access(self):
+        """ :returns: True if any element can be computed without computing the previous ones """
+        if type(self)._get_item is Filterable._get_item:
+            return False
+        if any(f.stateful for f in self._filters):
+            return False
+        return all(data._random_access() for data in self._upstream())
+
+    def _iter_at(self, indices):
+        """
+            :param indices: List of element indices, in 0..len-1
+            :returns: Iterator over those elements (after applying filters)
+        """
+        if self._random_access():
+            return self._iter_random(indices)
+        return self._iter_sequential(indices)
+
+    def _iter_random(self, indices):
+        return (self._apply_filters(self._get_item(i)) for i in indices)
+
+    def _iter_sequential(self, indices):
+        """ Compute elements in order until the last index, keeping the requested ones """
+        if not indices:
+            return
+        if all(i0 < i1 for (i0, i1) in zip(indices, indices[1:])):
+            pending = iter(indices)
+            wanted = next(pending)
+            for (i, item) in enumerate(self):
+                if i == wanted:
+                    yield item
+                    wanted = next(pending, None)
+                    if wanted is None:
+                        return
+        else:
+            # not in order (e.g. negative slice step), keep them until all are computed
+            wanted = set(indices)
+            items = {}
+            for (i, item) in enumerate(self):
+                if i in wanted:
+                    items[i] = item
+                    if len(items) == len(wanted):
+                        break
+            for i in indices:
+                yield items[i]
+
+    @property
+    def shape(self):
+        """ Shape of each element, e.g. (h, w, 2) for flo data """
+        return next(iter(self)).shape
+
+    @property
+    def dtype(self):
+        """ Data type of each element, e.g. float32 for flo data """
+        return next(iter(self)).dtype
+
+    @property
+    def frame_count(self):
+        """ Number of elements (frames) """
+        return len(self)
+
+    @property
+    def scale(self):
+        """
+            Proxy scale of the data: its resolution relative to the full one
+            (see the scale parameter of inputs). Point and rect data are always
+            in coordinates of the full resolution
+        """
+        return 1.0
 
     def assert_type(self, *args):
         if self.get_type() not in args:
@@ -45,17 +203,102 @@ class Filterable:
         """
             Make a copy of the filterable and add the new filter to it
             so syntax like "flo_norm = fv.normalize_frame(flo_data)" is possible
+            The copy is shallow: it shares the data (file lists, upstream
+            filterables...) and previous filters with the original, so it is
+            cheap no matter how big the data or the pipeline are
             :param new_filter: Inherits from Filter
             :returns: Copy of the filterable
         """
         if not isinstance(new_filter, Filter):
             raise AssertionError(
                 'new_filter should be a filter and inherit from it')
-        other = copy.deepcopy(self)
-        other._filters.append(new_filter)
+        other = copy.copy(self)
+        other._filters = self._filters + (new_filter,)
         return other
 
-    def _apply_filters(self, data):
+    def _iteration_filters(self):
+        """
+            :returns: Filters to use in a new iteration, where stateful filters
+                      (e.g. accumulated flow) are copies that start over, so filterables
+                      and iterations that share them don't change each other's state
+        """
+        filters = tuple(copy.copy(f) if f.stateful else f for f in self._filters)
+        for f in filters:
+            if f.stateful:
+                f.reset()
+        return filters
+
+    def _filtered_shape(self, shape):
+        """
+            :param shape: Shape of an element before applying filters
+            :returns: Shape of the element after applying filters
+        """
         for f in self._filters:
+            shape = f.output_shape(shape)
+        return shape
+
+    def _pushdown_crop(self, box):
+        """
+            Inputs that can read just a region of each frame return a copy of
+            themselves that does so (see fv.crop(...)), the rest return None
+            :param box: (x0, y0, x1, y1) region of interest
+        """
+        return None
+
+    def _apply_filters(self, data, filters=None):
+        for f in self._filters if filters is None else filters:
             data = f.apply(data)
         return data
+
+    def _apply_filters_batch(self, batch, filters=None):
+        for f in self._filters if filters is None else filters:
+            batch = f.apply_batch(batch)
+        return batch
+
+
+class FrameSlice(Filterable):
+    """
+        Lazy view of some elements of a filterable (data[a:b:k]). If it has
+        random access, only the elements in the slice are computed
+        (e.g. only every 10th .flo file is read). Otherwise, all elements
+        up to the last one in the slice are computed in order so stateful
+        operators/filters (accumulated flow, points moved by flow...) are correct
+    """
+
+    def __init__(self, data, index):
+        Filterable.__init__(self)
+        if isinstance(data, FrameSlice) and not data._filters:
+            # slice of a slice, select from the original data
+            self._data = data._data
+            self._range = data._range[index]
+        else:
+            self._data = data
+            self._range = range(data._length())[index]
+
+    def _items(self):
+        return self._data._iter_at(self._range)
+
+    def __len__(self):
+        return len(self._range)
+
+    def get_type(self):
+        return self._data.get_type()
+
+    def _get_item(self, index):
+        return self._data[self._range[index]]
+
+    def _iter_random(self, indices):
+        # let the data read them (e.g. inputs can prefetch them)
+        items = self._data._iter_at([self._range[i] for i in indices])
+        return (self._apply_filters(item) for item in items)
+
+    def _upstream(self):
+        return (self._data,)
+
+    @property
+    def scale(self):
+        return self._data.scale
+
+    @property
+    def shape(self):
+        return self._filtered_shape(self._data.shape)
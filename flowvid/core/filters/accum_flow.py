@@ -11,16 +11,21 @@ class AccumFlow(Filter):
         from images 0->1, 0->2, 0->3, etc.
     """
 
+    stateful = True
+
     def __init__(self, flow_data, interpolate):
         Filter.__init__(self)
         if not isinstance(flow_data, Filterable):
             raise AssertionError('Invalid flow data passed to AccumFlow')
         flow_data.assert_type('flo')
 
-        [h, w] = next(iter(flow_data)).shape[0:2]
-        self._accum = np.zeros((h, w, 2))
+        [self._h, self._w] = flow_data.shape[0:2]
+        self._accum = np.zeros((self._h, self._w, 2))
         self._interpolate = interpolate
 
+    def reset(self):
+        self._accum = np.zeros((self._h, self._w, 2))
+
     def apply(self, data):
         """
             :param data: [h, w, 2] (u, v components)
@@ -1,5 +1,34 @@
+import numpy as np
+
+
 class Filter:
-    """ Basic filter. All subclasses should override the apply function """
+    """
+        Basic filter. All subclasses should override the apply function
+        Stateful filters (whose result depends on the previous elements)
+        should set stateful = True and override the reset function
+    """
+
+    stateful = False
+
+    def reset(self):
+        """ Clear the state of the filter, before iterating from the first element """
+        pass
 
     def apply(self, data):
         raise NotImplementedError("Whoops. Contact the owner of the repo.")
+
+    def apply_batch(self, batch):
+        """
+            Apply the filter to a batch of elements (see Filterable.iter_batches)
+            Filters that can process all of them at once should override it
+            :param batch: [n, ...] ndarray, n elements stacked in order
+            :returns: [n, ...] ndarray with the filtered elements
+        """
+        return np.stack([self.apply(data) for data in batch])
+
+    def output_shape(self, shape):
+        """
+            :param shape: Shape of the data before the filter
+            :returns: Shape of the data after the filter (the same by default)
+        """
+        return shape
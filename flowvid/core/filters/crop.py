@@ -0,0 +1,49 @@
+import numpy as np
+from .base_filter import Filter
+
+
+class Crop(Filter):
+    """
+        Crop a region of interest [y0:y1, x0:x1] of each frame. Point and
+        rectangle data are moved so they keep pointing to the same pixels
+    """
+
+    def __init__(self, data_type, x0, y0, x1, y1):
+        Filter.__init__(self)
+        self._data_type = data_type
+        self._box = (x0, y0, x1, y1)
+
+    def apply(self, data):
+        """
+            :param data: [h, w, ...] frame (flo/rgb/epe/mask data),
+                         [n, 2] points (x, y) or [4] rectangle (x0, y0, x1, y1)
+            :returns: Cropped frame, or points/rectangle relative to the crop
+        """
+        [x0, y0, x1, y1] = self._box
+        if self._data_type == 'point':
+            return data - np.array([x0, y0])
+        elif self._data_type == 'rect':
+            return data - np.array([x0, y0, x0, y0])
+        return data[y0:y1, x0:x1]
+
+    def apply_batch(self, batch):
+        if self._data_type in ('point', 'rect'):
+            return self.apply(batch)  # offsets broadcast over the batch
+        [x0, y0, x1, y1] = self._box
+        return batch[:, y0:y1, x0:x1]
+
+    def output_shape(self, shape):
+        if self._data_type in ('point', 'rect'):
+            return shape
+        return crop_shape(shape, self._box)
+
+
+def crop_shape(shape, box):
+    """
+        :param shape: (h, w, ...) shape of a frame
+        :param box: (x0, y0, x1, y1) region of interest
+        :returns: Shape of the frame after cropping it to the region of interest
+    """
+    [x0, y0, x1, y1] = box
+    [h, w] = shape[0:2]
+    return (max(0, min(y1, h) - y0), max(0, min(x1, w) - x0)) + tuple(shape[2:])
@@ -3,6 +3,21 @@ from ..filterable import Filterable
 from .base_filter import Filter
 
 
+def find_max_epe(epe_data, verbose=False):
+    """
+        Find max EPE in epe_data
+        :param epe_data: List of epe data
+        :param verbose: Log console messages for progress
+        :returns: Largest EPE module in epe_data
+    """
+    fmax = 0.0
+    if verbose:
+        print('Applying normalization to the whole video...')
+    for epe in epe_data:
+        fmax = max(fmax, epe.max())
+    return fmax
+
+
 class NormalizeEPEFrame(Filter):
     """
         Normalize EPE (so module ranges from 0..1 instead of 0..n)
@@ -22,6 +37,18 @@ class NormalizeEPEFrame(Filter):
         else:
             return data / data.max()
 
+    def apply_batch(self, batch):
+        """
+            :param batch: [n, h, w] (endpoint error of n frames)
+            :returns: [n, h, w] where each frame's max(endpoint error) == 1
+        """
+        if not isinstance(batch, np.ndarray) or not batch.ndim == 3:
+            raise AssertionError('Batch should be [n, h, w] EPE data ndarray')
+
+        emax = batch.max(axis=(1, 2))
+        emax[emax == 0] = 1  # frames without error are not modified
+        return batch / emax[:, np.newaxis, np.newaxis]
+
 
 class NormalizeEPEVideo(Filter):
     """
@@ -30,7 +57,7 @@ class NormalizeEPEVideo(Filter):
         clamping to compensate if there's a high point
     """
 
-    def __init__(self, epe_data, clamp_pct, gamma, verbose):
+    def __init__(self, epe_data, clamp_pct, gamma, verbose, max_value=None):
         Filter.__init__(self)
         if not isinstance(epe_data, Filterable):
             raise AssertionError('Invalid EPE data passed to NormalizeVideo')
@@ -41,22 +68,9 @@ class NormalizeEPEVideo(Filter):
         self._epe_data = epe_data
         self._inv_gamma = 1.0 / gamma
         self._verbose = verbose
-        self._max = self._find_max_epe()
+        self._max = find_max_epe(epe_data, verbose) if max_value is None else max_value
         self._clamp = self._max * clamp_pct
 
-    def _find_max_epe(self):
-        """
-            Find max EPE in epe_data
-            :returns: Largest EPE module in epe_data
-        """
-        fmax = 0.0
-        if self._verbose:
-            print('Applying normalization to the whole video...')
-        for epe in self._epe_data:
-            fmax = max(fmax, epe.max())
-
-        return fmax
-
     def apply(self, data):
         """
             :param data: [h, w] (endpoint error)
@@ -1,8 +1,26 @@
 import numpy as np
 from ..filterable import Filterable
+from ..util.writable import writable
 from .base_filter import Filter
 
 
+def find_max_flow(flow_data, verbose=False):
+    """
+        Find max flow module in flow_data
+        :param flow_data: List of flo data
+        :param verbose: Log console messages for progress
+        :returns: Largest flow vector module in flow_data
+    """
+    fmax = 0.0
+    if verbose:
+        print('Applying normalization to the whole video...')
+    for flow in flow_data:
+        fu = flow[:, :, 0]
+        fv = flow[:, :, 1]
+        fmax = max(fmax, np.sqrt(fu ** 2 + fv ** 2).max())
+    return fmax
+
+
 class NormalizeFlowFrame(Filter):
     """
         Normalize flow (so module ranges from 0..1 instead of 0..n)
@@ -30,6 +48,18 @@ class NormalizeFlowFrame(Filter):
             norm_data[:, :, 1] = fv / fmax
         return norm_data
 
+    def apply_batch(self, batch):
+        """
+            :param batch: [n, h, w, 2] (u, v components of n frames)
+            :returns: [n, h, w, 2] where each frame's max(sqrt(u ** 2 + v ** 2)) == 1
+        """
+        if not isinstance(batch, np.ndarray) or not batch.ndim == 4:
+            raise AssertionError('Batch should be [n, h, w, 2] flow data ndarray')
+
+        # add small epsilon for float accuracy
+        fmax = np.sqrt(batch[..., 0] ** 2 + batch[..., 1] ** 2).max(axis=(1, 2)) + 1e-3
+        return (batch / fmax[:, np.newaxis, np.newaxis, np.newaxis]).astype(np.float64)
+
 
 class NormalizeFlowVideo(Filter):
     """
@@ -38,7 +68,7 @@ class NormalizeFlowVideo(Filter):
         clamping to compensate if there's a high point
     """
 
-    def __init__(self, flow_data, clamp_pct, gamma, verbose):
+    def __init__(self, flow_data, clamp_pct, gamma, verbose, max_value=None):
         Filter.__init__(self)
         if not isinstance(flow_data, Filterable):
             raise AssertionError('Invalid flow data passed to NormalizeVideo')
@@ -49,24 +79,11 @@ class NormalizeFlowVideo(Filter):
         self._flow_data = flow_data
         self._inv_gamma = 1.0 / gamma
         self._verbose = verbose
-        self._max = self._find_max_flow()
-        self._clamp = self._max * clamp_pct
-
-    def _find_max_flow(self):
-        """
-            Find max flow module in flow_data
-            :returns: Largest flow vector module in flow_data
-        """
-        fmax = 0.0
-        if self._verbose:
-            print('Applying normalization to the whole video...')
-        for flow in self._flow_data:
-            fu = flow[:, :, 0]
-            fv = flow[:, :, 1]
-            fmax = max(fmax, np.sqrt(fu ** 2 + fv ** 2).max())
-
+        if max_value is None:
+            max_value = find_max_flow(flow_data, verbose)
         # add small epsilon for float accurady
-        return fmax + 1e-3
+        self._max = max_value + 1e-3
+        self._clamp = self._max * clamp_pct
 
     def apply(self, data):
         """
@@ -76,6 +93,8 @@ class NormalizeFlowVideo(Filter):
         if not isinstance(data, np.ndarray) or not data.ndim == 3:
             raise AssertionError('Data should be [h, w, 2] flow data ndarray')
 
+        # modified in place below, copy only if data is read-only
+        data = writable(data)
         fu = data[:, :, 0]
         fv = data[:, :, 1]
 
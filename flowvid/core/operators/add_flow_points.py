@@ -27,19 +27,33 @@ class AddFlowPoints(Operator):
         self._flow_data = flow_data
         self._interpolate = interpolate
         self._accumulate = accumulate
-        [self._h, self._w] = flow_data[0].shape[0:2]
+        [self._h, self._w] = flow_data.shape[0:2]
 
     def _items(self):
-        yield np.copy(self._points)
+        points = np.copy(self._points)  # each iteration starts from the first points
+        yield np.copy(points)
         for flow in self._flow_data:
             new_points = add_flow_points(
-                flow, self._points, self._interpolate)
+                flow, points, self._interpolate, self._flow_data.scale)
             if self._accumulate:
-                self._points = new_points
+                points = new_points
             yield np.copy(new_points)
 
-    def __len__(self):
-        return 1 + len(self._flow_data)
+    def _get_item(self, index):
+        if index == 0:
+            return np.copy(self._points)
+        return add_flow_points(self._flow_data[index - 1], self._points,
+                               self._interpolate, self._flow_data.scale)
+
+    def _upstream(self):
+        return (self._flow_data,)
+
+    def _random_access(self):
+        # accumulated points are moved by all the previous flow
+        return not self._accumulate and Operator._random_access(self)
+
+    def _length(self):
+        return 1 + self._flow_data._length()
 
     def get_type(self):
         return 'point'
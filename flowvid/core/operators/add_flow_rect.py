@@ -26,18 +26,31 @@ class AddFlowRect(Operator):
         self._flow_data = flow_data
         self._interpolate = interpolate
         self._accumulate = accumulate
-        [self._h, self._w] = flow_data[0].shape[0:2]
+        [self._h, self._w] = flow_data.shape[0:2]
 
     def _items(self):
-        yield np.copy(self._rect)
+        rect = np.copy(self._rect)  # each iteration starts from the first rectangle
+        yield np.copy(rect)
         for flow in self._flow_data:
-            new_rect = self._add(self._rect, flow)
+            new_rect = self._add(rect, flow)
             if self._accumulate:
-                self._rect = new_rect
+                rect = new_rect
             yield np.copy(new_rect)
 
-    def __len__(self):
-        return 1 + len(self._flow_data)
+    def _get_item(self, index):
+        if index == 0:
+            return np.copy(self._rect)
+        return self._add(self._rect, self._flow_data[index - 1])
+
+    def _upstream(self):
+        return (self._flow_data,)
+
+    def _random_access(self):
+        # accumulated rectangles are moved by all the previous flow
+        return not self._accumulate and Operator._random_access(self)
+
+    def _length(self):
+        return 1 + self._flow_data._length()
 
     def get_type(self):
         return 'rect'
@@ -49,4 +62,5 @@ class AddFlowRect(Operator):
                         where (x0, y0) += flow[x0, y0]
                           and (x1, y1) += flow[x1, y1]
         """
-        return add_flow_points(flow, rect.reshape((2, 2)), self._interpolate).flatten()
+        return add_flow_points(flow, rect.reshape((2, 2)), self._interpolate,
+                               self._flow_data.scale).flatten()
@@ -41,6 +41,9 @@ class DrawFlowArrows(Operator):
         if arrow_min_alpha < 0 or arrow_min_alpha > 1:
             raise AssertionError(
                 'arrow_min_alpha should be in 0-1 range but it is {n}.'.format(n=arrow_min_alpha))
+        if image_data.scale != flow_data.scale:
+            raise AssertionError('image_data and flow_data should have the same scale but they are {i} and {f}.'.format(
+                i=image_data.scale, f=flow_data.scale))
         Operator.__init__(self)
         self._image_data = image_data
         self._flow_data = flow_data
@@ -49,7 +52,10 @@ class DrawFlowArrows(Operator):
         self._flat_colors = flat_colors
         self._arrow_min_alpha = arrow_min_alpha
 
-        [h, w] = flow_data[0].shape[0:2]
+        if flow_data.scale != 1.0:
+            # subsample_ratio is in pixels of the full resolution
+            subsample_ratio = max(1, subsample_ratio * flow_data.scale)
+        [h, w] = flow_data.shape[0:2]
         self._subsample_x = subsample_ratio
         self._subsample_y = subsample_ratio
         if (h % subsample_ratio != 0 or w % subsample_ratio != 0) and not ignore_ratio_warning:
@@ -65,8 +71,18 @@ class DrawFlowArrows(Operator):
     def _items(self):
         return (self._draw(image, flow, self._color) for image, flow in zip(self._image_data, self._flow_data))
 
-    def __len__(self):
-        return min(len(self._image_data), len(self._flow_data))
+    def _get_item(self, index):
+        return self._draw(self._image_data[index], self._flow_data[index], self._color)
+
+    def _upstream(self):
+        return (self._image_data, self._flow_data)
+
+    def _length(self):
+        return min(self._image_data._length(), self._flow_data._length())
+
+    @property
+    def scale(self):
+        return self._image_data.scale
 
     def get_type(self):
         return 'figure'
@@ -58,9 +58,34 @@ class DrawPoints(Operator):
         else:
             draw_points(canvas, points, self._color, cross=True)
 
+    def _draw_trail(self, image, trail):
+        """
+            :param image: [h, w, 3] rgb data or figure
+            :param trail: [t, n, 2] ndarray with the n points of the last t frames
+            :returns: Image (rgb or figure) with the points and their trails
+        """
+        if self._figure_output:
+            canvas = convert_to_axes(image)
+        else:
+            canvas = np.copy(image)
+
+        # draw all points with their trails
+        last_points = None
+        for curr_points in trail:
+            if last_points is not None:
+                # Line between curr and last point
+                for i, (p0, p1) in enumerate(zip(last_points, curr_points)):
+                    self._draw_line(canvas, i, p0, p1)
+            last_points = curr_points
+
+        self._draw_points(canvas, trail[-1])
+        return canvas
+
     def _items(self):
         trail = np.array([])
+        scale = self.scale  # points are in coordinates of the full resolution
         for image, points in zip(self._image_data, self._point_data):
+            points = points * scale
             # update trail (last points) array
             if trail.size == 0:
                 trail = np.resize(points, (1, len(points), 2))
@@ -70,26 +95,25 @@ class DrawPoints(Operator):
             else:
                 trail = np.roll(trail, -1, axis=0)
                 trail[self._num_trail - 1, :] = points
+            yield self._draw_trail(image, trail)
 
-            if self._figure_output:
-                canvas = convert_to_axes(image)
-            else:
-                canvas = np.copy(image)
+    def _get_item(self, index):
+        points = self._point_data[index] * self.scale
+        return self._draw_trail(self._image_data[index], np.resize(points, (1, len(points), 2)))
+
+    def _upstream(self):
+        return (self._image_data, self._point_data)
 
-            # draw all points with their trails
-            last_points = None
-            for curr_points in trail:
-                if last_points is not None:
-                    # Line between curr and last point
-                    for i, (p0, p1) in enumerate(zip(last_points, curr_points)):
-                        self._draw_line(canvas, i, p0, p1)
-                last_points = curr_points
+    def _random_access(self):
+        # trails need the points of the previous frames
+        return self._num_trail == 1 and Operator._random_access(self)
 
-            self._draw_points(canvas, trail[-1])
-            yield canvas
+    def _length(self):
+        return min(self._image_data._length(), self._point_data._length())
 
-    def __len__(self):
-        return min(len(self._image_data), len(self._point_data))
+    @property
+    def scale(self):
+        return self._image_data.scale
 
     def get_type(self):
         if self._figure_output:
@@ -37,10 +37,22 @@ class DrawRectangle(Operator):
         self._figure_output = figure_output
 
     def _items(self):
-        return (self._draw(image, rect) for image, rect in zip(self._image_data, self._rect_data))
+        # rectangles are in coordinates of the full resolution
+        scale = self.scale
+        return (self._draw(image, rect * scale) for image, rect in zip(self._image_data, self._rect_data))
 
-    def __len__(self):
-        return min(len(self._image_data), len(self._rect_data))
+    def _get_item(self, index):
+        return self._draw(self._image_data[index], self._rect_data[index] * self.scale)
+
+    def _upstream(self):
+        return (self._image_data, self._rect_data)
+
+    def _length(self):
+        return min(self._image_data._length(), self._rect_data._length())
+
+    @property
+    def scale(self):
+        return self._image_data.scale
 
     def get_type(self):
         if self._figure_output:
@@ -7,42 +7,88 @@ class EndPointError(Operator):
     """
         Calculate Endpoint Error for each frame, comparing
         estimated flow data to its ground truth
+        Pixels outside the valid masks (if any) have zero error
     """
 
-    def __init__(self, flow_est, flow_gt):
+    def __init__(self, flow_est, flow_gt, valid=None):
         if not isinstance(flow_est, Filterable):
             raise AssertionError(
                 'flow_est should contain a list of flow data')
         if not isinstance(flow_gt, Filterable):
             raise AssertionError(
                 'flow_gt should contain a list of flow data')
-        if len(flow_est) != len(flow_gt):
+        if flow_est._length() != flow_gt._length():
             raise AssertionError(
                 'flow_est and flow_gt should be of the same length')
         flow_est.assert_type('flo')
         flow_gt.assert_type('flo')
+        if flow_est.scale != flow_gt.scale:
+            raise AssertionError('flow_est and flow_gt should have the same scale but they are {e} and {g}'.format(
+                e=flow_est.scale, g=flow_gt.scale))
+        if valid is not None:
+            if not isinstance(valid, Filterable):
+                raise AssertionError(
+                    'valid should contain a list of mask data')
+            valid.assert_type('mask')
+            if valid._length() != flow_gt._length():
+                raise AssertionError(
+                    'valid and flow_gt should be of the same length')
         Operator.__init__(self)
         self._flow_est = flow_est
         self._flow_gt = flow_gt
+        self._valid = valid
 
     def _items(self):
-        return (self._get_epe(est, gt) for (est, gt) in zip(self._flow_est, self._flow_gt))
+        if self._valid is None:
+            return (self._get_epe(est, gt) for (est, gt) in zip(self._flow_est, self._flow_gt))
+        return (self._get_epe(est, gt, valid) for (est, gt, valid)
+                in zip(self._flow_est, self._flow_gt, self._valid))
 
-    def __len__(self):
-        return len(self._flow_est)
+    def _get_item(self, index):
+        if self._valid is None:
+            return self._get_epe(self._flow_est[index], self._flow_gt[index])
+        return self._get_epe(self._flow_est[index], self._flow_gt[index], self._valid[index])
+
+    def _upstream(self):
+        return (self._flow_est, self._flow_gt) + (() if self._valid is None else (self._valid,))
+
+    def _item_batches(self, n):
+        batches = zip(self._flow_est.iter_batches(n), self._flow_gt.iter_batches(n))
+        if self._valid is None:
+            return (self._get_epe(est, gt) for (est, gt) in batches)
+        return (self._get_epe(est, gt, valid) for ((est, gt), valid)
+                in zip(batches, self._valid.iter_batches(n)))
+
+    def _length(self):
+        return self._flow_est._length()
+
+    @property
+    def scale(self):
+        return self._flow_est.scale
 
     def get_type(self):
         return 'epe'
 
-    def _get_epe(self, flow_est, flow_gt):
+    @property
+    def shape(self):
+        return self._filtered_shape(self._flow_est.shape[0:2])
+
+    def _get_epe(self, flow_est, flow_gt, valid=None):
         """
             :param flow_est: [h, w, 2] (u, v components)
-                             estimated flow vectors
+                             estimated flow vectors (or [n, h, w, 2] for n frames)
             :param flow_gt: [h, w, 2] (u, v components)
-                            ground truth flow vectors
-            :returns: [h, w] Endpoint error per-pixel ||Vest - Vgt||
+                            ground truth flow vectors (or [n, h, w, 2])
+            :param valid: [h, w] bool mask of pixels with valid ground truth (or None)
+            :returns: [h, w] Endpoint error per-pixel ||Vest - Vgt|| (or [n, h, w]),
+                      in pixels of the full resolution (see scale)
         """
         dif = flow_est - flow_gt
-        difu = dif[:, :, 0]
-        difv = dif[:, :, 1]
-        return np.sqrt(difu ** 2 + difv ** 2)
+        difu = dif[..., 0]
+        difv = dif[..., 1]
+        epe = np.sqrt(difu ** 2 + difv ** 2)
+        if self.scale != 1.0:
+            epe /= self.scale
+        if valid is not None:
+            epe[~valid] = 0
+        return epe
@@ -49,8 +49,12 @@ class SynthesizeImage(Operator):
 
             yield synth_image
 
-    def __len__(self):
-        return 1 + len(self._flow_data)
+    def _length(self):
+        return 1 + self._flow_data._length()
+
+    @property
+    def scale(self):
+        return self._flow_data.scale
 
     def get_type(self):
         return 'rgb'
@@ -37,38 +37,62 @@ class TrackFromFirst(Operator):
     def _items(self):
         first_point = next(iter(self._point_data))
         first_image = next(iter(self._image_data))
-        height, width = first_image.shape[0:2]
         for curr_point, image in zip(self._point_data, self._image_data):
-            if self._vertical:
-                axis = 0  # rows
-                curr_point = curr_point + np.array([0, height])
-            else:
-                axis = 1  # cols
-                curr_point = curr_point + np.array([width, 0])
-            concat_image = np.concatenate((first_image, image), axis=axis)
-            # generate image with points and lines (figure or rgb)
-            if self._figure_output:
-                ax = plt.axes()
-                ax.imshow(concat_image)
-                if self._draw_lines:
-                    for i, (p0, p1) in enumerate(zip(first_point, curr_point)):
-                        color = get_color(self._color, i, normalize=True)
-                        ax.scatter((p0[0], p1[0]), (p0[1], p1[1]),
-                                   marker='+', color=[color])
-                        ax.plot((p0[0], p1[0]), (p0[1], p1[1]), color=color)
-                yield ax
-            else:
-                draw_points(concat_image, first_point, self._color, cross=True)
-                draw_points(concat_image, curr_point, self._color, cross=True)
-                if self._draw_lines:
-                    for i, (p0, p1) in enumerate(zip(first_point, curr_point)):
-                        color = get_color(self._color, i)
-                        draw_line(concat_image, np.reshape(
-                            (p0, p1), (2, 2)), color)
-                yield concat_image
+            yield self._draw(first_point, first_image, curr_point, image)
+
+    def _get_item(self, index):
+        return self._draw(self._point_data[0], self._image_data[0],
+                          self._point_data[index], self._image_data[index])
+
+    def _upstream(self):
+        return (self._point_data, self._image_data)
+
+    def _draw(self, first_point, first_image, curr_point, image):
+        """
+            :param first_point: [n, 2] points of the first frame
+            :param first_image: [h, w, 3] rgb data of the first frame
+            :param curr_point: [n, 2] points of the current frame
+            :param image: [h, w, 3] rgb data of the current frame
+            :returns: Both images side by side with their points (rgb or figure)
+        """
+        scale = self.scale  # points are in coordinates of the full resolution
+        first_point = first_point * scale
+        curr_point = curr_point * scale
+        height, width = first_image.shape[0:2]
+        if self._vertical:
+            axis = 0  # rows
+            curr_point = curr_point + np.array([0, height])
+        else:
+            axis = 1  # cols
+            curr_point = curr_point + np.array([width, 0])
+        concat_image = np.concatenate((first_image, image), axis=axis)
+        # generate image with points and lines (figure or rgb)
+        if self._figure_output:
+            ax = plt.axes()
+            ax.imshow(concat_image)
+            if self._draw_lines:
+                for i, (p0, p1) in enumerate(zip(first_point, curr_point)):
+                    color = get_color(self._color, i, normalize=True)
+                    ax.scatter((p0[0], p1[0]), (p0[1], p1[1]),
+                               marker='+', color=[color])
+                    ax.plot((p0[0], p1[0]), (p0[1], p1[1]), color=color)
+            return ax
+        else:
+            draw_points(concat_image, first_point, self._color, cross=True)
+            draw_points(concat_image, curr_point, self._color, cross=True)
+            if self._draw_lines:
+                for i, (p0, p1) in enumerate(zip(first_point, curr_point)):
+                    color = get_color(self._color, i)
+                    draw_line(concat_image, np.reshape(
+                        (p0, p1), (2, 2)), color)
+            return concat_image
+
+    def _length(self):
+        return min(self._point_data._length(), self._image_data._length())
 
-    def __len__(self):
-        return min(len(self._point_data), len(self._image_data))
+    @property
+    def scale(self):
+        return self._image_data.scale
 
     def get_type(self):
         if self._figure_output:
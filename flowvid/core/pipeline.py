@@ -0,0 +1,498 @@
+import contextvars
+import pickle
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib.pyplot as plt
+import numpy as np
+from .util.axes_to_rgb import axes_to_rgb
+from .util.progress import print_progress
+
+# State of the run that is being executed in this context (see run)
+_current_run = contextvars.ContextVar('flowvid_run', default=None)
+
+_done = object()  # end of iteration marker
+
+POLL_SECONDS = 0.1  # how often blocked threads check if the run was stopped
+
+# Data of each sink and figure for axes conversion, in worker processes (see _init_worker)
+_worker_data = None
+_worker_figure = None
+
+
+class Sink:
+    """
+        Data to be consumed one element at a time by a function (e.g. writing
+        each frame to an output). See output.sink(...) and fv.run(...)
+    """
+
+    def __init__(self, data, consume):
+        """
+            :param data: Filterable with the elements to consume
+            :param consume: Function called with each element, in order
+        """
+        self.data = data
+        self.consume = consume
+
+    def __len__(self):
+        return len(self.data)
+
+
+class _Branch:
+    """ Iterator over the elements of a hub, for one of its consumers """
+
+    __slots__ = ('_hub', '_queue', '__weakref__')
+
+    def __init__(self, hub, queue):
+        self._hub = hub
+        self._queue = queue
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._hub.lock:
+            if not self._queue:
+                self._hub.advance()
+                if not self._queue:
+                    raise StopIteration
+            return self._queue.popleft()
+
+
+class _Hub:
+    """
+        Shares one iteration over the elements of a source between all branches
+        that iterate over it: each element is computed once and handed to every branch
+        Elements are read-only, so filters that modify them in place copy them instead
+    """
+
+    def __init__(self, items, registering):
+        self.lock = threading.Lock()
+        self._items = items
+        self._branches = []  # weakrefs, branches that are discarded stop receiving elements
+        # elements computed while new branches can start (see _Run.close_registration)
+        self._history = [] if registering else None
+        self._count = 0
+        self._ended = False
+
+    def branch(self):
+        """
+            :returns: Iterator over all the elements, or None if it's too late
+                      to start (elements before it have already been discarded)
+        """
+        with self.lock:
+            if self._history is None and self._count > 0:
+                return None
+            queue = deque(self._history or ())
+            branch = _Branch(self, queue)
+            self._branches.append((weakref.ref(branch), queue))
+            return branch
+
+    def close(self):
+        """ Stop keeping elements for branches that haven't started yet """
+        with self.lock:
+            self._history = None
+
+    def advance(self):
+        """ Compute the next element and add it to the queue of every branch (with lock held) """
+        if self._ended:
+            return
+        item = next(self._items, _done)
+        if item is _done:
+            self._ended = True
+            self._items = None
+            self._branches = []
+            self._history = None
+            return
+        if isinstance(item, np.ndarray) and item.flags.writeable:
+            item = item.view()
+            item.flags.writeable = False
+        self._count += 1
+        if self._history is not None:
+            self._history.append(item)
+        self._branches = [(ref, queue) for (ref, queue) in self._branches if ref() is not None]
+        for (_, queue) in self._branches:
+            queue.append(item)
+
+
+class _Producer:
+    """
+        Computes the elements of a filterable (before filters) in its own thread,
+        up to size elements ahead of the consumer (see run, pipelined)
+    """
+
+    def __init__(self, data, size, stopped):
+        self.name = type(data).__name__
+        self._queue = queue.Queue(size)
+        self._stopped = stopped
+        self._ended = False
+        self.produced = 0
+        self.producer_wait = 0.0  # seconds waiting for the consumer (queue full)
+        self.consumer_wait = 0.0  # seconds the consumer waited for elements (queue empty)
+        self._occupancy = 0
+        self._gets = 0
+        context = contextvars.copy_context()  # it also iterates inside the run
+        self._thread = threading.Thread(target=context.run, args=(self._run, data),
+                                        name='flowvid-' + self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self, data):
+        try:
+            for item in data._items():
+                if not self._put((item, None)):
+                    return
+                self.produced += 1
+            self._put((_done, None))
+        except BaseException as error:  # raised to the consumer
+            self._put((_done, error))
+
+    def _put(self, entry):
+        """ :returns: False if the run was stopped before entry could be queued """
+        start = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(entry, timeout=POLL_SECONDS)
+                self.producer_wait += time.monotonic() - start
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._ended:
+            raise StopIteration
+        start = time.monotonic()
+        while True:
+            try:
+                entry = self._queue.get(timeout=POLL_SECONDS)
+                break
+            except queue.Empty:
+                if self._stopped.is_set():
+                    raise StopIteration
+        self.consumer_wait += time.monotonic() - start
+        self._occupancy += self._queue.qsize()
+        self._gets += 1
+        [item, error] = entry
+        if item is _done:
+            self._ended = True
+            if error is not None:
+                raise error
+            raise StopIteration
+        return item
+
+    def stats(self):
+        """
+            :returns: dict with the stage (filterable) name, the capacity of its queue,
+                      the queued elements now and on average (when the consumer takes one),
+                      the elements produced and the seconds the producer waited for the consumer
+                      (if high, a stage after this one is slower) and the other way around
+        """
+        return {'stage': self.name, 'capacity': self._queue.maxsize, 'queued': self._queue.qsize(),
+                'mean_queued': self._occupancy / self._gets if self._gets > 0 else 0.0,
+                'produced': self.produced, 'producer_wait': self.producer_wait,
+                'consumer_wait': self.consumer_wait}
+
+
+class _Run:
+    """ State of a run (see run): hubs of the sources iterated during it """
+
+    def __init__(self, pipelined, queue_size):
+        self._lock = threading.RLock()  # creating a hub can create the ones of its inputs
+        self._hubs = {}
+        self._pipelined = pipelined
+        self._queue_size = queue_size
+        self._registering = True
+        self.producers = []
+        self.stopped = threading.Event()
+
+    def hub(self, data):
+        """ :returns: Hub of data's source, created the first time it is iterated """
+        with self._lock:
+            hub = self._hubs.get(data._source_id)
+            if hub is None:
+                if self._pipelined:
+                    items = _Producer(data, self._queue_size, self.stopped)
+                    self.producers.append(items)
+                else:
+                    items = iter(data._items())
+                hub = _Hub(items, self._registering)
+                self._hubs[data._source_id] = hub
+            return hub
+
+    def close_registration(self):
+        """
+            Called when every sink has its first element, when all sources have started:
+            iterations that start after this read on their own, so hubs don't keep elements
+        """
+        with self._lock:
+            self._registering = False
+            hubs = list(self._hubs.values())
+        for hub in hubs:
+            hub.close()
+
+
+def shared_items(data):
+    """
+        :param data: Filterable
+        :returns: Iterator over data's elements before filters (see _items). Inside
+                  fv.run(...), every iteration over the same source shares its elements
+    """
+    run_state = _current_run.get()
+    if run_state is None or data.get_type() == 'figure':
+        # axes are drawn on by their consumer, so they can't be shared
+        return data._items()
+    branch = run_state.hub(data).branch()
+    if branch is None:
+        return data._items()  # started too late, iterate on its own
+    return branch
+
+
+class _Progress:
+    """
+        Elements consumed by each sink. Sinks can't get more than window
+        elements ahead of the slowest one, so shared elements waiting for
+        the slower branches don't pile up
+    """
+
+    def __init__(self, n, window, run_state):
+        self._condition = threading.Condition()
+        self._counts = [0] * n
+        self._active = set(range(n))
+        self._window = window
+        self._run = run_state
+        self._registering = True
+        self.error = None
+
+    def wait_turn(self, k):
+        """ Wait until sink k can consume its next element. :returns: False if the run was stopped """
+        with self._condition:
+            while (self.error is None and
+                   self._counts[k] - min(self._counts[i] for i in self._active) >= self._window):
+                self._condition.wait(POLL_SECONDS)
+            return self.error is None
+
+    def consumed(self, k):
+        self._update(k, 1)
+
+    def finished(self, k, error=None):
+        self._update(k, 0, ended=True, error=error)
+
+    def _update(self, k, count, ended=False, error=None):
+        with self._condition:
+            self._counts[k] += count
+            if ended:
+                self._active.discard(k)
+            if error is not None and self.error is None:
+                self.error = error
+                self._run.stopped.set()  # wake up and stop all threads
+            started = all(c > 0 or i not in self._active for (i, c) in enumerate(self._counts))
+            close = started and self._registering
+            if close:
+                self._registering = False
+            self._condition.notify_all()
+        if close:
+            self._run.close_registration()
+
+    def count(self):
+        with self._condition:
+            return min(self._counts) if self._counts else 0
+
+
+def _consume_all(sink, k, progress):
+    """ Consume all elements of sink k (in its own thread if pipelined) """
+    error = None
+    try:
+        for item in sink.data:
+            if not progress.wait_turn(k):
+                break
+            sink.consume(item)
+            progress.consumed(k)
+    except BaseException as e:
+        error = e
+    progress.finished(k, error)
+
+
+def run(sinks, verbose=False, pipelined=False, queue_size=4, workers=1):
+    """
+        Consume the elements of all sinks in a single pass: sinks are advanced
+        together, and every source and operator shared by them (or used twice
+        by the same sink) computes each element only once
+        :param sinks: Sink or list of sinks (see output.sink(...))
+        :param verbose: Show progress bar
+        :param pipelined: If True, each source/operator computes its elements in its
+                          own thread, and each sink consumes them (e.g. encodes and writes
+                          them) in another one, all at the same time. Figure data is made
+                          and consumed in the calling thread, as pyplot isn't thread-safe
+        :param queue_size: Elements each thread computes ahead of its consumer (pipelined)
+        :param workers: If bigger than 1, chunks of consecutive elements are computed in that
+                        many worker processes and consumed here, in order (see _run_parallel).
+                        If some data can't be (stateful or not picklable), it runs as usual.
+                        It can't be used with pipelined
+        :returns: List with the stats of each thread's queue (see _Producer.stats), if pipelined
+    """
+    if isinstance(sinks, Sink):
+        sinks = [sinks]
+    if not all(isinstance(sink, Sink) for sink in sinks):
+        raise AssertionError('sinks should be a list of sinks, see output.sink(...)')
+    if queue_size < 1:
+        raise AssertionError('queue_size should be bigger than 0 but it is {n}'.format(n=queue_size))
+    if workers < 1:
+        raise AssertionError('workers should be bigger than 0 but it is {n}'.format(n=workers))
+    if workers > 1 and pipelined:
+        raise AssertionError('pipelined and workers > 1 can\'t be used together')
+
+    n = max((sink.data._length() for sink in sinks), default=0)
+    if workers > 1:
+        payload = _worker_payload(sinks)
+        if payload is not None:
+            _run_parallel(sinks, payload, n, verbose, workers)
+            return []
+    run_state = _Run(pipelined, queue_size)
+    progress = _Progress(len(sinks), queue_size if pipelined else 1, run_state)
+    token = _current_run.set(run_state)
+    try:
+        if pipelined:
+            _run_pipelined(sinks, progress, n, verbose)
+        else:
+            _run_serial(sinks, progress, n, verbose)
+    finally:
+        run_state.stopped.set()
+        _current_run.reset(token)
+    if progress.error is not None:
+        raise progress.error
+    return [producer.stats() for producer in run_state.producers]
+
+
+def _run_serial(sinks, progress, n, verbose):
+    active = [(k, sink, iter(sink.data)) for (k, sink) in enumerate(sinks)]
+    i = 0
+    while active:
+        running = []
+        for (k, sink, items) in active:
+            item = next(items, _done)
+            if item is _done:
+                progress.finished(k)
+            else:
+                sink.consume(item)
+                progress.consumed(k)
+                running.append((k, sink, items))
+        active = running
+        i += 1
+        if verbose and running:
+            print_progress('Frame', i, n)  # after it, as streams end without knowing n
+
+
+def _run_pipelined(sinks, progress, n, verbose):
+    threads = []
+    figures = []
+    for (k, sink) in enumerate(sinks):
+        if sink.data.get_type() == 'figure':
+            figures.append((k, sink))
+        else:
+            context = contextvars.copy_context()  # sinks also iterate inside the run
+            thread = threading.Thread(target=context.run, args=(_consume_all, sink, k, progress),
+                                      name='flowvid-sink-{k}'.format(k=k), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    # figures are made and consumed in this thread, one element of each sink at a time
+    active = [(k, sink, iter(sink.data)) for (k, sink) in figures]
+    while active and progress.error is None:
+        running = []
+        for (k, sink, items) in active:
+            try:
+                item = next(items, _done)
+                if item is _done:
+                    progress.finished(k)
+                    continue
+                if not progress.wait_turn(k):
+                    break
+                sink.consume(item)
+                progress.consumed(k)
+                running.append((k, sink, items))
+            except BaseException as error:
+                progress.finished(k, error)
+                raise
+        active = running
+        if verbose:
+            print_progress('Frame', progress.count(), n)
+
+    for thread in threads:
+        while thread.is_alive():
+            thread.join(POLL_SECONDS if not verbose else 0.5)
+            if verbose:
+                print_progress('Frame', progress.count(), n)
+
+
+def _worker_payload(sinks):
+    """
+        :returns: Pickled data of all sinks to send to the worker processes,
+                  or None if some of it can't be computed there
+    """
+    stateful = [type(sink.data).__name__ for sink in sinks if not sink.data._random_access()]
+    if stateful:
+        print('Warning: {s} can\'t be computed in worker processes, as each frame depends on '
+              'the previous ones (e.g. accumulated flow or point trails). '
+              'Running in this process instead'.format(s=', '.join(stateful)))
+        return None
+    try:
+        return pickle.dumps([sink.data for sink in sinks])
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        print('Warning: data can\'t be sent to worker processes ({e}). '
+              'Running in this process instead'.format(e=e))
+        return None
+
+
+def _init_worker(payload):
+    global _worker_data, _worker_figure
+    plt.switch_backend('Agg')  # figures are only saved to images
+    _worker_data = [(data, data._length()) for data in pickle.loads(payload)]
+    if any(data.get_type() == 'figure' for (data, _) in _worker_data):
+        _worker_figure = plt.figure()  # used for Axes to rgb conversion, same as VideoOutput
+
+
+def _compute_chunk(first, last):
+    """
+        Compute elements first..last-1 of every sink's data in a worker process
+        :returns: List with the elements of each sink (figures as [h, w, 3] rgb ndarrays)
+    """
+    results = []
+    for (data, n) in _worker_data:
+        items = list(data._iter_at(range(first, min(last, n))))
+        if data.get_type() == 'figure':
+            items = [axes_to_rgb(ax, _worker_figure) for ax in items]
+        results.append(items)
+    return results
+
+
+def _run_parallel(sinks, payload, n, verbose, workers):
+    """
+        Split the elements in chunks of consecutive ones (several per worker, so they
+        are balanced), computed in worker processes with random access (see _iter_at)
+        and consumed in order. Up to two chunks per worker are computed ahead of the sinks
+    """
+    chunk = max(1, min(16, n // (4 * workers)))
+    pending = deque()
+    first = 0
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(payload,))
+    try:
+        while first < n or pending:
+            while first < n and len(pending) < 2 * workers:
+                pending.append((first, executor.submit(_compute_chunk, first, first + chunk)))
+                first += chunk
+            [start, future] = pending.popleft()
+            for (sink, items) in zip(sinks, future.result()):
+                for item in items:
+                    sink.consume(item)
+            if verbose:
+                print_progress('Frame', min(n, start + chunk), n)
+    finally:
+        for (_, future) in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
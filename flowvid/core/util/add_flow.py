@@ -58,14 +58,17 @@ def add_flows(flow1, flow2, interpolate):
     return flow1 + add_func(flow2, x_points, y_points)
 
 
-def add_flow_points(flow, points, interpolate: bool):
+def add_flow_points(flow, points, interpolate: bool, scale: float = 1.0):
     """
         :param flow: [h, w, 2] (u, v components)
         :param points: [n, 2] ndarray (x0 y0)
         :param interpolate: Use 4 closest points to interpolate flow / use closest
+        :param scale: Proxy scale of flow, where points are in coordinates of the full resolution
         :returns: [n, 2] ndarray with the moved points
                     where (x, y) += flow[x, y]
     """
+    if scale != 1.0:
+        return add_flow_points(flow, points * scale, interpolate) / scale
     if interpolate:
         new_points = np.copy(points)
         pad = 1  # ignore outermost pixel row to account for interpolation bounds
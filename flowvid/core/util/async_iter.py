@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from .progress import data_length, print_progress
+
+_done = object()  # end of iteration marker
+
+# pyplot's state is shared by all threads, so figures are made and consumed one at a time
+_pyplot_lock = threading.Lock()
+
+
+async def aiterate(iterable, executor=None):
+    """
+        Iterate over iterable from asyncio code, computing each element in
+        executor so the event loop is not blocked (while an element is computed,
+        other tasks keep running). Elements are computed one at a time and in order
+        :param iterable: Any iterable (e.g. a Filterable)
+        :param executor: concurrent.futures executor, or None for the loop's default one
+        :returns: Async generator with the elements of iterable
+    """
+    loop = asyncio.get_running_loop()
+    iterator = await loop.run_in_executor(executor, iter, iterable)
+    while True:
+        item = await loop.run_in_executor(executor, next, iterator, _done)
+        if item is _done:
+            return
+        yield item
+
+
+async def aconsume(iterable, func, executor=None, verbose=False, label='Frame', overlap=True):
+    """
+        Call func with each element of iterable, both in executor, where
+        func(element i) runs while element i + 1 is being computed (see overlap)
+        :param iterable: Any iterable with len (e.g. a Filterable)
+        :param func: Function to call with each element (e.g. write a frame)
+        :param executor: concurrent.futures executor, or None for the loop's default one
+        :param verbose: Show progress bar
+        :param label: Name of the elements, for the progress bar
+        :param overlap: If False, compute each element and call func with it together,
+                        holding a lock shared by all calls (e.g. matplotlib figures, which
+                        share pyplot's state, even between different outputs)
+    """
+    if not overlap:
+        await _aconsume_locked(iterable, func, executor, verbose, label)
+        return
+
+    loop = asyncio.get_running_loop()
+    n = data_length(iterable)
+    pending = None
+    try:
+        i = 0
+        async for item in aiterate(iterable, executor):
+            if pending is not None:
+                await pending  # func calls are made in order, one at a time
+            if verbose:
+                print_progress(label, i + 1, n)
+            pending = loop.run_in_executor(executor, func, item)
+            i += 1
+    finally:
+        if pending is not None:
+            await pending
+
+
+def _next_and_consume(iterator, func):
+    """ :returns: False if iterator ended, else its next element is passed to func """
+    with _pyplot_lock:
+        item = next(iterator, _done)
+        if item is _done:
+            return False
+        func(item)
+        return True
+
+
+async def _aconsume_locked(iterable, func, executor, verbose, label):
+    loop = asyncio.get_running_loop()
+    n = data_length(iterable)
+    iterator = await loop.run_in_executor(executor, iter, iterable)
+    i = 0
+    while await loop.run_in_executor(executor, _next_and_consume, iterator, func):
+        i += 1
+        if verbose:
+            print_progress(label, i, n)
@@ -0,0 +1,19 @@
+import imageio
+import io
+
+
+def axes_to_rgb(ax, fig):
+    """
+        Render a matplotlib Axes as an image
+        :param ax: Axes to render
+        :param fig: Figure used for the conversion, if the axes are in it (they are removed from it after)
+        :returns: [h, w, 3] rgb ndarray
+    """
+    if ax.figure is not fig:
+        fig = ax.figure  # drawn on another figure, e.g. the one of another output
+    buffer = io.BytesIO()  # save to temporal buffer
+    fig.add_axes(ax)
+    fig.savefig(buffer, format='png')
+    fig.delaxes(ax)
+    buffer.seek(0)  # back to the start of the buffer
+    return imageio.imread(buffer)[:, :, 0:3]
@@ -43,21 +43,23 @@ def _make_color_wheel():
 
 
 _colorwheel = _make_color_wheel()
+_colorwheel01 = _colorwheel / 255.0  # 0..1 range
 
 
-def flow_to_rgb(flo_data):
+def flow_to_rgb(flo_data, dtype=np.float64):
     """
-        :param flo_data: [h, w, 2] ndarray (flow data)
+        :param flo_data: [..., 2] ndarray (flow data, e.g. [h, w, 2] or [n, h, w, 2])
                          (must be normalized to 0-1 range)
-        :returns: [h, w, 3] ndarray (rgb data) using color wheel
+        :param dtype: Float type used for the color wheel interpolation
+        :returns: [..., 3] ndarray (rgb data) using color wheel
     """
     ncols = len(_colorwheel)
+    colorwheel = _colorwheel01.astype(dtype, copy=False)
 
-    fu = flo_data[:, :, 0]
-    fv = flo_data[:, :, 1]
+    fu = flo_data[..., 0]
+    fv = flo_data[..., 1]
 
-    [h, w] = fu.shape
-    rgb_data = np.empty([h, w, 3], dtype=np.uint8)
+    rgb_data = np.empty(fu.shape + (3,), dtype=np.uint8)
 
     rad = np.sqrt(fu ** 2 + fv ** 2)
     a = np.arctan2(-fv, -fu) / np.pi
@@ -66,14 +68,14 @@ def flow_to_rgb(flo_data):
     k1 = (k0 + 1) % ncols
     f = fk - k0
     for i in range(3):  # r g b
-        col0 = _colorwheel[k0, i]/255.0
-        col1 = _colorwheel[k1, i]/255.0
+        col0 = colorwheel[k0, i]
+        col1 = colorwheel[k1, i]
         col = np.multiply(1.0-f, col0) + np.multiply(f, col1)
 
         # increase saturation with radius
         col = 1.0 - np.multiply(rad, 1.0 - col)
 
         # save to data channel i
-        rgb_data[:, :, i] = np.floor(col * 255).astype(np.uint8)
+        rgb_data[..., i] = np.floor(col * 255).astype(np.uint8)
 
     return rgb_data
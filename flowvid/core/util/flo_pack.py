@@ -0,0 +1,59 @@
+import struct
+import numpy as np
+
+# Packed flow sequence (.flopack) layout, all values in little endian:
+# - Header (PACK_HEADER): magic, version, number of frames, width, height,
+#                         flags (unused) and offset of the frame index
+# - Frame payloads, one after the other (see flow_codec.encode_flow)
+# - Frame index (PACK_INDEX_DTYPE), one record per frame with the offset
+#   and size of its payload, and how it is encoded
+# The index is written after the payloads so frames can be appended
+# without knowing the number of frames in advance.
+
+PACK_EXTENSION = '.flopack'
+PACK_MAGIC = b'FVPK'
+PACK_VERSION = 1
+PACK_HEADER = struct.Struct('<4sIIiiIQ')
+PACK_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('nbytes', '<u8'),
+                             ('encoding', 'u1'), ('compression', 'u1'),
+                             ('reserved', '<u2'), ('param', '<f4')])
+
+
+def write_pack_header(file, frame_count, width, height, index_offset):
+    """ Write the header at the current position of file """
+    file.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, frame_count,
+                                width, height, 0, index_offset))
+
+
+def read_pack_header(file, file_path):
+    """
+        Read header and frame index of a packed flow sequence
+        :param file: File object of the .flopack file, positioned at its start
+        :param file_path: File path of the .flopack file (used for error messages)
+        :returns: (width, height, index) where index is a PACK_INDEX_DTYPE ndarray
+    """
+    header = file.read(PACK_HEADER.size)
+    if len(header) != PACK_HEADER.size:
+        raise AssertionError(
+            'File {f} is too short to be a packed flow file'.format(f=file_path))
+    [magic, version, frame_count, width, height, _, index_offset] = \
+        PACK_HEADER.unpack(header)
+    if magic != PACK_MAGIC:
+        raise AssertionError(
+            'File {f} is not a packed flow file (wrong magic {m})'.format(f=file_path, m=magic))
+    if version != PACK_VERSION:
+        raise AssertionError('File {f} has unsupported version {v}'.format(
+            f=file_path, v=version))
+    if index_offset == 0:
+        raise AssertionError(
+            'File {f} has no frame index (was it closed after writing?)'.format(f=file_path))
+
+    file.seek(index_offset)
+    index = np.fromfile(file, dtype=PACK_INDEX_DTYPE, count=frame_count)
+    if len(index) != frame_count:
+        raise AssertionError('File {f} is truncated ({n} of {t} index records)'.format(
+            f=file_path, n=len(index), t=frame_count))
+    if frame_count > 0 and int((index['offset'] + index['nbytes']).max()) > index_offset:
+        raise AssertionError(
+            'File {f} has frames outside of its payload'.format(f=file_path))
+    return width, height, index
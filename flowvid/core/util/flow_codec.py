@@ -0,0 +1,174 @@
+import struct
+import zlib
+import numpy as np
+
+# How flow values are stored
+ENCODING_FLOAT32 = 0  # raw float32 (u, v) values, same as .flo files
+ENCODING_FLOAT16 = 1  # float16 (u, v) values
+ENCODING_INT16 = 2    # int16 fixed point values, multiplied by a per-frame scale
+
+# How stored values are compressed
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+
+_encoding_names = {None: ENCODING_FLOAT32, 'float32': ENCODING_FLOAT32,
+                   'float16': ENCODING_FLOAT16, 'int16': ENCODING_INT16}
+_encoding_dtypes = {ENCODING_FLOAT32: np.float32, ENCODING_FLOAT16: np.float16,
+                    ENCODING_INT16: np.int16}
+_compression_names = {None: COMPRESSION_NONE, 'none': COMPRESSION_NONE, 'zlib': COMPRESSION_ZLIB}
+
+# Compact flow file (.floq) layout, all values in little endian:
+# - Header (COMPACT_HEADER): magic, encoding, compression, unused,
+#                            encoding parameter, width, height
+# - Payload (see encode_flow)
+COMPACT_EXTENSION = '.floq'
+COMPACT_MAGIC = b'FLOQ'
+COMPACT_HEADER = struct.Struct('<4sBBHfii')
+
+
+def encoding_id(name):
+    """
+        :param name: None, 'float32', 'float16' or 'int16'
+        :returns: Encoding identifier (ENCODING_* constant)
+    """
+    if name not in _encoding_names:
+        raise AssertionError('encoding should be one of: {e} (but it is {n})'.format(
+            e=', '.join(str(e) for e in _encoding_names), n=name))
+    return _encoding_names[name]
+
+
+def compression_id(name):
+    """
+        :param name: None, 'none' or 'zlib'
+        :returns: Compression identifier (COMPRESSION_* constant)
+    """
+    if name not in _compression_names:
+        raise AssertionError('compression should be one of: {c} (but it is {n})'.format(
+            c=', '.join(str(c) for c in _compression_names), n=name))
+    return _compression_names[name]
+
+
+def _quantize(flow, encoding, max_error):
+    """
+        :returns: (values, param) where values is the ndarray to store and
+                  param the parameter needed to decode it (scale for int16)
+    """
+    if encoding == ENCODING_FLOAT32:
+        return flow.astype(np.float32), 0.0
+    elif encoding == ENCODING_FLOAT16:
+        return flow.astype(np.float16), 0.0
+    elif encoding == ENCODING_INT16:
+        int16_max = np.iinfo(np.int16).max
+        fmax = float(np.abs(flow).max()) if flow.size > 0 else 0.0
+        if max_error is not None:
+            # coarsest step that keeps the rounding error under max_error,
+            # so values are small and compress better
+            # (1% margin for float32 rounding when decoding)
+            scale = 1.98 * max_error
+            if fmax / scale > int16_max:
+                raise AssertionError('Flow values up to {m} can\'t be stored as int16 with max_error {e} '
+                                     '(use a bigger max_error or float32 encoding)'.format(m=fmax, e=max_error))
+        else:
+            # finest step that can hold all values
+            scale = fmax / int16_max if fmax > 0 else 1.0
+        scale = float(np.float32(scale))
+        values = np.clip(np.round(flow / scale), -int16_max, int16_max)
+        return values.astype(np.int16), scale
+    raise AssertionError('Unknown flow encoding ({e})'.format(e=encoding))
+
+
+def _dequantize(values, encoding, param):
+    if encoding == ENCODING_FLOAT32:
+        return values
+    elif encoding == ENCODING_FLOAT16:
+        return values.astype(np.float32)
+    else:  # assume ENCODING_INT16
+        return values.astype(np.float32) * np.float32(param)
+
+
+def encode_flow(flow, compression=COMPRESSION_NONE, level=6,
+                encoding=ENCODING_FLOAT32, max_error=None):
+    """
+        :param flow: [h, w, 2] flow ndarray
+        :param compression: COMPRESSION_* constant
+        :param level: zlib compression level (0-9)
+        :param encoding: ENCODING_* constant
+        :param max_error: Maximum absolute error (in pixels) allowed for lossy
+                          encodings. Decoded values are checked against the original
+                          ones, and an AssertionError is raised if the error is bigger.
+                          For int16, it also sets the quantization step (~2 * max_error)
+        :returns: (encoding, compression, param, payload) tuple, where payload
+                  is a bytes object and the rest are needed to decode it.
+                  Compression is not used if it doesn't make the payload smaller.
+    """
+    flow = np.asarray(flow)
+    [values, param] = _quantize(flow, encoding, max_error)
+    if max_error is not None and encoding != ENCODING_FLOAT32:
+        error = np.abs(_dequantize(values, encoding, param) - flow).max()
+        if not error <= max_error:
+            raise AssertionError('Flow encoding error ({e} px) is bigger than max_error ({m} px)'.format(
+                e=error, m=max_error))
+
+    payload = np.ascontiguousarray(values).tobytes()
+    if compression == COMPRESSION_ZLIB:
+        compressed = zlib.compress(payload, level)
+        if len(compressed) < len(payload):
+            return encoding, COMPRESSION_ZLIB, param, compressed
+    return encoding, COMPRESSION_NONE, param, payload
+
+
+def decode_flow(payload, encoding, compression, param, height, width):
+    """
+        :param payload: bytes-like object with the encoded flow (see encode_flow)
+        :param encoding: ENCODING_* constant
+        :param compression: COMPRESSION_* constant
+        :param param: Encoding parameter (see encode_flow)
+        :param height: Height of the flow data
+        :param width: Width of the flow data
+        :returns: [h, w, 2] float32 ndarray. Uncompressed float32 payloads are not copied,
+                  so the result is a view of payload (read-only for bytes objects)
+    """
+    if compression == COMPRESSION_ZLIB:
+        payload = zlib.decompress(payload)
+    elif compression != COMPRESSION_NONE:
+        raise AssertionError('Unknown flow compression ({c})'.format(c=compression))
+
+    if encoding not in _encoding_dtypes:
+        raise AssertionError('Unknown flow encoding ({e})'.format(e=encoding))
+    values = np.frombuffer(payload, dtype=_encoding_dtypes[encoding],
+                           count=height * width * 2)
+    return _dequantize(values, encoding, param).reshape((height, width, 2))
+
+
+def write_compact_flow(file, encoded, height, width):
+    """
+        Write a compact flow file (.floq)
+        :param file: File object, opened for writing in binary mode
+        :param encoded: Result of encode_flow
+        :param height: Height of the flow data
+        :param width: Width of the flow data
+    """
+    [encoding, compression, param, payload] = encoded
+    file.write(COMPACT_HEADER.pack(COMPACT_MAGIC, encoding, compression, 0,
+                                   param, width, height))
+    file.write(payload)
+
+
+def read_compact_header(file, file_path):
+    """
+        :param file: File object of the .floq file, positioned at its start
+        :param file_path: File path of the .floq file (used for error messages)
+        :returns: (encoding, compression, param, width, height)
+    """
+    header = file.read(COMPACT_HEADER.size)
+    if len(header) != COMPACT_HEADER.size:
+        raise AssertionError(
+            'File {f} is too short to be a compact flow file'.format(f=file_path))
+    [magic, encoding, compression, _, param, width, height] = COMPACT_HEADER.unpack(header)
+    if magic != COMPACT_MAGIC:
+        raise AssertionError(
+            'File {f} is not a compact flow file (wrong magic {m})'.format(f=file_path, m=magic))
+    if width <= 0 or height <= 0:
+        raise AssertionError('File {f} has invalid size ({w}x{h})'.format(
+            f=file_path, w=width, h=height))
+    return encoding, compression, param, width, height
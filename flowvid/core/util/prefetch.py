@@ -0,0 +1,31 @@
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def prefetch_map(func, items, prefetch, workers):
+    """
+        Apply func to each element of items, computing up to prefetch results
+        ahead of the consumer in a thread pool. Results are returned in order
+        and at most prefetch results are kept in memory at the same time.
+        :param func: Function to apply (e.g. read and decode a file)
+        :param items: Iterable with the arguments for func
+        :param prefetch: Number of results to compute in advance (bigger than 0)
+        :param workers: Number of threads computing results (bigger than 0)
+        :returns: Generator of func(item) for each item in items
+    """
+    items = iter(items)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque(executor.submit(func, item)
+                    for item in itertools.islice(items, prefetch))
+    try:
+        while pending:
+            result = pending.popleft().result()
+            # keep the window full while the consumer processes this result
+            for item in itertools.islice(items, 1):
+                pending.append(executor.submit(func, item))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,172 @@
+import itertools
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import numpy as np
+from .shared_memory import attach_shared_memory
+
+# Shared memory block of the worker process (see _init_worker)
+_worker_block = None
+
+
+def _init_worker(name):
+    global _worker_block
+    _worker_block = attach_shared_memory(name)
+
+
+def _run_into_slot(func, item, slot, slot_bytes):
+    """
+        Run func(item) in a worker process and write the result to a slot of the
+        shared memory block, so only its shape and dtype go back to the parent
+        :returns: (shape, dtype) of the result, or the result itself if it doesn't fit
+    """
+    data = np.ascontiguousarray(func(item))
+    if data.nbytes > slot_bytes:
+        return data
+    slot_view = np.ndarray(data.shape, dtype=data.dtype, buffer=_worker_block.buf,
+                           offset=slot * slot_bytes)
+    slot_view[...] = data
+    del slot_view  # release the buffer before the block can be closed
+    return (data.shape, data.dtype.str)
+
+
+def _shutdown(executor, block):
+    executor.shutdown(wait=True)
+    block.close()
+    block.unlink()
+
+
+class ProcessPrefetcher:
+    """
+        Worker processes and a ring buffer of slots in shared memory, started
+        by the first map and reused by the next ones (e.g. each iteration over
+        the same input), so processes are started once. They are stopped with
+        close(), or when the object is deleted.
+        Only one map uses them at a time, other maps that run at the same time
+        (e.g. two iterations of the same input) start their own processes
+    """
+
+    def __init__(self, processes):
+        """ :param processes: Number of worker processes (bigger than 0) """
+        self._processes = processes
+        self._lock = threading.Lock()
+        self._busy = False  # a map is using the slots
+        self._executor = None
+        self._block = None
+        self._slots = 0
+        self._slot_bytes = 0
+        self._finalizer = None
+
+    def __deepcopy__(self, memo):
+        # filtered copies of an input keep sharing its processes
+        return self
+
+    def __getstate__(self):
+        # copies sent to other processes start their own processes when they need them
+        return {'processes': self._processes}
+
+    def __setstate__(self, state):
+        ProcessPrefetcher.__init__(self, state['processes'])
+
+    def close(self):
+        """ Stop the worker processes and free the slots (when no map is using them) """
+        if self._finalizer is not None:
+            self._finalizer()
+            self._executor = None
+            self._block = None
+            self._finalizer = None
+
+    def _start(self, slot_bytes, prefetch):
+        """ Start the processes, or restart them if the slots are too small """
+        if self._executor is not None and slot_bytes <= self._slot_bytes and prefetch <= self._slots:
+            return
+        self.close()
+        block = shared_memory.SharedMemory(create=True, size=max(1, slot_bytes * prefetch))
+        executor = ProcessPoolExecutor(max_workers=self._processes, initializer=_init_worker,
+                                       initargs=(block.name,))
+        self._finalizer = weakref.finalize(self, _shutdown, executor, block)
+        [self._executor, self._block] = [executor, block]
+        [self._slot_bytes, self._slots] = [slot_bytes, prefetch]
+
+    def map(self, func, items, slot_bytes, prefetch, cached=None):
+        """
+            Like prefetch_map, but computing results in the worker processes (for work
+            that holds the GIL, e.g. image decoding). Results are written to the slots
+            in shared memory instead of being pickled, and are returned in order, with
+            at most prefetch results being computed at the same time
+            :param func: Picklable function to apply (e.g. module-level), returns an ndarray
+            :param items: Iterable with the arguments for func
+            :param slot_bytes: Size of each slot (results that don't fit are pickled)
+            :param prefetch: Number of results to compute in advance (bigger than 0)
+            :param cached: Optional function that returns the result of an item
+                           without computing it (e.g. from a cache), or None
+            :returns: Generator of func(item) for each item in items
+        """
+        with self._lock:
+            busy = self._busy
+            self._busy = True
+        if busy:
+            yield from process_prefetch_map(func, items, slot_bytes, prefetch, self._processes, cached)
+            return
+        try:
+            self._start(slot_bytes, prefetch)
+            yield from self._map_slots(func, items, prefetch, cached)
+        finally:
+            with self._lock:
+                self._busy = False
+
+    def _map_slots(self, func, items, prefetch, cached):
+        items = iter(items)
+        counter = itertools.count()
+        pending = deque()  # (slot, future or result)
+
+        def submit(item):
+            slot = next(counter) % prefetch
+            result = None if cached is None else cached(item)
+            if result is None:
+                result = self._executor.submit(_run_into_slot, func, item, slot, self._slot_bytes)
+            pending.append((slot, result))
+
+        def take(slot, result):
+            if isinstance(result, np.ndarray):
+                return result
+            [shape, dtype] = result
+            slot_view = np.ndarray(shape, dtype=dtype, buffer=self._block.buf,
+                                   offset=slot * self._slot_bytes)
+            data = slot_view.copy()  # the slot is reused by the next item
+            del slot_view
+            return data
+
+        try:
+            for item in itertools.islice(items, prefetch):
+                submit(item)
+            while pending:
+                [slot, result] = pending.popleft()
+                if not isinstance(result, np.ndarray):
+                    result = take(slot, result.result())
+                # the slot is free, keep the window full while the consumer processes this result
+                for item in itertools.islice(items, 1):
+                    submit(item)
+                yield result
+        finally:
+            # the next map reuses the slots, so results that are being written have to end
+            futures = [result for (_, result) in pending if not isinstance(result, np.ndarray)]
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+
+def process_prefetch_map(func, items, slot_bytes, prefetch, processes, cached=None):
+    """
+        ProcessPrefetcher.map with its own worker processes, which are
+        stopped when it ends (see ProcessPrefetcher to reuse them)
+        :param processes: Number of worker processes (bigger than 0)
+        :returns: Generator of func(item) for each item in items
+    """
+    prefetcher = ProcessPrefetcher(processes)
+    try:
+        yield from prefetcher.map(func, items, slot_bytes, prefetch, cached)
+    finally:
+        prefetcher.close()
@@ -0,0 +1,24 @@
+# Length of data whose number of frames isn't known (e.g. streams): big enough to
+# never be reached, and small enough that operators can add to it (e.g. 1 + len)
+UNBOUNDED_LENGTH = 2 ** 62
+
+
+def data_length(data):
+    """
+        :param data: Filterable, or any other iterable with len
+        :returns: Number of elements of data, UNBOUNDED_LENGTH if it isn't known
+    """
+    return data._length() if hasattr(data, '_length') else len(data)
+
+
+def print_progress(label, count, total):
+    """
+        Show progress in the console, in the same line
+        :param label: What is counted, e.g. 'Frame'
+        :param count: Number of done elements
+        :param total: Number of elements, not shown if it isn't known (see UNBOUNDED_LENGTH)
+    """
+    if total >= UNBOUNDED_LENGTH:
+        print(' {l} {c}'.format(l=label, c=count), end='\r')
+    else:
+        print(' {l} {c} of {t}'.format(l=label, c=count, t=total), end='\r')
@@ -0,0 +1,87 @@
+import numpy as np
+from PIL import Image
+
+# Proxy resolution: frames are read at a scale (0..1] of their full size,
+# so previews are faster (see the scale parameter of fv.input.flo(...))
+
+
+def scaled_size(height, width, scale):
+    """ :returns: (height, width) of a frame of height x width read at scale """
+    return (max(1, int(round(height * scale))), max(1, int(round(width * scale))))
+
+
+def scaled_shape(shape, scale):
+    """ :returns: shape of a frame of given shape, read at scale (channels don't change) """
+    if scale == 1.0:
+        return shape
+    return scaled_size(shape[0], shape[1], scale) + tuple(shape[2:])
+
+
+def _resize_channel(channel, height, width):
+    """ Area average (box filter) of a [h, w] ndarray, as float32 """
+    image = Image.fromarray(np.ascontiguousarray(channel, dtype=np.float32))  # mode 'F'
+    return np.asarray(image.resize((width, height), Image.BOX))
+
+
+def resize_flow(flow, scale, valid=None):
+    """
+        :param flow: [h, w, 2] flow ndarray
+        :param valid: [h, w] bool mask of the pixels with valid flow (e.g. KITTI), or None
+        :returns: [h * scale, w * scale, 2] float32 flow ndarray, where each pixel is the
+                  mean flow of its area, with vectors measured in pixels at that scale.
+                  With a mask, it is the mean of the valid pixels only, and zero where
+                  the area is not valid (see resize_mask)
+    """
+    [h, w] = flow.shape[0:2]
+    [new_h, new_w] = scaled_size(h, w, scale)
+    resized = np.empty((new_h, new_w, 2), dtype=np.float32)
+    if valid is None:
+        resized[:, :, 0] = _resize_channel(flow[:, :, 0], new_h, new_w) * (new_w / w)
+        resized[:, :, 1] = _resize_channel(flow[:, :, 1], new_h, new_w) * (new_h / h)
+        return resized
+
+    # sum(flow * valid) / sum(valid) of each area, from the means of both
+    weight = _resize_channel(valid, new_h, new_w)
+    weight_valid = weight >= 0.5
+    for (c, factor) in ((0, new_w / w), (1, new_h / h)):
+        total = _resize_channel(np.where(valid, flow[:, :, c], 0), new_h, new_w)
+        resized[:, :, c] = np.where(weight_valid, total / np.maximum(weight, 1e-6) * factor, 0)
+    return resized
+
+
+def resize_image(image, scale):
+    """
+        :param image: [h, w] or [h, w, c] image ndarray
+        :returns: Image with the mean color of each area, at scale (same dtype)
+    """
+    [h, w] = image.shape[0:2]
+    [new_h, new_w] = scaled_size(h, w, scale)
+    if image.dtype == np.uint8 and (image.ndim == 2 or image.shape[2] in (3, 4)):
+        return np.asarray(Image.fromarray(image).resize((new_w, new_h), Image.BOX))
+    if image.ndim == 2:
+        return _resize_channel(image, new_h, new_w).astype(image.dtype)
+    channels = [_resize_channel(image[:, :, c], new_h, new_w) for c in range(image.shape[2])]
+    return np.stack(channels, axis=2).astype(image.dtype)
+
+
+def resize_mask(mask, scale):
+    """
+        :param mask: [h, w] bool ndarray
+        :returns: Mask at scale, True where at least half of each area is True
+    """
+    [h, w] = mask.shape[0:2]
+    [new_h, new_w] = scaled_size(h, w, scale)
+    return _resize_channel(mask, new_h, new_w) >= 0.5
+
+
+def resize_frame(data, data_type, scale):
+    """
+        :param data: Frame of flo, rgb or mask data
+        :param data_type: Type of the data, e.g. 'flo'
+        :returns: Frame at scale (see resize_flow, resize_image, resize_mask)
+    """
+    if data_type == 'flo':
+        return resize_flow(data, scale)
+    elif data_type == 'mask':
+        return resize_mask(data, scale)
+    return resize_image(data, scale)
@@ -0,0 +1,40 @@
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+
+def attach_shared_memory(name, shares_tracker=True):
+    """
+        Attach to a shared memory block created by another process, which
+        is responsible for unlinking it (this process only closes it)
+        :param name: Name of the shared memory block
+        :param shares_tracker: True if this process was started by the creator
+                               with multiprocessing (e.g. a pool worker)
+        :returns: SharedMemory object
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 always tracks it, which is fine for child processes, as
+        # they share the parent's resource tracker, where it is already registered
+        block = shared_memory.SharedMemory(name=name)
+        if not shares_tracker:
+            # otherwise, this process' tracker would unlink it when it exits
+            resource_tracker.unregister(block._name, 'shared_memory')
+        return block
+
+
+def shared_ndarray(block, shape, dtype, offset=0):
+    """
+        Array stored in a shared memory block, which closes the block when it
+        is deleted. Views of the array keep it alive, so the memory is only
+        unmapped (SharedMemory.close()) after the last of them is deleted
+        :param block: SharedMemory object, which shouldn't be closed otherwise
+        :param shape: Shape of the array
+        :param dtype: numpy dtype of the array
+        :param offset: Start of the array in the block, in bytes
+        :returns: ndarray
+    """
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)
+    weakref.finalize(array, block.close)
+    return array
@@ -0,0 +1,11 @@
+import numpy as np
+
+
+def writable(data):
+    """
+        :param data: ndarray, which might be read-only (e.g. memory-mapped flow data)
+        :returns: data if it can be modified in place, or a writable copy of it
+    """
+    if data.flags.writeable:
+        return data
+    return np.copy(data)
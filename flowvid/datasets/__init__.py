@@ -0,0 +1,77 @@
+from ..input.frame_cache import FrameCache
+from .dataset import Dataset, Sequence, ImageMaskData
+from .dataset_index import load_dataset_index
+from .adapters import build_sintel, build_kitti, build_flying_chairs
+
+
+def _dataset(kind, root, options, build, prefetch, workers, cache):
+    return Dataset(root, load_dataset_index(kind, root, options, build), prefetch, workers, cache)
+
+
+def sintel(root: str, split: str = 'training', render_pass: str = 'final',
+           prefetch: int = 0, workers: int = 1, cache: FrameCache = None):
+    """
+        MPI Sintel dataset (http://sintel.is.tue.mpg.de/), as a list of its sequences
+        (e.g. "alley_1"), each with its images, ground truth flow and valid masks
+        (pixels not marked as invalid). The list of files is indexed the first time
+        and cached in ~/.cache/flowvid, so opening it again doesn't list any directory
+        e.g.: for sequence in fv.datasets.sintel('path/to/MPI-Sintel'):
+                  epe = fv.endpoint_error(my_flow(sequence.images), sequence.flow, sequence.masks)
+        :param root: Directory with the training/ and test/ directories
+        :param split: 'training' or 'test' (test has no ground truth flow)
+        :param render_pass: 'clean' or 'final' images
+        :param prefetch: See fv.input.flo(...), used for all inputs
+        :param workers: See fv.input.flo(...), used for all inputs
+        :param cache: See fv.input.flo(...), used for all inputs
+        :returns: List of sequences, indexable by position or name, where each sequence has
+                  name, images (rgb data), flow (flo data from frame i to i + 1, or None)
+                  and masks (mask data, or None)
+    """
+    if split not in ('training', 'test'):
+        raise AssertionError('split should be training or test but it is {s}'.format(s=split))
+    if render_pass not in ('clean', 'final'):
+        raise AssertionError('render_pass should be clean or final but it is {p}'.format(p=render_pass))
+    return _dataset('sintel', root, '{s}:{p}'.format(s=split, p=render_pass),
+                    build_sintel(split, render_pass), prefetch, workers, cache)
+
+
+def kitti(root: str, split: str = 'training', occluded: bool = True,
+          prefetch: int = 0, workers: int = 1, cache: FrameCache = None):
+    """
+        KITTI 2012 or 2015 flow dataset (http://www.cvlibs.net/datasets/kitti/), as a list of
+        its image pairs (e.g. "000000"), each a sequence of 2 images and 1 ground truth flow
+        (read as fv.input.kitti_flo(...), so masks are its valid pixels). The list of files is
+        indexed and cached like fv.datasets.sintel(...)
+        :param root: Directory with the training/ and testing/ directories
+        :param split: 'training' or 'testing' (testing has no ground truth flow)
+        :param occluded: Use ground truth flow of all pixels (flow_occ) or
+                         only of non-occluded ones (flow_noc)
+        :param prefetch: See fv.input.flo(...), used for all inputs
+        :param workers: See fv.input.flo(...), used for all inputs
+        :param cache: See fv.input.flo(...), used for all inputs
+        :returns: List of sequences, see fv.datasets.sintel(...)
+    """
+    if split not in ('training', 'testing'):
+        raise AssertionError('split should be training or testing but it is {s}'.format(s=split))
+    return _dataset('kitti', root, '{s}:{o}'.format(s=split, o=occluded),
+                    build_kitti(split, occluded), prefetch, workers, cache)
+
+
+def flying_chairs(root: str, split: str = None,
+                  prefetch: int = 0, workers: int = 1, cache: FrameCache = None):
+    """
+        FlyingChairs dataset (https://lmb.informatik.uni-freiburg.de/resources/datasets/FlyingChairs.en.html),
+        as a list of its image pairs (e.g. "00001"), each a sequence of 2 images and 1 ground
+        truth flow. The list of files is indexed and cached like fv.datasets.sintel(...)
+        :param root: Directory with the data/ directory (or the files themselves)
+        :param split: 'train' or 'val' to use the official split from FlyingChairs_train_val.txt,
+                      or None for all pairs
+        :param prefetch: See fv.input.flo(...), used for all inputs
+        :param workers: See fv.input.flo(...), used for all inputs
+        :param cache: See fv.input.flo(...), used for all inputs
+        :returns: List of sequences, see fv.datasets.sintel(...)
+    """
+    if split not in (None, 'train', 'val'):
+        raise AssertionError('split should be train, val or None but it is {s}'.format(s=split))
+    return _dataset('flying_chairs', root, str(split), build_flying_chairs(split),
+                    prefetch, workers, cache)
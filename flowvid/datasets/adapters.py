@@ -0,0 +1,100 @@
+import os
+from ..input.manifest import list_directory
+
+# Dataset layouts. Each build_* function lists a dataset, returning the
+# directories it listed and its sequences (see dataset_index.load_dataset_index)
+
+
+def _names(root, directory, extensions):
+    """ :returns: Sorted names of the files in root/directory with extensions """
+    return [os.path.basename(path) for path in list_directory(os.path.join(root, directory), extensions)]
+
+
+def _subdirectories(root, directory):
+    with os.scandir(os.path.join(root, directory)) as entries:
+        return sorted(entry.name for entry in entries if entry.is_dir())
+
+
+def _check_directory(root, directory):
+    if not os.path.isdir(os.path.join(root, directory)):
+        raise AssertionError('{d} not found in dataset root {r}'.format(d=directory, r=root))
+
+
+def build_sintel(split, render_pass):
+    """
+        MPI Sintel: <split>/<pass>/<sequence>/frame_XXXX.png images,
+        <split>/flow/<sequence>/frame_XXXX.flo flow (training split only)
+        and <split>/invalid/<sequence>/frame_XXXX.png pixels without valid flow
+    """
+    def build(root):
+        images_dir = os.path.join(split, render_pass)
+        _check_directory(root, images_dir)
+        directories = [images_dir]
+        sequences = []
+        for name in _subdirectories(root, images_dir):
+            sequence = {'name': name}
+            for (field, directory, extensions) in (('images', images_dir, ('.png',)),
+                                                   ('flow', os.path.join(split, 'flow'), ('.flo',)),
+                                                   ('masks', os.path.join(split, 'invalid'), ('.png',))):
+                directory = os.path.join(directory, name)
+                if os.path.isdir(os.path.join(root, directory)):
+                    sequence[field] = [directory, _names(root, directory, extensions)]
+                directories.append(directory)
+            sequences.append(sequence)
+        return directories, sequences
+    return build
+
+
+def build_kitti(split, occluded):
+    """
+        KITTI 2012/2015: <split>/image_2 (2015) or <split>/colored_0 (2012) with
+        XXXXXX_10.png and XXXXXX_11.png image pairs, and <split>/flow_occ or
+        <split>/flow_noc with XXXXXX_10.png flow (training split only).
+        Each image pair is a sequence
+    """
+    def build(root):
+        images_dir = os.path.join(split, 'image_2')
+        if not os.path.isdir(os.path.join(root, images_dir)):
+            images_dir = os.path.join(split, 'colored_0')
+        _check_directory(root, images_dir)
+        flow_dir = os.path.join(split, 'flow_occ' if occluded else 'flow_noc')
+        flow_names = set(_names(root, flow_dir, ('.png',))) \
+            if os.path.isdir(os.path.join(root, flow_dir)) else set()
+
+        sequences = []
+        for name in _names(root, images_dir, ('_10.png',)):
+            scene = name[:-len('_10.png')]
+            sequence = {'name': scene, 'images': [images_dir, [name, scene + '_11.png']]}
+            if name in flow_names:
+                sequence['flow'] = [flow_dir, [name]]
+            sequences.append(sequence)
+        return [images_dir, flow_dir], sequences
+    return build
+
+
+def build_flying_chairs(split):
+    """
+        FlyingChairs: data/XXXXX_img1.ppm, data/XXXXX_img2.ppm and data/XXXXX_flow.flo,
+        with FlyingChairs_train_val.txt (one line per pair, 1: train, 2: val) to split them.
+        Each image pair is a sequence
+    """
+    def build(root):
+        data_dir = 'data' if os.path.isdir(os.path.join(root, 'data')) else ''
+        names = _names(root, data_dir, ('.ppm', '.flo'))
+        pairs = [name[:-len('_flow.flo')] for name in names if name.endswith('_flow.flo')]
+
+        directories = [data_dir]
+        if split is not None:
+            split_file = os.path.join(root, 'FlyingChairs_train_val.txt')
+            if not os.path.isfile(split_file):
+                raise AssertionError('FlyingChairs_train_val.txt not found in dataset root {r} '
+                                     '(needed to use a split)'.format(r=root))
+            with open(split_file, 'r') as file:
+                labels = file.read().split()
+            wanted = '1' if split == 'train' else '2'
+            pairs = [pair for (pair, label) in zip(pairs, labels) if label == wanted]
+
+        sequences = [{'name': pair, 'images': [data_dir, [pair + '_img1.ppm', pair + '_img2.ppm']],
+                      'flow': [data_dir, [pair + '_flow.flo']]} for pair in pairs]
+        return directories, sequences
+    return build
@@ -0,0 +1,101 @@
+import os
+import imageio
+import numpy as np
+from ..input.file_input import FileInput
+from ..input.flo_data import FloData
+from ..input.rgb_data import RGBData
+
+
+class ImageMaskData(FileInput):
+    """
+        Validity masks stored as 8-bit images where valid pixels are 0
+        (e.g. Sintel's invalid/ images)
+    """
+
+    def _read_file(self, file_path):
+        image = imageio.imread(file_path)
+        if image.ndim == 3:
+            image = image[:, :, 0]
+        return image == 0
+
+    def get_type(self):
+        return 'mask'
+
+    @property
+    def dtype(self):
+        return np.dtype(bool)
+
+
+class Sequence:
+    """
+        Sequence of a dataset, with lazy lists of its data:
+        - images: rgb data, frames 0..n
+        - flow: ground truth flow data from frame i to i + 1 (None if the split has none)
+        - masks: mask data, True where flow is valid (None if all of it is valid)
+    """
+
+    def __init__(self, name, images, flow, masks):
+        self.name = name
+        self.images = images
+        self.flow = flow
+        self.masks = masks
+
+    def __repr__(self):
+        return 'Sequence({n}: {i} images, {f} flow)'.format(
+            n=self.name, i=len(self.images), f=0 if self.flow is None else len(self.flow))
+
+
+class Dataset:
+    """
+        List of sequences of a dataset (see fv.datasets), indexable by position
+        or name. Sequences are created when they are accessed
+    """
+
+    def __init__(self, root, sequences, prefetch, workers, cache):
+        self.root = os.path.abspath(root)
+        self._sequences = sequences  # see dataset_index.load_dataset_index
+        self._positions = {sequence['name']: i for (i, sequence) in enumerate(sequences)}
+        self._options = {'prefetch': prefetch, 'workers': workers, 'cache': cache}
+
+    def __len__(self):
+        return len(self._sequences)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, str):
+            if index not in self._positions:
+                raise KeyError('Dataset has no sequence {n}'.format(n=index))
+            index = self._positions[index]
+        return self._sequence(self._sequences[index])
+
+    @property
+    def names(self):
+        """ Names of the sequences, in order """
+        return [sequence['name'] for sequence in self._sequences]
+
+    @property
+    def frame_count(self):
+        """ Number of ground truth flow frames in all sequences """
+        return sum(len(sequence['flow'][1]) for sequence in self._sequences if 'flow' in sequence)
+
+    def _paths(self, sequence, field):
+        if field not in sequence:
+            return None
+        [directory, names] = sequence[field]
+        return [os.path.join(self.root, directory, name) for name in names]
+
+    def _sequence(self, sequence):
+        images = RGBData(self._paths(sequence, 'images'), **self._options)
+        flow_paths = self._paths(sequence, 'flow')
+        flow = None if flow_paths is None else FloData(flow_paths, **self._options)
+        mask_paths = self._paths(sequence, 'masks')
+        if mask_paths is not None and flow_paths is not None:
+            # masks can be per image (e.g. Sintel), one more than flow frames
+            mask_paths = mask_paths[:len(flow_paths)]
+        if mask_paths is not None:
+            masks = ImageMaskData(mask_paths, **self._options)
+        else:
+            masks = None if flow is None else flow.valid_masks()
+        return Sequence(sequence['name'], images, flow, masks)
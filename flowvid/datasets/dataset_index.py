@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+
+# Index of a dataset: its sequences and the files of each one, relative to the
+# dataset's root. It is cached on disk with the modification times of the
+# directories that were listed to build it, so opening the dataset again only
+# needs to check those times instead of listing every directory
+
+INDEX_VERSION = 1
+INDEX_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'flowvid', 'datasets')
+
+
+def _index_path(kind, root, options):
+    key = '{k}:{r}:{o}:{v}'.format(k=kind, r=root, o=options, v=INDEX_VERSION)
+    return os.path.join(INDEX_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def _stamp(root, directory):
+    """ :returns: Modification time of root/directory, or None if it doesn't exist """
+    try:
+        return os.stat(os.path.join(root, directory)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_index(index_path, root):
+    """ :returns: List of sequences in the index file, or None if it is missing or outdated """
+    try:
+        with open(index_path, 'r') as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        return None
+    stamps = index.get('stamps', {})
+    if any(_stamp(root, directory) != mtime_ns for (directory, mtime_ns) in stamps.items()):
+        return None
+    return index.get('sequences')
+
+
+def _save_index(index_path, root, stamps, sequences):
+    try:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        temp_path = '{p}.{pid}.tmp'.format(p=index_path, pid=os.getpid())
+        with open(temp_path, 'w') as file:
+            json.dump({'root': root, 'stamps': stamps, 'sequences': sequences}, file,
+                      separators=(',', ':'))
+        os.replace(temp_path, index_path)
+    except OSError:
+        pass  # the index is only a cache, e.g. read-only home directory
+
+
+def load_dataset_index(kind, root, options, build):
+    """
+        Load the index of a dataset from the disk cache, building it if needed
+        :param kind: Dataset name, e.g. 'sintel'
+        :param root: Root directory of the dataset
+        :param options: String with the options that change the index (e.g. split)
+        :param build: Function that lists the dataset, build(root) returns
+                      (directories, sequences) where directories are the ones
+                      it listed (relative to root) and sequences a list of dicts:
+                      {'name': ..., <field>: [directory, [file names]], ...}
+        :returns: List of sequences, see build
+    """
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise AssertionError('Dataset root {r} is not a directory'.format(r=root))
+    index_path = _index_path(kind, root, options)
+    sequences = _load_index(index_path, root)
+    if sequences is None:
+        [directories, sequences] = build(root)
+        stamps = {directory: _stamp(root, directory) for directory in directories}
+        _save_index(index_path, root, stamps, sequences)
+    return sequences
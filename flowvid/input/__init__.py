@@ -3,19 +3,34 @@ import numpy as np
 from typing import Union, Tuple
 
 from .flo_data import FloData
+from .flo_pack_data import FloPackData
+from .flo_stream import FloStream
 from .rgb_data import RGBData
+from .video_data import VideoData
+from .video_index import VIDEO_EXTENSIONS
+from .frame_cache import FrameCache
+from .shared_frames import SharedFrames
 from .track_points import TrackPoints, TrackRectangles
 from .point_input import pyplot_prompt
 
 
-def flo(path: str, dir_first: int = 0, dir_total: int = None):
+def flo(path: str, dir_first: int = 0, dir_total: int = None, mmap: bool = False,
+        prefetch: int = 0, workers: int = 1, cache: FrameCache = None, validate: bool = False,
+        scale: float = 1.0, extensions: Tuple[str, ...] = ('.flo', '.floq')):
     """
         Read .flo files and process them as a list of flow data
         Orders files by searching for the first number that appears in its name:
-        for example, if the directory contains "seq_0001.flo" and "seq_0002.flo",
-        it uses "0001" and "0002" as order keys
+        for example, if the directory contains "seq_9.flo" and "seq_10.flo",
+        it uses 9 and 10 as order keys. Directory listings are cached (in memory
+        and in ~/.cache/flowvid) until files are added to or removed from the directory
         Files must be encoded with the Middlebury .flo format:
         http://vision.middlebury.edu/flow/code/flow-code/README.txt
+        or the compact .floq format (see fv.output.flo(...)). A packed flow sequence (.flopack file, see fv.output.flo_pack(...))
+        can also be used, where dir_first/dir_total select frames inside it
+        Other supported formats, read if they are in extensions, are .pfm (e.g. FlyingThings3D,
+        first two channels are used) and .npy/.npz ([h, w, 2] arrays, .npz files use their
+        'flow' array and 'valid' mask)
+        For KITTI 16-bit .png files, see fv.input.kitti_flo(...)
         :param path: Either a file or a directory
         :param dir_first: If path is a directory and contains elements 0..n-1,
                             return elements from range dir_first..n-1
@@ -23,17 +38,86 @@ def flo(path: str, dir_first: int = 0, dir_total: int = None):
         :param dir_total: If path is a directory, set number of elements to return
                             e.g. if it contains elements 0..n-1, return dir_first..dir_first+dir_total
                             (if None, return all elements from the directory)
+        :param mmap: Map files in memory instead of reading them, so each frame is
+                     a read-only view of the file's contents (no copies are made).
+                     Filters that need to modify the data make their own copy.
+        :param prefetch: When iterating, read this number of files in advance
+                         in the background while the current one is processed
+                         (if 0, files are read only when they are needed)
+        :param workers: Number of threads used to read files when prefetch > 0
+        :param cache: Keep decoded frames in this cache (see fv.input.frame_cache(...))
+                      so files that are read again don't go to disk (None for no cache)
+        :param validate: Check the headers of all files in parallel (e.g. that .flo files
+                         are not truncated), raising an error that lists the invalid ones
+        :param scale: Proxy scale in (0, 1] range, for fast previews: read flow at this
+                      fraction of its resolution, averaging the flow of each area, with
+                      vectors measured in pixels of that resolution (e.g. 0.25 for 4K -> 960x540).
+                      Point and rect data stay in pixels of the full resolution, and
+                      operators that use them with scaled data convert their coordinates
+        :param extensions: Extensions of the files to read, e.g. ('.pfm',) or ('.npy', '.npz'),
+                           other files in the directory are ignored (default: .flo and .floq)
         :returns: Iterable and indexable list of flow data
     """
-    return FloData(path, extensions=('.flo'), dir_first=dir_first, dir_total=dir_total)
+    if path.endswith('.flopack'):
+        return FloPackData(path, dir_first=dir_first, dir_total=dir_total, mmap=mmap,
+                           prefetch=prefetch, workers=workers, cache=cache, scale=scale)
+    return FloData(path, extensions=extensions, dir_first=dir_first,
+                   dir_total=dir_total, mmap=mmap, prefetch=prefetch, workers=workers, cache=cache,
+                   validate=validate, scale=scale)
 
 
-def rgb(path: str, dir_first: int = 0, dir_total: int = None):
+def kitti_flo(path: str, dir_first: int = 0, dir_total: int = None, prefetch: int = 0, workers: int = 1,
+              cache: FrameCache = None, validate: bool = False, scale: float = 1.0):
+    """
+        Read KITTI flow files (16-bit .png) and process them as a list of flow data
+        Each pixel stores u, v (as value * 64 + 2^15) and whether the flow is valid,
+        invalid pixels are read as zero flow. Its masks (see valid_masks()) are used
+        by fv.endpoint_error(...) so invalid pixels don't have error
+        See fv.input.flo(...) for the rest of parameters
+        :returns: Iterable and indexable list of flow data
+    """
+    return FloData(path, extensions=('.png',), dir_first=dir_first, dir_total=dir_total,
+                   prefetch=prefetch, workers=workers, cache=cache, validate=validate, scale=scale)
+
+
+def flo_stream(source, record_format: str = 'flo', policy: str = 'block', buffer: int = 8,
+               max_latency: float = None, frames: int = None):
+    """
+        Read flow data from a stream as it is produced, e.g. the output pipe of a
+        running flow estimator. Frames are read in a background thread and can be
+        used with any operator and output, which process them as they arrive.
+        A stream is iterated once (iterating again continues with the next frames)
+        :param source: File object (e.g. sys.stdin.buffer or a subprocess' stdout),
+                       socket, or path of a unix socket or named pipe
+        :param record_format: How frames are stored in the stream:
+                              - 'flo': concatenated .flo files (header + data)
+                              - 'raw': one .flo header, followed by frames without header
+        :param policy: What to do when frames arrive faster than they are processed:
+                       - 'block': stop reading, so the producer waits for the consumer
+                       - 'drop': keep reading, dropping the oldest frames
+        :param buffer: Number of frames that can wait to be processed
+        :param max_latency: With the 'drop' policy, drop frames that waited longer than
+                            this number of seconds, if there are newer ones (None to keep them)
+        :param frames: Number of frames to read (if None, read until the stream ends,
+                       and as the length isn't known, len() raises TypeError)
+        :returns: Iterable list of flow data, with a stats() method (received, dropped
+                  frames and latency) and a close() method to stop reading
+    """
+    return FloStream(source, record_format=record_format, policy=policy, buffer=buffer,
+                     max_latency=max_latency, frames=frames)
+
+
+def rgb(path: str, dir_first: int = 0, dir_total: int = None, prefetch: int = 0, workers: int = 1,
+        cache: FrameCache = None, validate: bool = False, processes: int = 0, scale: float = 1.0):
     """
         Read .png/.bmp/.jpg/.jpeg files and process them as a list of RGB data
         Orders files by searching for the first number that appears in its name:
-        for example, if the directory contains "seq_0001.png" and "seq_0002.png",
-        it uses "0001" and "0002" as order keys
+        for example, if the directory contains "seq_9.png" and "seq_10.png",
+        it uses 9 and 10 as order keys (see fv.input.flo(...))
+        A video file (.mp4/.m4v/.mov/.avi/.mkv/.webm) can also be used, whose frames are
+        decoded with ffmpeg (no need to extract them), where dir_first/dir_total select
+        frames inside it. Indexing seeks from the closest keyframe, using an index
+        which is cached in ~/.cache/flowvid so it is only built once per video
         :param path: Either a file or a directory
         :param dir_first: If path is a directory and contains elements 0..n-1,
                             return elements from range dir_first..n-1
@@ -41,9 +125,59 @@ def rgb(path: str, dir_first: int = 0, dir_total: int = None):
         :param dir_total: If path is a directory, set number of elements to return
                             e.g. if it contains elements 0..n-1, return dir_first..dir_first+dir_total
                             (if None, return all elements from the directory)
+        :param prefetch: When iterating, read this number of images in advance
+                         in the background while the current one is processed
+                         (if 0, images are read only when they are needed)
+        :param workers: Number of threads used to read images when prefetch > 0 (videos
+                        are decoded in order by one thread)
+        :param cache: Keep decoded frames in this cache (see fv.input.frame_cache(...))
+                      so images that are read again don't go to disk (None for no cache)
+        :param validate: Check the structure of all images in parallel (not for videos),
+                         raising an error that lists the invalid ones
+        :param processes: Decode images in this number of worker processes (not for videos),
+                          which hand them back through shared memory. Faster than threads
+                          for big images (e.g. 1080p PNG), as decoding holds the GIL.
+                          At most prefetch images (or 2 * processes if prefetch is 0)
+                          are decoded ahead of the one being processed. The processes are
+                          started once and used by every iteration, until close() is called
+                          (or "with" ends)
+        :param scale: Proxy scale in (0, 1] range, for fast previews: decode images at this
+                      fraction of their resolution (JPEG images are decoded directly at a
+                      smaller size), averaging the color of each area (see fv.input.flo(...))
         :returns: Iterable and indexable list of RGB data
     """
-    return RGBData(path, extensions=('.png', '.bmp', '.jpg', '.jpeg'), dir_first=dir_first, dir_total=dir_total)
+    if path.endswith(VIDEO_EXTENSIONS):
+        return VideoData(path, dir_first=dir_first, dir_total=dir_total,
+                         prefetch=prefetch, cache=cache, scale=scale)
+    return RGBData(path, extensions=('.png', '.bmp', '.jpg', '.jpeg'), dir_first=dir_first, dir_total=dir_total,
+                   prefetch=prefetch, workers=workers, cache=cache, validate=validate, processes=processes,
+                   scale=scale)
+
+
+def frame_cache(max_bytes: int = 512 * 1024 * 1024):
+    """
+        Cache of decoded frames that can be shared by multiple inputs
+        (see the cache parameter of fv.input.flo(...) and fv.input.rgb(...)).
+        When it is full, the least recently used frames are discarded.
+        Frames are identified by their file path and modification time.
+        :param max_bytes: Maximum size of all cached frames, in bytes (default: 512 MiB)
+        :returns: Frame cache, with hits/misses counters (see its stats method)
+    """
+    return FrameCache(max_bytes)
+
+
+def shared(name: str):
+    """
+        Attach to frames preloaded in shared memory by another process
+        (see the preload method of fv.input.flo(...) and fv.input.rgb(...)), e.g.:
+            frames = fv.input.flo('path/to/dir').preload(shared=True)  # main process
+            frames = fv.input.shared(name)  # worker process, name is frames.name
+        Frames are read-only views of the shared memory, so no copies are made.
+        The process that preloaded them frees the memory when it closes them
+        :param name: Name of the shared memory block
+        :returns: Iterable and indexable list of the preloaded data
+    """
+    return SharedFrames.attach(name)
 
 
 def points(custom_points: np.ndarray):
@@ -1,18 +1,48 @@
+import copy
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from ..core.filterable import Filterable
+from ..core.filters.crop import crop_shape
+from ..core.util.resize import resize_frame, scaled_shape
+from ..core.util.prefetch import prefetch_map
+from .frame_cache import FrameCache
+from .manifest import list_directory
+from .shared_frames import SharedFrames
 
 
 class FileInput(Filterable):
     """
         Utility to read files and directories with required extensions
         Only returns filenames, file processing should be done in a subclass
+        Subclasses should implement _read_file, which reads one frame (entry).
+        By default there is one entry per file, but subclasses that
+        store multiple frames per file can change it (see _entries)
     """
 
-    def __init__(self, source, extensions=None, dir_first=None, dir_total=None):
+    _prefetch = 0  # for subclasses that don't read files (see TrackPoints)
+    _scale = 1.0
+
+    def __init__(self, source, extensions=None, dir_first=None, dir_total=None,
+                 prefetch=0, workers=1, cache=None, validate=False, scale=1.0):
         Filterable.__init__(self)
-        if os.path.isfile(source) and (extensions is None or source.endswith(extensions)):
+        if scale <= 0 or scale > 1:
+            raise AssertionError(
+                'scale should be in (0, 1] range but it is {n}'.format(n=scale))
+        if prefetch < 0:
+            raise AssertionError(
+                'prefetch should be 0 or bigger but it is {n}'.format(n=prefetch))
+        if workers < 1:
+            raise AssertionError(
+                'workers should be bigger than 0 but it is {n}'.format(n=workers))
+        if cache is not None and not isinstance(cache, FrameCache):
+            raise AssertionError(
+                'cache should be a frame cache, see fv.input.frame_cache(...)')
+        if isinstance(source, (list, tuple)):
+            self.source = list(source)
+            if not self.source:
+                raise AssertionError('Source list is empty')
+        elif os.path.isfile(source) and (extensions is None or source.endswith(extensions)):
             self.source = [source]
         elif os.path.isdir(source):
             self.source = (FileInput.__list_directory(
@@ -20,14 +50,206 @@ class FileInput(Filterable):
         else:
             raise AssertionError('Source ({s}) does not exist{extra}'.format(
                 s=source, extra='' if extensions is None else ' or doesn\'t contain files with extension {e}'.format(e=extensions)))
+        self._prefetch = prefetch
+        self._workers = workers
+        self._cache = cache
+        self._crop = None  # (x0, y0, x1, y1) region to read from each frame
+        self._scale = scale  # proxy resolution, see _read_scaled
+        if validate:
+            self._validate_files()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Stop what reads the files in the background (e.g. decoder processes), if anything """
+        pass
+
+    def _items(self):
+        return self._load_all(self._entries())
+
+    def _load_all(self, entries):
+        """
+            :param entries: List of entries (see _entries)
+            :returns: Iterator over the data read from each entry, in order
+        """
+        if self._prefetch > 0:
+            return prefetch_map(self._load, entries, self._prefetch, self._workers)
+        return (self._load(entry) for entry in entries)
+
+    def _length(self):
+        return len(self._entries())
+
+    def _get_item(self, index):
+        return self._load(self._entries()[index])
+
+    def _iter_random(self, indices):
+        entries = self._entries()
+        items = self._load_all([entries[i] for i in indices])
+        return (self._apply_filters(item) for item in items)
+
+    def _entries(self):
+        """
+            :returns: Indexable list with one entry per frame, that _read_file
+                      knows how to read (by default, the files from source)
+        """
+        return self.source
+
+    def _load(self, entry):
+        """
+            Read an entry, going through the frame cache if there is one
+            :param entry: One of the entries from _entries
+            :returns: Data read from that entry
+        """
+        if self._cache is None:
+            return self._read_cropped(entry)
+
+        key = self._cache_key(entry)
+        frame = self._cache.get(key)
+        if frame is None:
+            frame = self._read_cropped(entry)
+            self._cache.put(key, frame)
+        return frame
+
+    def _cache_key(self, entry):
+        """ :returns: Key of the data read from entry in the frame cache """
+        return (self.__class__.__name__, self._entry_key(entry), self._read_options(),
+                self._crop, self._scale)
+
+    def _read_cropped(self, entry):
+        if self._scale != 1.0:
+            # the region is in coordinates of the scaled frame
+            data = self._read_scaled(entry)
+            if self._crop is None:
+                return data
+            [x0, y0, x1, y1] = self._crop
+            return np.ascontiguousarray(data[y0:y1, x0:x1])
+        if self._crop is None:
+            return self._read_file(entry)
+        return self._read_region(entry, self._crop)
+
+    def _read_scaled(self, entry):
+        """
+            Read an entry at proxy resolution (see scale). Subclasses that can
+            decode it at a smaller size without decoding all of it should override it
+            :param entry: One of the entries from _entries
+            :returns: Data read from that entry, resized to scale
+        """
+        return resize_frame(self._read_file(entry), self.get_type(), self._scale)
+
+    def _read_region(self, entry, box):
+        """
+            Read a region of interest of an entry. Subclasses that can read it
+            without reading the whole frame should override it
+            :param entry: One of the entries from _entries
+            :param box: (x0, y0, x1, y1) region of interest
+            :returns: [y0:y1, x0:x1] of the data read from that entry
+        """
+        [x0, y0, x1, y1] = box
+        # copy so the rest of the frame can be freed
+        return np.ascontiguousarray(self._read_file(entry)[y0:y1, x0:x1])
+
+    def _pushdown_crop(self, box):
+        if self._filters or self.get_type() not in ('flo', 'rgb', 'mask'):
+            return None  # filters need to see the whole frame
+        if self._crop is not None:
+            # box is relative to the current region
+            [cx0, cy0, cx1, cy1] = self._crop
+            [x0, y0, x1, y1] = box
+            box = (cx0 + x0, cy0 + y0, min(cx1, cx0 + x1), min(cy1, cy0 + y1))
+        other = copy.copy(self)
+        other._crop = box
+        other._source_id = object()  # it reads other elements
+        return other
+
+    def preload(self, first=0, total=None, shared=True):
+        """
+            Read (and decode) frames once and keep them in memory, e.g. so worker
+            processes don't read the same files again. Filters are applied before storing them
+            :param first: First frame to preload
+            :param total: Number of frames to preload (if None, all frames from first)
+            :param shared: Store frames in a shared memory block, which other processes
+                           can attach to with fv.input.shared(name) (or by receiving the
+                           preloaded object), getting views of it without copies
+            :returns: Iterable and indexable list of the preloaded frames, which frees
+                      the memory when it is closed (use "with" or its close() method)
+        """
+        n = len(self)
+        if first < 0 or first >= n:
+            raise AssertionError('first should be in 0..{m} range but it is {f}'.format(m=n - 1, f=first))
+        if total is None:
+            total = n - first
+        if total < 1 or first + total > n:
+            raise AssertionError('total should be in 1..{m} range but it is {t}'.format(m=n - first, t=total))
+        return SharedFrames.create(self[first:first + total], total, self.get_type(), self._scale, shared)
+
+    @property
+    def scale(self):
+        return self._scale
+
+    def _output_shape(self, shape):
+        """
+            :param shape: Shape of a whole frame as stored in the file
+            :returns: Shape of the frame returned by this input (after scaling, cropping and filters)
+        """
+        shape = scaled_shape(shape, self._scale)
+        if self._crop is not None:
+            shape = crop_shape(shape, self._crop)
+        return self._filtered_shape(shape)
+
+    def _entry_key(self, entry):
+        """
+            :param entry: One of the entries from _entries
+            :returns: Hashable key for the contents of entry in the frame cache
+        """
+        # modification time invalidates cached frames of rewritten files
+        return (entry, os.stat(entry).st_mtime_ns)
 
-    def __len__(self):
-        return len(self.source)
+    def _read_options(self):
+        """
+            :returns: Hashable tuple with the options that change what
+                      _read_file returns, so they are part of the cache key
+        """
+        return ()
+
+    def _read_file(self, entry):
+        """
+            :param entry: One of the entries from _entries (by default, a file path)
+            :returns: Data read from that entry (e.g. [h, w, 2] flow ndarray)
+        """
+        raise NotImplementedError("Whoops. Contact the owner of the repo.")
+
+    def _validate_file(self, file_path):
+        """
+            Check that a file is not truncated or corrupt, without reading all of it
+            (e.g. compare its header to its size). Subclasses can implement it
+            :param file_path: One of the files from source
+            :raises AssertionError: If the file is not valid
+        """
+        pass
+
+    def _validate_files(self):
+        """ Validate all files from source in parallel (see _validate_file) """
+        def error(file_path):
+            try:
+                self._validate_file(file_path)
+                return None
+            except (AssertionError, OSError, ValueError) as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=max(self._workers, 4)) as executor:
+            errors = [e for e in executor.map(error, self.source) if e is not None]
+        if errors:
+            raise AssertionError('{n} invalid file(s):\n{e}'.format(
+                n=len(errors), e='\n'.join(errors)))
 
     @staticmethod
     def __list_directory(directory, extensions, dir_first, dir_total):
         """
-            List all files in directory
+            List all files in directory (see manifest.list_directory)
             :param directory: Directory to be checked
             :param extensions: Filter file extensions from that type
                                If None, don't filter extensions
@@ -38,25 +260,15 @@ class FileInput(Filterable):
                               If None, get all elements from the first one
             :returns: List of filenames (strings)
         """
-        pattern = re.compile(r'\d+')
-        name_list = [f for f in os.listdir(directory) if (
-            extensions is None or f.endswith(extensions))]
-        file_list = []  # (index, name) tuples
+        file_names = list_directory(directory, extensions)
 
-        if not name_list:
+        if not file_names:
             raise AssertionError(
                 'There are no {f} files in directory {d}'.format(f=extensions, d=directory))
 
-        for name in name_list:
-            match = pattern.search(name)
-            if match is not None:
-                file_index = match[0]
-                file_path = os.path.join(directory, name)
-                file_list.append((file_index, file_path))
-        file_list = sorted(file_list, key=lambda tuple: tuple[0])
-
+        if dir_first is None:
+            dir_first = 0
         if dir_total is None:
-            dir_total = len(file_list) - dir_first
+            dir_total = len(file_names) - dir_first
 
-        file_names = [file_tuple[1] for file_tuple in file_list]
         return file_names[dir_first:dir_first+dir_total]
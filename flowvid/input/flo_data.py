@@ -1,49 +1,269 @@
 import os
 import re
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
 import numpy as np
 from ..core.filterable import Filterable
+from ..core.util.flow_codec import COMPACT_EXTENSION, decode_flow, read_compact_header
+from ..core.util.resize import resize_flow
 from .file_input import FileInput
+from .flow_formats import FLOW_READERS, read_flow_size, read_npy_flow
 
 
 class FloData(FileInput):
-    """ Flow data (.flo) reader """
+    """
+        Flow data reader: Middlebury (.flo), compact (.floq), KITTI (16-bit .png),
+        PFM (.pfm) and numpy (.npy/.npz) files
+    """
 
-    def _items(self):
-        return (FloData._read_flow(filename) for filename in self.source)
+    # formats that can have a validity mask
+    MASK_EXTENSIONS = ('.png', '.npz')
+
+    def __init__(self, source, extensions=None, dir_first=None, dir_total=None,
+                 mmap=False, prefetch=0, workers=1, cache=None, validate=False, scale=1.0):
+        FileInput.__init__(self, source, extensions, dir_first, dir_total,
+                           prefetch, workers, cache, validate, scale)
+        self._mmap = mmap
+        self._decodes = _SharedDecodes()  # shared with its masks, see valid_masks
+
+    def _read_file(self, file_path):
+        if file_path.endswith(FloData.MASK_EXTENSIONS):
+            return self._decodes.read(file_path)[0]
+        return FloData._read_flow(file_path, self._mmap)
+
+    def _read_options(self):
+        return (self._mmap,)
+
+    def _read_scaled(self, file_path):
+        if not file_path.endswith(FloData.MASK_EXTENSIONS):
+            return FileInput._read_scaled(self, file_path)
+        # invalid pixels (read as zero flow) don't count in the mean of each area
+        [flow, valid] = self._decodes.read(file_path)
+        return resize_flow(flow, self._scale, valid)
+
+    def _validate_file(self, file_path):
+        if file_path.endswith(tuple(FLOW_READERS)):
+            read_flow_size(file_path)
+            return
+        with open(file_path, 'rb') as file:
+            if file_path.endswith(COMPACT_EXTENSION):
+                read_compact_header(file, file_path)
+            else:
+                FloData._read_header(file, file_path)  # also checks the file size
+
+    def _read_region(self, file_path, box):
+        if file_path.endswith(COMPACT_EXTENSION) or file_path.endswith(tuple(FLOW_READERS)):
+            return FileInput._read_region(self, file_path, box)
+
+        # .flo files are stored by rows, read only rows y0..y1
+        [x0, y0, x1, y1] = box
+        with open(file_path, 'rb') as file:
+            [width, height] = FloData._read_header(file, file_path)
+            [y0, y1] = [min(y0, height), min(y1, height)]
+            row_offset = FloData.HEADER_BYTES + 4 * 2 * width * y0
+            if self._mmap:
+                rows = np.memmap(file, dtype=np.float32, mode='r', offset=row_offset,
+                                 shape=(y1 - y0, width, 2)).view(np.ndarray)
+                return rows[:, x0:x1]
+            file.seek(row_offset)
+            rows = np.fromfile(file, dtype=np.float32, count=(y1 - y0) * width * 2)
+        return np.ascontiguousarray(rows.reshape((y1 - y0, width, 2))[:, x0:x1])
 
     def get_type(self):
         return 'flo'
 
-    def __getitem__(self, index):
-        if index < 0 or index >= len(self):
-            raise IndexError('Index out of range')
-        return FloData._read_flow(self.source[index])
+    def valid_masks(self):
+        """
+            :returns: List of [h, w] bool masks (True where the flow is valid)
+                      if the files' format has them (KITTI .png, .npz), else None
+        """
+        if not any(f.endswith(FloData.MASK_EXTENSIONS) for f in self.source):
+            return None
+        masks = FlowMaskData(self.source, prefetch=self._prefetch,
+                             workers=self._workers, cache=self._cache, scale=self._scale)
+        masks._crop = self._crop
+        masks._decodes = self._decodes  # each file is decoded once for its flow and mask
+        return masks
+
+    @property
+    def shape(self):
+        """ (h, w, 2) shape of the flow data, read from the first file's header """
+        file_path = self.source[0]
+        if file_path.endswith(tuple(FLOW_READERS)):
+            [width, height] = read_flow_size(file_path)
+            return self._output_shape((height, width, 2))
+        with open(file_path, 'rb') as file:
+            if file_path.endswith(COMPACT_EXTENSION):
+                [_, _, _, width, height] = read_compact_header(file, file_path)
+            else:
+                [width, height] = FloData._read_header(file, file_path)
+        return self._output_shape((height, width, 2))
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
 
     TAG_FLOAT = 202021.25
+    HEADER_BYTES = 12  # tag (float32) + width (int32) + height (int32)
+
+    @staticmethod
+    def _read_header(file, file_path):
+        """
+            Read and validate the .flo header, checking it against the file size
+            :param file: File object of the flo file, positioned at its start
+            :param file_path: File path of flo file (used for error messages)
+            :returns: (width, height) of the flow data
+        """
+        tag = np.frombuffer(file.read(4), dtype=np.float32, count=1)[0]
+        if not tag == FloData.TAG_FLOAT:
+            raise AssertionError(
+                'File {f} has wrong tag ({t})'.format(f=file_path, t=tag))
+
+        [width, height] = np.frombuffer(
+            file.read(8), dtype=np.int32, count=2)
+        if width <= 0 or height <= 0:
+            raise AssertionError('File {f} has invalid size ({w}x{h})'.format(
+                f=file_path, w=width, h=height))
+
+        # u (horizontal) and v (vertical) float32 values for each pixel
+        expected_size = FloData.HEADER_BYTES + 4 * 2 * int(width) * int(height)
+        file_size = os.fstat(file.fileno()).st_size
+        if file_size != expected_size:
+            raise AssertionError('File {f} is {s} bytes long but its header ({w}x{h}) requires {e} bytes '
+                                 '(truncated or corrupt file?)'.format(f=file_path, s=file_size, w=width, h=height, e=expected_size))
+
+        return int(width), int(height)
+
+    @staticmethod
+    def _read_compact_flow(file_path):
+        """
+            :param file_path: File path of compact flow file (.floq),
+                              see fv.output.flo(...) with encoding/compression
+            :returns: [h, w, 2] float32 ndarray
+        """
+        with open(file_path, 'rb') as file:
+            [encoding, compression, param, width, height] = read_compact_header(
+                file, file_path)
+            payload = file.read()
+        try:
+            return decode_flow(payload, encoding, compression, param, height, width)
+        except (ValueError, zlib.error):
+            raise AssertionError(
+                'File {f} is truncated or corrupt'.format(f=file_path))
 
     @staticmethod
-    def _read_flow(file_path):
+    def _read_flow(file_path, mmap=False):
         """
             :param file_path: File path of flo file
+            :param mmap: Map the file in memory instead of reading it. The returned
+                         array is a read-only view of the file (no copies are made)
+                         Only used for .flo and .npy files, other formats are decoded
             :returns: [h, w, 2] ndarray where
                         [:, :, 0] = u (horizontal flow in pixels)
                         [:, :, 1] = v (vertical flow in pixels)
         """
-        with open(file_path, 'rb') as file:
-            tag = np.frombuffer(file.read(4), dtype=np.float32, count=1)[0]
-            if not tag == FloData.TAG_FLOAT:
-                raise AssertionError(
-                    'File {f} has wrong tag ({t})'.format(f=file_path, t=tag))
+        if file_path.endswith(COMPACT_EXTENSION):
+            return FloData._read_compact_flow(file_path)
+        if file_path.endswith('.npy'):
+            return read_npy_flow(file_path, mmap)[0]
+        for extension, reader in FLOW_READERS.items():
+            if file_path.endswith(extension):
+                return reader(file_path)[0]
 
-            [width, height] = np.frombuffer(
-                file.read(8), dtype=np.int32, count=2)
+        with open(file_path, 'rb') as file:
+            [width, height] = FloData._read_header(file, file_path)
 
             dimensions = 2  # u (horizontal) and v (vertical)
-            items = width * height * dimensions
+            if mmap:
+                flow = np.memmap(file, dtype=np.float32, mode='r', offset=FloData.HEADER_BYTES,
+                                 shape=(height, width, dimensions))
+                return flow.view(np.ndarray)
 
             # read flow values from file
-            flow = np.frombuffer(file.read(4 * items),
-                                 dtype=np.float32, count=items)
-            flow = np.resize(flow, (height, width, dimensions))
+            items = width * height * dimensions
+            flow = np.fromfile(file, dtype=np.float32, count=items)
+
+        return flow.reshape((height, width, dimensions))
+
+
+class FlowMaskData(FileInput):
+    """ Validity masks of flow files, see FloData.valid_masks """
+
+    _decodes = None  # decodes shared with the flow data
+
+    def _read_file(self, file_path):
+        for extension in FloData.MASK_EXTENSIONS:
+            if file_path.endswith(extension):
+                if self._decodes is not None:
+                    [flow, valid] = self._decodes.read(file_path)
+                else:
+                    [flow, valid] = FLOW_READERS[extension](file_path)
+                if valid is not None:
+                    return valid
+                return np.ones(flow.shape[0:2], dtype=bool)
+        [height, width] = FloData(file_path).shape[0:2]
+        return np.ones((height, width), dtype=bool)
 
-        return flow
+    def get_type(self):
+        return 'mask'
+
+    @property
+    def dtype(self):
+        return np.dtype(bool)
+
+
+class _SharedDecodes:
+    """
+        Flow files with masks (KITTI .png, .npz) are decoded into both flow and mask,
+        which are read by different filterables (the flow data and its valid_masks).
+        The last decoded files are kept here for every reader, so reading both
+        (e.g. for the endpoint error) decodes each file once.
+        Results are read-only, as they are returned to all readers
+    """
+
+    SIZE = 8  # decoded files that are kept, older ones are discarded
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._decoded = OrderedDict()  # file path -> future with (flow, valid)
+
+    def __getstate__(self):
+        # copies sent to other processes start empty
+        return {}
+
+    def __setstate__(self, state):
+        _SharedDecodes.__init__(self)
+
+    def read(self, file_path):
+        """
+            :param file_path: Flow file with a mask format (see FLOW_READERS)
+            :returns: (flow, valid) of the file (valid can be None)
+        """
+        with self._lock:
+            decoded = self._decoded.get(file_path)
+            decoding = decoded is None
+            if decoding:
+                # other readers wait for this decode while it's running
+                decoded = Future()
+                self._decoded[file_path] = decoded
+                while len(self._decoded) > _SharedDecodes.SIZE:
+                    self._decoded.popitem(last=False)
+            else:
+                self._decoded.move_to_end(file_path)
+        if not decoding:
+            return decoded.result()
+        try:
+            [flow, valid] = FLOW_READERS[os.path.splitext(file_path)[1]](file_path)
+        except BaseException as e:
+            with self._lock:
+                if self._decoded.get(file_path) is decoded:
+                    del self._decoded[file_path]  # next reads try again
+            decoded.set_exception(e)
+            raise
+        flow.flags.writeable = False
+        if valid is not None:
+            valid.flags.writeable = False
+        decoded.set_result((flow, valid))
+        return (flow, valid)
@@ -0,0 +1,74 @@
+import os
+import numpy as np
+from ..core.util.flo_pack import PACK_EXTENSION, read_pack_header
+from ..core.util.flow_codec import decode_flow
+from .file_input import FileInput
+
+
+class FloPackData(FileInput):
+    """
+        Packed flow sequence (.flopack) reader, see fv.output.flo_pack(...)
+        All frames are stored in one file, with an index for random access
+    """
+
+    def __init__(self, source, dir_first=0, dir_total=None, mmap=False,
+                 prefetch=0, workers=1, cache=None, scale=1.0):
+        if not os.path.isfile(source):
+            raise AssertionError('Source ({s}) does not exist'.format(s=source))
+        FileInput.__init__(self, source, (PACK_EXTENSION,),
+                           prefetch=prefetch, workers=workers, cache=cache, scale=scale)
+        with open(source, 'rb') as file:
+            [self._width, self._height, self._index] = read_pack_header(file, source)
+
+        # dir_first/dir_total select frames from the sequence
+        frame_count = len(self._index)
+        if dir_total is None:
+            dir_total = frame_count - dir_first
+        self._frames = range(frame_count)[dir_first:dir_first+dir_total]
+        self._mmap = mmap
+
+    def _entries(self):
+        return self._frames
+
+    def _entry_key(self, entry):
+        return (self.source[0], os.stat(self.source[0]).st_mtime_ns, entry)
+
+    def _read_options(self):
+        return (self._mmap,)
+
+    def _read_file(self, entry):
+        """
+            :param entry: Frame number inside the packed file
+            :returns: [h, w, 2] flow ndarray
+        """
+        record = self._index[entry]
+        offset = int(record['offset'])
+        nbytes = int(record['nbytes'])
+        if self._mmap:
+            # only the pages of this frame are read
+            payload = np.memmap(self.source[0], dtype=np.uint8, mode='r',
+                                offset=offset, shape=(nbytes,))
+        else:
+            with open(self.source[0], 'rb') as file:
+                file.seek(offset)
+                payload = file.read(nbytes)
+            if len(payload) != nbytes:
+                raise AssertionError('File {f} is truncated (frame {i})'.format(
+                    f=self.source[0], i=entry))
+        return decode_flow(payload, record['encoding'], record['compression'],
+                           record['param'], self._height, self._width)
+
+    def get_type(self):
+        return 'flo'
+
+    def valid_masks(self):
+        """ Packed flow has no validity masks, see FloData.valid_masks """
+        return None
+
+    @property
+    def shape(self):
+        return self._output_shape((self._height, self._width, 2))
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
@@ -0,0 +1,305 @@
+import os
+import select
+import socket
+import stat
+import threading
+import time
+from collections import deque
+import numpy as np
+from ..core.filterable import Filterable
+from ..core.util.progress import UNBOUNDED_LENGTH
+from .flo_data import FloData
+
+POLL_SECONDS = 0.1  # how often the reader checks if it was closed while waiting for data
+
+STREAM_POLICIES = ('block', 'drop')
+STREAM_FORMATS = ('flo', 'raw')
+
+
+class _StreamReader:
+    """
+        Background thread that parses flow frames from a stream and hands them
+        to the consumer through a bounded queue (see FloStream)
+    """
+
+    def __init__(self, source, record_format, policy, buffer, max_latency):
+        self._file = None
+        self._socket = None
+        self._close_file = False
+        self._poll_fd = None  # fd polled before each read, so closing doesn't wait for data
+        self._open(source)
+        self._format = record_format
+        self._policy = policy
+        self._buffer = buffer
+        self._max_latency = max_latency
+
+        self._queue = deque()  # (arrival time, frame)
+        self._condition = threading.Condition()
+        self._size = None  # (width, height), known after the first header
+        self._ended = False
+        self._error = None
+        self._closed = False
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='flowvid-stream', daemon=True)
+        self._thread.start()
+
+    def __deepcopy__(self, memo):
+        # filtered copies of a stream read from the same stream
+        return self
+
+    def _open(self, source):
+        if isinstance(source, socket.socket):
+            self._socket = source
+            self._file = source.makefile('rb')
+            self._close_file = True
+        elif isinstance(source, str):
+            if not os.path.exists(source):
+                raise AssertionError('Source ({s}) does not exist'.format(s=source))
+            if stat.S_ISSOCK(os.stat(source).st_mode):
+                self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._socket.connect(source)
+                self._file = self._socket.makefile('rb')
+            else:
+                # unbuffered, so polling its fd tells if there is data to read
+                self._file = open(source, 'rb', buffering=0)  # e.g. named pipe
+                self._poll_fd = self._file.fileno()
+            self._close_file = True
+        elif hasattr(source, 'read'):
+            self._file = source
+        else:
+            raise AssertionError('Source should be a file object (e.g. a pipe), '
+                                 'a socket or the path of a unix socket or named pipe')
+
+    def _read_exact(self, n):
+        """ :returns: bytearray with the next n bytes, or None if the stream ended before them """
+        data = bytearray(n)
+        view = memoryview(data)
+        read = 0
+        while read < n:
+            if not self._wait_readable():
+                return None  # closed
+            if hasattr(self._file, 'readinto'):
+                count = self._file.readinto(view[read:])
+            else:
+                chunk = self._file.read(n - read)
+                count = len(chunk) if chunk else 0
+                view[read:read + count] = chunk
+            if not count:
+                if read > 0:
+                    raise AssertionError('Stream ended in the middle of a frame ({r} of {n} bytes)'.format(
+                        r=read, n=n))
+                return None
+            read += count
+        return data
+
+    def _wait_readable(self):
+        """ :returns: False if the reader was closed while waiting for data """
+        if self._poll_fd is None:
+            return True  # sockets are woken up by close, other files aren't ours to close
+        while not self._closed:
+            if select.select([self._poll_fd], [], [], POLL_SECONDS)[0]:
+                return True
+        return False
+
+    def _read_header(self):
+        """ :returns: (width, height) of the next .flo header, or None if the stream ended """
+        header = self._read_exact(FloData.HEADER_BYTES)
+        if header is None:
+            return None
+        tag = np.frombuffer(header, dtype=np.float32, count=1)[0]
+        if not tag == FloData.TAG_FLOAT:
+            raise AssertionError('Stream has a frame with wrong tag ({t})'.format(t=tag))
+        [width, height] = np.frombuffer(header, dtype=np.int32, count=2, offset=4)
+        if width <= 0 or height <= 0:
+            raise AssertionError('Stream has a frame with invalid size ({w}x{h})'.format(
+                w=width, h=height))
+        return (int(width), int(height))
+
+    def _read_frame(self):
+        """ :returns: [h, w, 2] float32 ndarray with the next frame, or None if the stream ended """
+        if self._format == 'flo' or self._size is None:
+            size = self._read_header()
+            if size is None:
+                return None
+            if self._size is None:
+                with self._condition:
+                    self._size = size
+                    self._condition.notify_all()
+            elif size != self._size:
+                raise AssertionError('All frames should have size {w}x{h} but one is {w2}x{h2}'.format(
+                    w=self._size[0], h=self._size[1], w2=size[0], h2=size[1]))
+        [width, height] = self._size
+        data = self._read_exact(4 * 2 * width * height)
+        if data is None:
+            return None
+        return np.frombuffer(data, dtype=np.float32).reshape((height, width, 2))
+
+    def _run(self):
+        try:
+            while not self._closed:
+                frame = self._read_frame()
+                if frame is None:
+                    break
+                self._put(frame)
+        except Exception as error:  # reported to the consumer
+            if not self._closed:
+                self._error = error
+        if self._close_file:
+            # closed here, as closing it from the consumer waits for a blocked read
+            self._file.close()
+            if self._socket is not None:
+                self._socket.close()
+        with self._condition:
+            self._ended = True
+            self._condition.notify_all()
+
+    def _put(self, frame):
+        with self._condition:
+            if self._policy == 'block':
+                # the producer waits (its pipe/socket buffer fills up)
+                while len(self._queue) >= self._buffer and not self._closed:
+                    self._condition.wait()
+            else:
+                while len(self._queue) >= self._buffer:
+                    self._queue.popleft()
+                    self.dropped += 1
+            self._queue.append((time.monotonic(), frame))
+            self.received += 1
+            self._condition.notify_all()
+
+    def get(self):
+        """ :returns: Next frame, or None if the stream ended """
+        with self._condition:
+            while not self._queue and not self._ended and not self._closed:
+                self._condition.wait()
+            if not self._queue:
+                if self._error is not None:
+                    raise self._error
+                return None
+            now = time.monotonic()
+            if self._max_latency is not None:
+                # skip frames that are too old, as long as there are newer ones
+                while len(self._queue) > 1 and now - self._queue[0][0] > self._max_latency:
+                    self._queue.popleft()
+                    self.dropped += 1
+            [arrival, frame] = self._queue.popleft()
+            self.delivered += 1
+            self.last_latency = now - arrival
+            self.max_latency = max(self.max_latency, self.last_latency)
+            self._total_latency += self.last_latency
+            self._condition.notify_all()
+            return frame
+
+    def size(self):
+        """ :returns: (width, height) of the frames, waiting for the first header if needed """
+        with self._condition:
+            while self._size is None and not self._ended and not self._closed:
+                self._condition.wait()
+            if self._size is None:
+                if self._error is not None:
+                    raise self._error
+                raise AssertionError('Stream ended before its first frame')
+            return self._size
+
+    def stats(self):
+        with self._condition:
+            return {'received': self.received, 'delivered': self.delivered,
+                    'dropped': self.dropped, 'queued': len(self._queue),
+                    'latency': self.last_latency, 'max_latency': self.max_latency,
+                    'mean_latency': self._total_latency / self.delivered if self.delivered > 0 else 0.0}
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.clear()
+            self._condition.notify_all()
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)  # wakes up the reader thread
+            except OSError:
+                pass
+        if self._close_file:
+            # the reader thread closes the stream when it stops (see _run)
+            self._thread.join(2 * POLL_SECONDS)
+
+
+class FloStream(Filterable):
+    """
+        Flow data read from a stream (pipe, socket...) as it is produced, e.g. by
+        a running flow estimator. Frames are read in a background thread, and
+        delivered in order to whoever iterates over it (so it is iterated once,
+        another iteration continues with the next frames)
+        Streams contain either:
+        - 'flo': concatenated .flo files, each with its header
+        - 'raw': one .flo header (tag, width, height) followed by frames without headers
+    """
+
+    def __init__(self, source, record_format='flo', policy='block', buffer=8,
+                 max_latency=None, frames=None):
+        Filterable.__init__(self)
+        if record_format not in STREAM_FORMATS:
+            raise AssertionError('record_format should be one of: {f} (but it is {n})'.format(
+                f=', '.join(STREAM_FORMATS), n=record_format))
+        if policy not in STREAM_POLICIES:
+            raise AssertionError('policy should be one of: {p} (but it is {n})'.format(
+                p=', '.join(STREAM_POLICIES), n=policy))
+        if buffer < 1:
+            raise AssertionError('buffer should be bigger than 0 but it is {n}'.format(n=buffer))
+        if max_latency is not None and (policy != 'drop' or max_latency <= 0):
+            raise AssertionError('max_latency should be bigger than 0 and used with the \'drop\' policy')
+        if frames is not None and frames < 1:
+            raise AssertionError('frames should be bigger than 0 but it is {n}'.format(n=frames))
+        self._frames = frames
+        self._reader = _StreamReader(source, record_format, policy, buffer, max_latency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _items(self):
+        count = 0
+        while self._frames is None or count < self._frames:
+            frame = self._reader.get()
+            if frame is None:
+                return
+            count += 1
+            yield frame
+
+    def _length(self):
+        return UNBOUNDED_LENGTH if self._frames is None else self._frames
+
+    def get_type(self):
+        return 'flo'
+
+    @property
+    def shape(self):
+        """ (h, w, 2) shape of the flow data, from the first frame's header """
+        [width, height] = self._reader.size()
+        return self._filtered_shape((height, width, 2))
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    def stats(self):
+        """
+            :returns: dict with the number of frames received from the stream, delivered
+                      to the consumer, dropped (see the drop policy) and waiting in the queue,
+                      and the latency (seconds from arrival to delivery) of the last frame,
+                      the maximum and mean latency
+        """
+        return self._reader.stats()
+
+    def close(self):
+        """ Stop reading from the stream (closing it if it was opened from a path) """
+        self._reader.close()
@@ -0,0 +1,217 @@
+import struct
+import zlib
+import numpy as np
+
+# Readers for flow formats other than .flo/.floq. All of them return
+# (flow, valid) where flow is a [h, w, 2] float32 ndarray and valid is
+# a [h, w] bool ndarray, or None if the format has no validity information
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_IHDR = struct.Struct('>IIBBBBB')
+KITTI_OFFSET = 2 ** 15
+KITTI_SCALE = 64.0
+
+
+def _png_chunks(data, file_path):
+    """ :returns: Generator of (type, content) for each chunk in PNG data """
+    if data[:8] != _PNG_SIGNATURE:
+        raise AssertionError('File {f} is not a PNG file'.format(f=file_path))
+    pos = 8
+    while pos + 8 <= len(data):
+        [length, chunk_type] = struct.unpack('>I4s', data[pos:pos + 8])
+        yield chunk_type, data[pos + 8:pos + 8 + length]
+        pos += 12 + length  # length, type, data and crc
+
+
+def _png_unfilter(filtered, height, width, bpp):
+    """
+        Undo PNG row filters, vectorized with numpy
+        :param filtered: [h, 1 + w * bpp] uint8 ndarray (filter type + filtered row)
+        :returns: [h, w, bpp] uint8 ndarray with the image bytes
+    """
+    types = filtered[:, 0]
+    raw = filtered[:, 1:].reshape((height, width, bpp))
+    if types.max() > 4:
+        raise AssertionError('PNG data has invalid filter types')
+
+    if types.max() <= 2:
+        # none/sub/up filters only depend on the previous row
+        result = np.empty((height, width, bpp), dtype=np.uint8)
+        prev = np.zeros((width, bpp), dtype=np.uint8)
+        for y in range(height):
+            row = raw[y]
+            if types[y] == 1:  # sub: cumulative sum of each byte lane
+                row = np.cumsum(row, axis=0, dtype=np.uint8)
+            elif types[y] == 2:  # up
+                row = row + prev
+            result[y] = row
+            prev = row
+        return result
+
+    # average/paeth filters depend on the left, up and up-left bytes, so rows
+    # can't be processed independently. Use a skewed layout where pixel (y, x) is
+    # at [y + 1, x + y + 2]: each anti-diagonal (x + y = t) is a column whose pixels
+    # only depend on the two previous columns. Row 0 and cells out of the image are zero
+    skew = np.zeros((height + 1, width + height + 1, bpp), dtype=np.int16)
+    raw_skew = np.zeros((height, width + height, bpp), dtype=np.int16)
+    for y in range(height):
+        raw_skew[y, y:y + width] = raw[y]
+    row_types = types.astype(np.int16)[:, np.newaxis]
+    for t in range(height + width - 1):
+        lo = max(0, t - width + 1)
+        hi = min(height, t + 1)
+        a = skew[lo + 1:hi + 1, t + 1]  # left
+        b = skew[lo:hi, t + 1]  # up
+        c = skew[lo:hi, t]  # up-left
+        pa = np.abs(b - c)
+        pb = np.abs(a - c)
+        pc = np.abs(a + b - 2 * c)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+        ft = row_types[lo:hi]
+        predictor = np.select([ft == 1, ft == 2, ft == 3, ft == 4],
+                              [a, b, (a + b) >> 1, paeth], 0)
+        skew[lo + 1:hi + 1, t + 2] = (raw_skew[lo:hi, t] + predictor) & 0xff
+
+    result = np.empty((height, width, bpp), dtype=np.uint8)
+    for y in range(height):
+        result[y] = skew[y + 1, y + 2:y + 2 + width]
+    return result
+
+
+def read_png16(file_path):
+    """
+        Read a 16-bit RGB PNG image (which other readers truncate to 8 bits)
+        :param file_path: File path of the PNG file
+        :returns: [h, w, 3] uint16 ndarray
+    """
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    header = None
+    idat = []
+    for chunk_type, content in _png_chunks(data, file_path):
+        if chunk_type == b'IHDR':
+            header = _PNG_IHDR.unpack(content)
+        elif chunk_type == b'IDAT':
+            idat.append(content)
+        elif chunk_type == b'IEND':
+            break
+    if header is None:
+        raise AssertionError('File {f} has no PNG header'.format(f=file_path))
+    [width, height, bit_depth, color_type, _, _, interlace] = header
+    if bit_depth != 16 or color_type != 2 or interlace != 0:
+        raise AssertionError('File {f} should be a non-interlaced 16-bit RGB PNG '
+                             '(bit depth {b}, color type {c})'.format(f=file_path, b=bit_depth, c=color_type))
+
+    bpp = 6  # 3 channels x 2 bytes
+    filtered = np.frombuffer(zlib.decompress(b''.join(idat)), dtype=np.uint8)
+    if filtered.size != height * (1 + width * bpp):
+        raise AssertionError(
+            'File {f} is truncated or corrupt'.format(f=file_path))
+    image = _png_unfilter(filtered.reshape((height, 1 + width * bpp)),
+                          height, width, bpp)
+    return image.view('>u2').reshape((height, width, 3)).astype(np.uint16)
+
+
+def read_kitti_flow(file_path):
+    """
+        Read flow from a KITTI 16-bit PNG file, where each pixel has:
+        R: u * 64 + 2^15, G: v * 64 + 2^15, B: 1 if the flow is valid, 0 if not
+        Invalid pixels are set to zero flow
+    """
+    image = read_png16(file_path)
+    valid = image[:, :, 2] > 0
+    flow = (image[:, :, 0:2].astype(np.float32) - KITTI_OFFSET) / KITTI_SCALE
+    flow[~valid] = 0
+    return flow, valid
+
+
+def _read_pfm_header(file):
+    """ :returns: (channels, width, height, little_endian) from a PFM file """
+    channels = {b'PF': 3, b'Pf': 1}.get(file.readline().strip())
+    if channels is None:
+        raise AssertionError('File is not a PFM file')
+    [width, height] = [int(n) for n in file.readline().split()]
+    scale = float(file.readline().strip())
+    return channels, width, height, scale < 0
+
+
+def read_pfm_flow(file_path):
+    """
+        Read flow from a PFM file (e.g. FlyingThings3D), using the first two channels
+        PFM rows are stored from bottom to top
+    """
+    with open(file_path, 'rb') as file:
+        [channels, width, height, little_endian] = _read_pfm_header(file)
+        if channels != 3:
+            raise AssertionError(
+                'File {f} should be a 3-channel PFM file'.format(f=file_path))
+        dtype = '<f4' if little_endian else '>f4'
+        count = height * width * channels
+        data = np.fromfile(file, dtype=dtype, count=count)
+    if data.size != count:
+        raise AssertionError(
+            'File {f} is truncated or corrupt'.format(f=file_path))
+    flow = data.reshape((height, width, channels))[::-1, :, 0:2]
+    return np.ascontiguousarray(flow, dtype=np.float32), None
+
+
+def _as_flow(array, file_path):
+    """ Accept [h, w, 2] or [2, h, w] arrays """
+    if array.ndim == 3 and array.shape[2] != 2 and array.shape[0] == 2:
+        array = np.moveaxis(array, 0, 2)
+    if array.ndim != 3 or array.shape[2] != 2:
+        raise AssertionError('File {f} should contain a [h, w, 2] flow array but it is {s}'.format(
+            f=file_path, s=array.shape))
+    return array if array.dtype == np.float32 else array.astype(np.float32)
+
+
+def read_npy_flow(file_path, mmap=False):
+    """
+        Read flow from a .npy file with a [h, w, 2] (or [2, h, w]) array
+        :param mmap: Memory-map the file instead of reading it
+    """
+    return _as_flow(np.load(file_path, mmap_mode='r' if mmap else None), file_path), None
+
+
+def read_npz_flow(file_path):
+    """
+        Read flow from a .npz file, from its 'flow' array (or the first one if there
+        is no 'flow'). A 'valid' or 'mask' array is used as the validity mask
+    """
+    with np.load(file_path) as data:
+        key = 'flow' if 'flow' in data.files else data.files[0]
+        flow = _as_flow(data[key], file_path)
+        valid = None
+        for mask_key in ('valid', 'mask'):
+            if mask_key in data.files:
+                valid = data[mask_key].astype(bool).reshape(flow.shape[0:2])
+                break
+    return flow, valid
+
+
+def read_flow_size(file_path):
+    """
+        :param file_path: File path of a KITTI .png, .pfm, .npy or .npz flow file
+        :returns: (width, height) reading only the file header when possible
+    """
+    if file_path.endswith('.png'):
+        with open(file_path, 'rb') as file:
+            data = file.read(8 + 8 + _PNG_IHDR.size)
+        [_, content] = next(_png_chunks(data, file_path))
+        [width, height] = _PNG_IHDR.unpack(content)[0:2]
+        return width, height
+    elif file_path.endswith('.pfm'):
+        with open(file_path, 'rb') as file:
+            [_, width, height, _] = _read_pfm_header(file)
+        return width, height
+    elif file_path.endswith('.npy'):
+        shape = np.load(file_path, mmap_mode='r').shape  # only reads the header
+        [h, w] = shape[1:3] if shape[-1] != 2 and shape[0] == 2 else shape[0:2]
+        return w, h
+    [flow, _] = read_npz_flow(file_path)
+    return flow.shape[1], flow.shape[0]
+
+
+# extension -> reader function
+FLOW_READERS = {'.png': read_kitti_flow, '.pfm': read_pfm_flow,
+                '.npy': read_npy_flow, '.npz': read_npz_flow}
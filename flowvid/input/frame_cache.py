@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+
+class FrameCache:
+    """
+        Least recently used cache of decoded frames, limited by the total
+        size in bytes of the frames it holds. It can be shared between
+        multiple inputs (and threads) so repeated reads of the same file
+        don't go to the disk and decoder again.
+        Cached frames are read-only, as they are returned to every reader.
+    """
+
+    def __init__(self, max_bytes):
+        if max_bytes <= 0:
+            raise AssertionError(
+                'max_bytes should be bigger than 0 but it is {n}'.format(n=max_bytes))
+        self._max_bytes = max_bytes
+        self._frames = OrderedDict()  # key -> ndarray, least recently used first
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __deepcopy__(self, memo):
+        # filtered copies of an input keep sharing its cache
+        return self
+
+    def __getstate__(self):
+        # copies sent to other processes (see fv.run, workers) start empty
+        return {'max_bytes': self._max_bytes}
+
+    def __setstate__(self, state):
+        FrameCache.__init__(self, state['max_bytes'])
+
+    @property
+    def nbytes(self):
+        """ Total size in bytes of the cached frames """
+        return self._nbytes
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    def get(self, key):
+        """
+            :param key: Frame identifier (see put)
+            :returns: Cached frame for key, or None if it isn't cached
+        """
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._frames.move_to_end(key)
+            return frame
+
+    def put(self, key, frame):
+        """
+            Store a frame, evicting the least recently used ones if needed.
+            Frames bigger than the cache itself are not stored.
+            :param key: Hashable frame identifier (e.g. path and mtime of the file)
+            :param frame: ndarray with the decoded frame (it is made read-only)
+        """
+        if frame.nbytes > self._max_bytes:
+            return
+        frame.flags.writeable = False
+        with self._lock:
+            old = self._frames.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+            self._frames[key] = frame
+            self._nbytes += frame.nbytes
+            while self._nbytes > self._max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def clear(self):
+        """ Remove all frames and reset hit/miss counters """
+        with self._lock:
+            self._frames.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ :returns: dict with hits, misses, number of frames and bytes used """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'frames': len(self._frames), 'bytes': self._nbytes,
+                    'max_bytes': self._max_bytes}
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+# Sorted listing (manifest) of the files in a directory. Listings are kept in
+# memory and in a manifest file on disk, and reused while the directory's
+# modification time doesn't change (it changes when files are added, removed
+# or renamed), so big directories are only listed once
+
+MANIFEST_VERSION = 1
+MANIFEST_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'flowvid', 'manifest')
+
+_number_pattern = re.compile(r'\d+')
+_manifests = {}  # (directory, extensions) -> (mtime_ns, names), for this process
+_manifests_lock = threading.Lock()
+
+
+def _order_key(name):
+    """
+        Order files by the first number in their name, as a number
+        (so "9.flo" goes before "10.flo" without zero padding)
+        :returns: Key to sort names with, or None if name has no number
+    """
+    match = _number_pattern.search(name)
+    if match is None:
+        return None
+    return (int(match[0]), name)
+
+
+def _scan_directory(directory, extensions):
+    """ :returns: Sorted list of names of the files in directory with a number in them """
+    keyed_names = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if extensions is not None and not entry.name.endswith(extensions):
+                continue
+            key = _order_key(entry.name)
+            if key is not None and entry.is_file():
+                keyed_names.append((key, entry.name))
+    keyed_names.sort()
+    return [name for (_, name) in keyed_names]
+
+
+def _manifest_path(directory, extensions):
+    key = '{d}:{e}:{v}'.format(d=directory, e=extensions, v=MANIFEST_VERSION)
+    return os.path.join(MANIFEST_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def _load_manifest(manifest_path, mtime_ns):
+    """ :returns: List of names in the manifest file, or None if it is missing or outdated """
+    try:
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('mtime_ns') != mtime_ns:
+        return None
+    return manifest.get('names')
+
+
+def _save_manifest(manifest_path, directory, mtime_ns, names):
+    try:
+        os.makedirs(MANIFEST_DIR, exist_ok=True)
+        temp_path = '{p}.{pid}.tmp'.format(p=manifest_path, pid=os.getpid())
+        with open(temp_path, 'w') as file:
+            json.dump({'directory': directory, 'mtime_ns': mtime_ns, 'names': names}, file)
+        os.replace(temp_path, manifest_path)
+    except OSError:
+        pass  # the manifest is only a cache, e.g. read-only home directory
+
+
+def list_directory(directory, extensions=None):
+    """
+        List the files in directory that have a number in their name,
+        ordered by that number (see _order_key)
+        :param directory: Directory to be listed
+        :param extensions: Tuple of file extensions to list (None to list all files)
+        :returns: List of file paths
+    """
+    full_directory = os.path.abspath(directory)
+    mtime_ns = os.stat(full_directory).st_mtime_ns
+    memo_key = (full_directory, extensions)
+    with _manifests_lock:
+        memo = _manifests.get(memo_key)
+    if memo is not None and memo[0] == mtime_ns:
+        names = memo[1]
+    else:
+        manifest_path = _manifest_path(full_directory, extensions)
+        names = _load_manifest(manifest_path, mtime_ns)
+        if names is None:
+            names = _scan_directory(full_directory, extensions)
+            _save_manifest(manifest_path, full_directory, mtime_ns, names)
+        with _manifests_lock:
+            _manifests[memo_key] = (mtime_ns, names)
+    return [os.path.join(directory, name) for name in names]
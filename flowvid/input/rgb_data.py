@@ -1,5 +1,9 @@
+import functools
 import imageio
 import numpy as np
+from PIL import Image
+from ..core.util.process_prefetch import ProcessPrefetcher
+from ..core.util.resize import resize_image, scaled_size
 from .file_input import FileInput
 
 
@@ -12,16 +16,124 @@ def _read_image(file_path):
     return imageio.imread(file_path)
 
 
+def _read_image_scaled(file_path, scale):
+    """
+        Decode an image at a smaller size: JPEG images are decoded directly at
+        1/2, 1/4 or 1/8 of their size (draft) when possible, and then reduced
+        to the exact size averaging the color of each area
+        :returns: [h * scale, w * scale, 3] ndarray
+    """
+    with Image.open(file_path) as image:
+        if image.mode in ('RGB', 'RGBA', 'L'):  # modes that are read as they are
+            [width, height] = image.size
+            [new_h, new_w] = scaled_size(height, width, scale)
+            image.draft(image.mode, (new_w, new_h))
+            return np.asarray(image.resize((new_w, new_h), Image.BOX, reducing_gap=2.0))
+    return resize_image(_read_image(file_path), scale)
+
+
+def _read_image_region(file_path, box, scale=1.0):
+    """ :returns: [y0:y1, x0:x1] region of the image at scale (or all of it if box is None) """
+    image = _read_image(file_path) if scale == 1.0 else _read_image_scaled(file_path, scale)
+    if box is None:
+        return image
+    [x0, y0, x1, y1] = box
+    return image[y0:y1, x0:x1]
+
+
+# image mode -> (number of channels or None if there is no channel axis, dtype)
+_image_modes = {'1': (None, np.bool_), 'L': (None, np.uint8), 'I;16': (None, np.uint16),
+                'I': (None, np.int32), 'F': (None, np.float32), 'LA': (2, np.uint8),
+                'RGB': (3, np.uint8), 'YCbCr': (3, np.uint8), 'RGBA': (4, np.uint8)}
+
+
+def _read_image_header(file_path):
+    """
+        :param file_path: File path of image file
+        :returns: (shape, dtype) of the image data, reading only the image header
+                  or None if the image mode is not known
+    """
+    with Image.open(file_path) as image:
+        if image.mode not in _image_modes:
+            return None
+        [width, height] = image.size
+        [channels, dtype] = _image_modes[image.mode]
+    shape = (height, width) if channels is None else (height, width, channels)
+    return shape, np.dtype(dtype)
+
+
 class RGBData(FileInput):
-    """ Image data (.png, etc.) reader, wrapper for imread """
+    """
+        Image data (.png, etc.) reader, wrapper for imread
+        Images can be decoded in a pool of processes (see _load_all), which
+        is started once and used by every iteration until close() is called
+    """
+
+    def __init__(self, source, extensions=None, dir_first=None, dir_total=None,
+                 prefetch=0, workers=1, cache=None, validate=False, processes=0, scale=1.0):
+        FileInput.__init__(self, source, extensions, dir_first, dir_total,
+                           prefetch, workers, cache, validate, scale)
+        if processes < 0:
+            raise AssertionError(
+                'processes should be 0 or bigger but it is {n}'.format(n=processes))
+        self._processes = processes
+        # shared with filtered copies, which read the same files
+        self._prefetcher = ProcessPrefetcher(processes) if processes > 0 else None
+
+    def close(self):
+        """ Stop the worker processes that decode images, if there are any running """
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+
+    def _load_all(self, entries):
+        if self._processes == 0 or len(entries) < 2:
+            return FileInput._load_all(self, entries)
+        # decoding holds the GIL, so threads don't help: decode images in
+        # worker processes, which return them through shared memory
+        slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        prefetch = self._prefetch if self._prefetch > 0 else 2 * self._processes
+        frames = self._prefetcher.map(functools.partial(_read_image_region, box=self._crop, scale=self._scale),
+                                      entries, slot_bytes, prefetch, cached=self._cached_frame)
+        if self._cache is None:
+            return frames
+        return (self._cache_frame(entry, frame) for (entry, frame) in zip(entries, frames))
 
-    def _items(self):
-        return (_read_image(filename) for filename in self.source)
+    def _cached_frame(self, entry):
+        return None if self._cache is None else self._cache.get(self._cache_key(entry))
+
+    def _cache_frame(self, entry, frame):
+        self._cache.put(self._cache_key(entry), frame)  # also marks cached frames as recently used
+        return frame
+
+    def _read_file(self, file_path):
+        return _read_image(file_path)
+
+    def _read_scaled(self, file_path):
+        return _read_image_scaled(file_path, self._scale)
 
     def get_type(self):
         return 'rgb'
 
-    def __getitem__(self, index):
-        if index < 0 or index >= len(self):
-            raise IndexError('Index out of range')
-        return _read_image(self.source[index])
+    def _validate_file(self, file_path):
+        try:
+            with Image.open(file_path) as image:
+                image.verify()  # checks the image structure without decoding it
+        except Exception as e:
+            raise AssertionError('File {f} is not a valid image ({e})'.format(f=file_path, e=e))
+
+    def _header(self):
+        header = _read_image_header(self.source[0])
+        if header is None:
+            # uncommon image mode (e.g. palette), decode the image instead
+            image = self._read_file(self.source[0])
+            header = (image.shape, image.dtype)
+        return header
+
+    @property
+    def shape(self):
+        """ (h, w, 3) shape of the images, read from the first image's header """
+        return self._output_shape(self._header()[0])
+
+    @property
+    def dtype(self):
+        return self._header()[1]
@@ -0,0 +1,210 @@
+import multiprocessing
+import os
+import secrets
+import struct
+from multiprocessing import shared_memory
+import numpy as np
+from ..core.filterable import Filterable
+from ..core.util.shared_memory import attach_shared_memory, shared_ndarray
+
+# Frames of a sequence decoded into one block of memory, which other processes
+# can attach to by name (see FileInput.preload). The block starts with a header
+# that describes the frames, so attaching only needs the name:
+#   magic, version, data type ('flo', 'rgb'...), numpy dtype,
+#   number of frames, frame shape (up to 3 dimensions), proxy scale
+# Block names contain the pid of the process that created them (see _shares_tracker)
+
+SHARED_MAGIC = b'FVSM'
+SHARED_VERSION = 1
+SHARED_HEADER = struct.Struct('<4sI8s8sQB3Qd')
+SHARED_DATA_OFFSET = 128  # header size, rounded up so frames are aligned
+SHARED_PREFIX = 'flowvid_'
+
+
+def _block_name():
+    return '{p}{pid}_{r}'.format(p=SHARED_PREFIX, pid=os.getpid(), r=secrets.token_hex(6))
+
+
+def _shares_tracker(name):
+    """
+        :returns: True if this process uses the resource tracker of the process that
+                  created the block: itself, or a child started by multiprocessing (e.g. a pool worker)
+    """
+    try:
+        pid = int(name[len(SHARED_PREFIX):].split('_')[0])
+    except ValueError:
+        return False
+    parent = multiprocessing.parent_process()
+    return pid == os.getpid() or (parent is not None and parent.pid == pid)
+
+
+class SharedFrames(Filterable):
+    """
+        Sequence of frames stored in memory, shared between processes if it is
+        in a shared memory block (see fv.input.shared(...)). Frames are read-only
+        views of the memory, so reading them doesn't make copies.
+        The object that preloads the frames owns the block and unlinks it when it
+        is closed (use "with" or close()), objects that attach to it only close it.
+        Copies sent to other processes (e.g. pickled to a worker pool) attach to the block
+    """
+
+    def __init__(self, block, owner, frames=None, data_type=None, scale=1.0):
+        """
+            :param block: SharedMemory block with the header and frames, or None
+                          to keep frames (ndarray) of data_type and scale in this process
+            :param owner: True if this object unlinks the block when it is closed
+        """
+        Filterable.__init__(self)
+        self._block = block
+        self._owner = owner
+        if block is not None:
+            [frames, data_type, scale] = SharedFrames._read_block(block)
+        frames.flags.writeable = False
+        self._frames = frames
+        self._type = data_type
+        self._scale = scale
+
+    @staticmethod
+    def _read_block(block):
+        """ :returns: (frames ndarray, which closes the block when deleted, their data type and scale) """
+        [magic, version, data_type, dtype, n, ndim, *shape, scale] = \
+            SHARED_HEADER.unpack_from(block.buf, 0)
+        if magic != SHARED_MAGIC or version != SHARED_VERSION:
+            raise AssertionError('Shared memory block {n} does not contain flowvid frames'.format(
+                n=block.name))
+        frames = shared_ndarray(block, (n,) + tuple(shape[:ndim]),
+                                np.dtype(dtype.rstrip(b'\0').decode('ascii')), SHARED_DATA_OFFSET)
+        return (frames, data_type.rstrip(b'\0').decode('ascii'), scale)
+
+    @staticmethod
+    def create(frames, n, data_type, scale, shared):
+        """
+            Store frames in a new SharedFrames object, which owns its memory
+            :param frames: Iterable with n ndarrays, all with the same shape and dtype
+            :param n: Number of frames
+            :param data_type: Data type of the frames, e.g. 'flo'
+            :param scale: Proxy scale of the frames (see Filterable.scale)
+            :param shared: Store them in a shared memory block (True)
+                           or in memory of this process only (False)
+            :returns: SharedFrames object
+        """
+        frames = iter(frames)
+        first = next(frames, None)
+        if first is None:
+            raise AssertionError('There are no frames to preload')
+        if first.ndim > 3:
+            raise AssertionError('Frames should have up to 3 dimensions but they have {n}'.format(
+                n=first.ndim))
+
+        shape = (n,) + first.shape
+        block = None
+        if shared:
+            size = SHARED_DATA_OFFSET + max(1, int(np.prod(shape)) * first.dtype.itemsize)
+            block = shared_memory.SharedMemory(name=_block_name(), create=True, size=size)
+            data = np.ndarray(shape, dtype=first.dtype, buffer=block.buf, offset=SHARED_DATA_OFFSET)
+        else:
+            data = np.empty(shape, dtype=first.dtype)
+        try:
+            data[0] = first
+            for (i, frame) in enumerate(frames, 1):
+                if frame.shape != first.shape or frame.dtype != first.dtype:
+                    raise AssertionError('All frames should have shape {s} ({d}) but frame {i} has {s2} ({d2})'.format(
+                        s=first.shape, d=first.dtype, i=i, s2=frame.shape, d2=frame.dtype))
+                data[i] = frame
+            if block is None:
+                return SharedFrames(None, True, data, data_type, scale)
+            del data  # release the buffer, SharedFrames makes its own view
+            SHARED_HEADER.pack_into(block.buf, 0, SHARED_MAGIC, SHARED_VERSION,
+                                    data_type.encode('ascii'), first.dtype.str.encode('ascii'),
+                                    n, first.ndim, *(first.shape + (0,) * (3 - first.ndim)), scale)
+            return SharedFrames(block, True)
+        except BaseException:
+            if block is not None:
+                data = None  # no views left, so it can be unmapped
+                block.close()
+                block.unlink()
+            raise
+
+    @staticmethod
+    def attach(name):
+        """
+            :param name: Name of a shared memory block with frames (see the name property)
+            :returns: SharedFrames object with the frames of the block (which doesn't own it)
+        """
+        return SharedFrames(attach_shared_memory(name, _shares_tracker(name)), False)
+
+    def __getstate__(self):
+        # copies attach to the block by its name
+        state = self.__dict__.copy()
+        if self._block is not None:
+            state['_block'] = self._block.name
+            state['_owner'] = False
+            del state['_frames']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._block is not None:
+            self._block = attach_shared_memory(self._block, _shares_tracker(self._block))
+            [self._frames, _, _] = SharedFrames._read_block(self._block)
+        if self._frames is not None:
+            self._frames.flags.writeable = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+            Stop using the frames: the owner frees the memory (frames that are
+            still referenced stay valid until they are deleted) and other
+            processes can't attach to it anymore
+        """
+        block = getattr(self, '_block', None)
+        if block is None:
+            return
+        self._block = None
+        self._frames = None  # the block is closed with the last frame that uses it
+        if self._owner:
+            block.unlink()
+
+    @property
+    def name(self):
+        """ Name of the shared memory block, to attach to it from other processes (see fv.input.shared(...)) """
+        if self._block is None:
+            raise AssertionError('Frames are not in shared memory (closed or preloaded with shared=False)')
+        return self._block.name
+
+    def _items(self):
+        return iter(self._check_frames())
+
+    def _length(self):
+        return len(self._check_frames())
+
+    def _get_item(self, index):
+        return self._check_frames()[index]
+
+    def _check_frames(self):
+        if self._frames is None:
+            raise AssertionError('Shared frames are closed')
+        return self._frames
+
+    def get_type(self):
+        return self._type
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @property
+    def shape(self):
+        return self._filtered_shape(self._check_frames().shape[1:])
+
+    @property
+    def dtype(self):
+        return self._check_frames().dtype
@@ -19,20 +19,18 @@ class TrackPoints(FileInput):
                 'Points should be a [n, 2] ndarray but it has shape {s}'.format(s=points.shape))
         self._points = points
 
-    def _items(self):
-        return (self._points[i, :] for i in range(len(self)))
+    def _entries(self):
+        return range(len(self))
 
-    def __len__(self):
+    def _load(self, entry):
+        return self._points[entry, :]
+
+    def _length(self):
         return self._points.shape[0]
 
     def get_type(self):
         return 'point'
 
-    def __getitem__(self, index):
-        if index < 0 or index >= len(self):
-            raise IndexError('Index out of range')
-        return self._points[index, :]
-
 
 class TrackRectangles(FileInput):
     """ Track 4 points that form a rectangle over M frames, Mx4 """
@@ -42,20 +40,18 @@ class TrackRectangles(FileInput):
         self._points = self.__read_rectangles(
             self.source[0], rect_format, elem_first, elem_total)
 
-    def _items(self):
-        return (self._points[i, :] for i in range(len(self)))
+    def _entries(self):
+        return range(len(self))
 
-    def __len__(self):
+    def _load(self, entry):
+        return self._points[entry, :]
+
+    def _length(self):
         return self._points.shape[0]
 
     def get_type(self):
         return 'rect'
 
-    def __getitem__(self, index):
-        if index < 0 or index >= len(self):
-            raise IndexError('Index out of range')
-        return self._points[index, :]
-
     @staticmethod
     def __read_rectangles(source, rec_format, elem_first, elem_total):
         raw = np.genfromtxt(source, delimiter=' ')
@@ -0,0 +1,113 @@
+import os
+import threading
+import numpy as np
+import imageio_ffmpeg
+from .file_input import FileInput
+from .video_index import VIDEO_EXTENSIONS, load_video_index
+
+
+class VideoData(FileInput):
+    """
+        Video file (.mp4, etc.) reader, which decodes frames with ffmpeg
+        without extracting them to image files. Uses a keyframe index
+        (see video_index.py) to seek to any frame: reads that continue
+        from the last frame keep decoding sequentially, and the rest
+        restart the decoder from the closest keyframe
+    """
+
+    def __init__(self, source, dir_first=0, dir_total=None, prefetch=0, cache=None, scale=1.0):
+        if not os.path.isfile(source):
+            raise AssertionError('Source ({s}) does not exist'.format(s=source))
+        # frames come from a single decoder in order, so only one thread reads them
+        # (more would request them out of order and restart the decoder)
+        FileInput.__init__(self, source, VIDEO_EXTENSIONS,
+                           prefetch=prefetch, workers=1, cache=cache, scale=scale)
+        self._index = load_video_index(source)
+
+        # dir_first/dir_total select frames from the video
+        frame_count = len(self._index)
+        if dir_total is None:
+            dir_total = frame_count - dir_first
+        self._frames = range(frame_count)[dir_first:dir_first+dir_total]
+        self._reset_reader()
+
+    def _reset_reader(self):
+        self._reader = None  # frame generator of the running ffmpeg process
+        self._next_frame = None  # frame that _reader yields next
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # the decoder process can't be copied, copies start their own
+        state = self.__dict__.copy()
+        for name in ('_reader', '_next_frame', '_lock'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_reader()
+
+    def _entries(self):
+        return self._frames
+
+    def _entry_key(self, entry):
+        return (self.source[0], os.stat(self.source[0]).st_mtime_ns, entry)
+
+    def _read_file(self, entry):
+        """
+            :param entry: Frame number inside the video
+            :returns: [h, w, 3] RGB ndarray
+        """
+        with self._lock:
+            if not self._can_continue(entry):
+                self._open_reader(self._index.keyframe_before(entry))
+            # decode (and discard) frames until the requested one
+            while True:
+                try:
+                    frame = next(self._reader)
+                except StopIteration:
+                    self._reader = None
+                    raise AssertionError('Video {f} ended before frame {i}'.format(
+                        f=self.source[0], i=entry))
+                self._next_frame += 1
+                if self._next_frame > entry:
+                    break
+        shape = (self._index.height, self._index.width, 3)
+        return np.frombuffer(frame, dtype=np.uint8).reshape(shape)
+
+    def _can_continue(self, entry):
+        """ :returns: True if the running decoder gets to entry without passing a keyframe """
+        if self._reader is None or entry < self._next_frame:
+            return False
+        return self._index.keyframe_before(entry) <= self._next_frame
+
+    def _open_reader(self, frame):
+        """ Start decoding the video from frame, which should be a keyframe """
+        if self._reader is not None:
+            self._reader.close()
+        input_params = ['-seek_timestamp', '1', '-ss', '{t:.6f}'.format(t=self._index.seek_time(frame))] \
+            if frame > 0 else []
+        # -vsync instead of -fps_mode (ffmpeg 5.1+), as older imageio-ffmpeg bundle ffmpeg 4
+        self._reader = imageio_ffmpeg.read_frames(
+            self.source[0], input_params=input_params,
+            output_params=['-map', '0:v:0', '-vsync', 'passthrough'])
+        next(self._reader)  # metadata
+        self._next_frame = frame
+
+    def close(self):
+        """ Stop the ffmpeg process, if there is one running """
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def get_type(self):
+        return 'rgb'
+
+    @property
+    def shape(self):
+        return self._output_shape((self._index.height, self._index.width, 3))
+
+    @property
+    def dtype(self):
+        return np.dtype(np.uint8)
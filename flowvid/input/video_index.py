@@ -0,0 +1,106 @@
+import hashlib
+import os
+import re
+import subprocess
+import numpy as np
+import imageio_ffmpeg
+
+# Seek index of a video file: presentation timestamp (pts) of every frame
+# in display order and which frames are keyframes. It is built from the
+# container's packets (no frames are decoded) and cached on disk, so opening
+# the same video again doesn't need to read the whole file
+
+VIDEO_EXTENSIONS = ('.mp4', '.m4v', '.mov', '.avi', '.mkv', '.webm')
+INDEX_VERSION = 1
+INDEX_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'flowvid', 'video_index')
+
+_packet_pattern = re.compile(
+    r'^0,\s*(-?\d+),\s*(-?\d+),\s*(\d+),\s*\d+,\s*0x[0-9a-f]+(?:,\s*F=0x([0-9a-fA-F]+))?', re.MULTILINE)
+_timebase_pattern = re.compile(r'^#tb 0: (\d+)/(\d+)', re.MULTILINE)
+_dimensions_pattern = re.compile(r'^#dimensions 0: (\d+)x(\d+)', re.MULTILINE)
+
+
+class VideoIndex:
+    """ Frame timestamps, keyframes and size of a video, see load_video_index """
+
+    def __init__(self, pts, keyframes, time_base, width, height):
+        self.pts = pts  # int64 ndarray, display order
+        self.keyframes = keyframes  # bool ndarray, display order
+        self.time_base = time_base  # seconds per pts unit
+        self.width = width
+        self.height = height
+
+    def __len__(self):
+        return len(self.pts)
+
+    def keyframe_before(self, frame):
+        """ :returns: Index of the last keyframe at or before frame (or 0) """
+        keys = np.flatnonzero(self.keyframes[:frame + 1])
+        return int(keys[-1]) if len(keys) > 0 else 0
+
+    def seek_time(self, frame):
+        """
+            :returns: Timestamp in seconds (for ffmpeg's -ss with -seek_timestamp)
+                      where frame is the first decoded frame
+        """
+        # half a frame before it, so rounding doesn't skip it
+        half_frame = (self.pts[frame] - self.pts[frame - 1]) / 2 if frame > 0 else 0
+        return float(self.pts[frame] - half_frame) * self.time_base
+
+
+def _build_index(file_path):
+    """ Read packet timestamps/flags of the first video stream with ffmpeg """
+    command = [imageio_ffmpeg.get_ffmpeg_exe(), '-v', 'error', '-i', file_path,
+               '-map', '0:v:0', '-c', 'copy', '-f', 'framecrc', '-']
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output = result.stdout.decode('utf-8', errors='replace')
+    timebase = _timebase_pattern.search(output)
+    dimensions = _dimensions_pattern.search(output)
+    if result.returncode != 0 or timebase is None or dimensions is None:
+        raise AssertionError('Could not read video {f}: {e}'.format(
+            f=file_path, e=result.stderr.decode('utf-8', errors='replace').strip()))
+
+    packets = _packet_pattern.findall(output)
+    if not packets:
+        raise AssertionError('Video {f} has no frames'.format(f=file_path))
+    pts = np.array([int(p[1]) for p in packets], dtype=np.int64)
+    # framecrc only prints the flags when they are not just "keyframe"
+    keyframes = np.array([p[3] == '' or int(p[3], 16) & 1 == 1 for p in packets])
+    order = np.argsort(pts, kind='stable')  # decoding order -> display order
+    time_base = int(timebase[1]) / int(timebase[2])
+    return VideoIndex(pts[order], keyframes[order], time_base,
+                      int(dimensions[1]), int(dimensions[2]))
+
+
+def _index_path(file_path):
+    """ :returns: Path of the cached index, which changes if the video changes """
+    stat = os.stat(file_path)
+    key = '{p}:{s}:{m}:{v}'.format(p=os.path.abspath(file_path), s=stat.st_size,
+                                   m=stat.st_mtime_ns, v=INDEX_VERSION)
+    return os.path.join(INDEX_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.npz')
+
+
+def load_video_index(file_path):
+    """
+        Load the seek index of a video from the disk cache, building it if needed
+        :param file_path: File path of the video
+        :returns: VideoIndex of the video's first stream
+    """
+    index_path = _index_path(file_path)
+    try:
+        with np.load(index_path) as data:
+            return VideoIndex(data['pts'], data['keyframes'], float(data['time_base']),
+                              int(data['width']), int(data['height']))
+    except (OSError, KeyError, ValueError):
+        pass
+
+    index = _build_index(file_path)
+    try:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        temp_path = '{p}.{pid}.tmp.npz'.format(p=index_path[:-4], pid=os.getpid())
+        np.savez(temp_path, pts=index.pts, keyframes=index.keyframes, time_base=index.time_base,
+                 width=index.width, height=index.height)
+        os.replace(temp_path, index_path)
+    except OSError:
+        pass  # the index is only a cache, e.g. read-only home directory
+    return index
@@ -1,6 +1,7 @@
 from .video_output import VideoOutput
 from .image_output import ImageOutput
 from .flo_output import FloOutput
+from .flo_pack_output import FloPackOutput
 from .plot_show import PlotShow
 
 
@@ -27,16 +28,42 @@ def images(dir_path: str, name_format: str = '{:04}.png', first_id: int = 0):
     return ImageOutput(dir_path, name_format, first_id)
 
 
-def flo(dir_path: str, name_format: str = '{:04}.flo', first_id: int = 0):
+def flo(dir_path: str, name_format: str = None, first_id: int = 0,
+        encoding: str = 'float32', compression: str = None, max_error: float = None):
     """
         Flow file sequence output generator. Using Middlebury format:
         http://vision.middlebury.edu/flow/code/flow-code/README.txt
+        If a lossy encoding or compression is used, files are saved with the compact
+        .floq format instead, which can also be read with fv.input.flo(...)
         :param dir_path: Directory to save the flow files
-        :param name_format: Filename format
+        :param name_format: Filename format (default: {:04}.flo, or {:04}.floq for the compact format)
         :param first_id: First ID to apply to name_format
+        :param encoding: How values are stored: float32 (lossless), float16
+                         or int16 (fixed point with a per-frame scale)
+        :param compression: None, or 'zlib' to compress each file
+        :param max_error: Maximum absolute error (in pixels) allowed when using a lossy
+                          encoding. Files that would exceed it raise an error when saved
         :returns: Flow file saver (see save_file or save_all)
     """
-    return FloOutput(dir_path, name_format, first_id)
+    return FloOutput(dir_path, name_format, first_id, encoding, compression, max_error)
+
+
+def flo_pack(path: str, compression: str = None, level: int = 6,
+             encoding: str = 'float32', max_error: float = None):
+    """
+        Packed flow sequence output generator. Saves all frames in one .flopack
+        file with an index for random access, which can be read with fv.input.flo(...)
+        :param path: Where to save the file (usually with .flopack extension)
+        :param compression: None for raw float32 frames, or 'zlib' to compress each frame
+        :param level: zlib compression level (0-9)
+        :param encoding: How values are stored: float32 (lossless), float16
+                         or int16 (fixed point with a per-frame scale)
+        :param max_error: Maximum absolute error (in pixels) allowed when using a lossy
+                          encoding. Frames that would exceed it raise an error when saved
+        :returns: Packed flow saver (see save_file and save_all). The index is written when it
+                  is closed, with its close() method or using it in a "with" block
+    """
+    return FloPackOutput(path, compression, level, encoding, max_error)
 
 
 def show_plot(title: str = '', framerate: float = 10, ignore_plot_warning: bool = False):
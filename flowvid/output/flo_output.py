@@ -1,17 +1,37 @@
 import numpy as np
 import os
 from ..core.filterable import Filterable
+from ..core.pipeline import Sink
+from ..core.util.async_iter import aconsume
+from ..core.util.progress import print_progress
+from ..core.util.flow_codec import (COMPACT_EXTENSION, COMPRESSION_NONE, ENCODING_FLOAT32,
+                                    compression_id, encode_flow, encoding_id, write_compact_flow)
 
 
 class FloOutput:
     """
         Save as flow files sequence with the Middlebury .flo format:
         http://vision.middlebury.edu/flow/code/flow-code/README.txt
+        or with the compact .floq format if a lossy encoding or compression is used
     """
 
-    def __init__(self, path, name_format, first_id):
+    def __init__(self, path, name_format, first_id, encoding=None, compression=None,
+                 max_error=None, level=6):
         if not os.path.isdir(path):
             raise AssertionError('{p} is not a directory.'.format(p=path))
+        if max_error is not None and max_error <= 0:
+            raise AssertionError(
+                'max_error should be bigger than 0 but it is {e}'.format(e=max_error))
+        self._encoding = encoding_id(encoding)
+        self._compression = compression_id(compression)
+        self._compact = self._encoding != ENCODING_FLOAT32 or self._compression != COMPRESSION_NONE
+        if name_format is None:
+            name_format = '{:04}' + (COMPACT_EXTENSION if self._compact else '.flo')
+        elif self._compact and not name_format.endswith(COMPACT_EXTENSION):
+            raise AssertionError('name_format should end with {e} when using encoding/compression (it is {n})'.format(
+                e=COMPACT_EXTENSION, n=name_format))
+        self._max_error = max_error
+        self._level = level
         self._path = path
         self._id_template = name_format
         self._next_id = first_id
@@ -28,15 +48,22 @@ class FloOutput:
                 'Flow should be a [h, w, 2] flow ndarray with (u, v) components')
 
         [h, w] = flow.shape[0:2]
-        tag = np.array([FloOutput.TAG_FLOAT], dtype=np.float32)
-        size = np.array([w, h], dtype=np.int32)
-        flow = flow.astype(np.float32)
         filename = os.path.join(
             self._path, self._id_template.format(self._next_id))
-        with open(filename, "wb+") as file:
-            file.write(tag.tobytes())
-            file.write(size.tobytes())
-            file.write(flow.tobytes())
+        if self._compact:
+            # encode before opening the file so max_error failures don't leave it empty
+            encoded = encode_flow(flow, self._compression, self._level,
+                                  self._encoding, self._max_error)
+            with open(filename, "wb+") as file:
+                write_compact_flow(file, encoded, h, w)
+        else:
+            tag = np.array([FloOutput.TAG_FLOAT], dtype=np.float32)
+            size = np.array([w, h], dtype=np.int32)
+            flow = flow.astype(np.float32)
+            with open(filename, "wb+") as file:
+                file.write(tag.tobytes())
+                file.write(size.tobytes())
+                file.write(flow.tobytes())
         self._next_id = self._next_id + 1
 
     def save_all(self, flow, verbose=False):
@@ -47,10 +74,36 @@ class FloOutput:
         """
         if not isinstance(flow, Filterable):
             raise AssertionError('flow should contain a list of flow data')
-        flow.assert_type('flow')
+        flow.assert_type('flo')
 
-        n = len(flow)
+        n = flow._length()
         for i, image in enumerate(flow):
             if verbose:
-                print(' File', i + 1, 'of', n, end='\r')  # TODO prettify
+                print_progress('File', i + 1, n)
             self.save_file(image)
+
+    def sink(self, flow):
+        """
+            Save all frames of flow data in files when run, so several outputs
+            can be made in one pass over their data (see fv.run)
+            :param flow: List of flow data
+            :returns: Sink to pass to fv.run(...)
+        """
+        if not isinstance(flow, Filterable):
+            raise AssertionError('flow should contain a list of flow data')
+        flow.assert_type('flo')
+        return Sink(flow, self.save_file)
+
+    async def save_all_async(self, flow, verbose=False, executor=None):
+        """
+            Like save_all, for asyncio code: frames are computed and saved in an
+            executor so the event loop is not blocked, and each frame is saved
+            while the next one is computed
+            :param flow: List of flow data
+            :param verbose: Show progress bar
+            :param executor: concurrent.futures executor, or None for the loop's default one
+        """
+        if not isinstance(flow, Filterable):
+            raise AssertionError('flow should contain a list of flow data')
+        flow.assert_type('flo')
+        await aconsume(flow, self.save_file, executor, verbose, 'File')
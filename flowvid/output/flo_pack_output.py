@@ -0,0 +1,137 @@
+import numpy as np
+import os
+from ..core.filterable import Filterable
+from ..core.pipeline import Sink
+from ..core.util.async_iter import aconsume
+from ..core.util.progress import print_progress
+from ..core.util.flo_pack import PACK_INDEX_DTYPE, write_pack_header
+from ..core.util.flow_codec import compression_id, encode_flow, encoding_id
+from ..core.util.prefetch import prefetch_map
+
+
+class FloPackOutput:
+    """
+        Save flow data as a packed flow sequence: one .flopack file with all
+        the frames and an index for random access (see fv.input.flo(...))
+    """
+
+    def __init__(self, path, compression, level, encoding=None, max_error=None):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            raise AssertionError('{p} is not a directory.'.format(p=directory))
+        if level < 0 or level > 9:
+            raise AssertionError(
+                'level should be in 0-9 range but it is {n}'.format(n=level))
+        if max_error is not None and max_error <= 0:
+            raise AssertionError(
+                'max_error should be bigger than 0 but it is {e}'.format(e=max_error))
+        self._compression = compression_id(compression)
+        self._encoding = encoding_id(encoding)
+        self._max_error = max_error
+        self._level = level
+        self._path = path
+        self._shape = None
+        self._records = []
+        self._file = open(path, 'wb')
+        # header is rewritten on close, when the index is known
+        write_pack_header(self._file, 0, 0, 0, 0)
+
+    def __del__(self):
+        # the index is only written by an explicit close(), not whenever this is collected
+        if getattr(self, '_file', None) is not None:
+            print('Warning: {p} was not closed, so it has no index and can\'t be read. '
+                  'Use close() or "with fv.output.flo_pack(...) as out:"'.format(p=self._path))
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _check(self, flow):
+        if not isinstance(flow, np.ndarray) or flow.ndim != 3 or flow.shape[2] != 2:
+            raise AssertionError(
+                'Flow should be a [h, w, 2] flow ndarray with (u, v) components')
+        if self._shape is None:
+            self._shape = flow.shape
+        elif flow.shape != self._shape:
+            raise AssertionError('All flow frames should have the same shape {s} but one is {o}'.format(
+                s=self._shape, o=flow.shape))
+
+    def _encode(self, flow):
+        self._check(flow)
+        return encode_flow(flow, self._compression, self._level,
+                           self._encoding, self._max_error)
+
+    def _write(self, encoded):
+        [encoding, compression, param, payload] = encoded
+        offset = self._file.tell()
+        self._file.write(payload)
+        self._records.append(
+            (offset, len(payload), encoding, compression, 0, param))
+
+    def save_file(self, flow):
+        """
+            Add one flow frame to the end of the file
+            :param flow: [h, w, 2] flow ndarray
+        """
+        self._write(self._encode(flow))
+
+    def save_all(self, flow, verbose=False, workers=1):
+        """
+            Add all frames of flow data to the file
+            :param flow: List of flow data
+            :param verbose: Show progress bar
+            :param workers: Number of threads used to encode (compress) frames
+        """
+        if not isinstance(flow, Filterable):
+            raise AssertionError('flow should contain a list of flow data')
+        flow.assert_type('flo')
+
+        n = flow._length()
+        encoded_frames = prefetch_map(self._encode, flow, 2 * workers, workers)
+        for i, encoded in enumerate(encoded_frames):
+            if verbose:
+                print_progress('Frame', i + 1, n)
+            self._write(encoded)
+
+    def sink(self, flow):
+        """
+            Save all frames of flow data to the file when run, so several outputs
+            can be made in one pass over their data (see fv.run)
+            :param flow: List of flow data
+            :returns: Sink to pass to fv.run(...)
+        """
+        if not isinstance(flow, Filterable):
+            raise AssertionError('flow should contain a list of flow data')
+        flow.assert_type('flo')
+        return Sink(flow, self.save_file)
+
+    async def save_all_async(self, flow, verbose=False, executor=None):
+        """
+            Like save_all, for asyncio code: frames are computed and saved in an
+            executor so the event loop is not blocked, and each frame is saved
+            while the next one is computed
+            :param flow: List of flow data
+            :param verbose: Show progress bar
+            :param executor: concurrent.futures executor, or None for the loop's default one
+        """
+        if not isinstance(flow, Filterable):
+            raise AssertionError('flow should contain a list of flow data')
+        flow.assert_type('flo')
+        await aconsume(flow, self.save_file, executor, verbose, 'Frame')
+
+    def close(self):
+        """ Write the frame index and close the file (no more frames can be added) """
+        if getattr(self, '_file', None) is None:
+            return
+        index = np.array(self._records, dtype=PACK_INDEX_DTYPE)
+        index_offset = self._file.tell()
+        self._file.write(index.tobytes())
+        [h, w] = (0, 0) if self._shape is None else self._shape[0:2]
+        self._file.seek(0)
+        write_pack_header(self._file, len(index), w, h, index_offset)
+        self._file.close()
+        self._file = None
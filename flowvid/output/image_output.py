@@ -2,6 +2,9 @@ import numpy as np
 import os
 from PIL import Image
 from ..core.filterable import Filterable
+from ..core.pipeline import Sink
+from ..core.util.async_iter import aconsume
+from ..core.util.progress import print_progress
 
 
 class ImageOutput:
@@ -38,8 +41,34 @@ class ImageOutput:
             raise AssertionError('images should contain a list of rgb data')
         images.assert_type('rgb')
 
-        n = len(images)
+        n = images._length()
         for i, image in enumerate(images):
             if verbose:
-                print(' Frame', i + 1, 'of', n, end='\r')  # TODO prettify
+                print_progress('Frame', i + 1, n)
             self.save_image(image)
+
+    def sink(self, images):
+        """
+            Save all frames of images when run, so several outputs
+            can be made in one pass over their data (see fv.run)
+            :param images: List of rgb data
+            :returns: Sink to pass to fv.run(...)
+        """
+        if not isinstance(images, Filterable):
+            raise AssertionError('images should contain a list of rgb data')
+        images.assert_type('rgb')
+        return Sink(images, self.save_image)
+
+    async def save_all_async(self, images, verbose=False, executor=None):
+        """
+            Like save_all, for asyncio code: frames are computed and saved in an
+            executor so the event loop is not blocked, and each frame is saved
+            while the next one is computed
+            :param images: List of rgb data
+            :param verbose: Show progress bar
+            :param executor: concurrent.futures executor, or None for the loop's default one
+        """
+        if not isinstance(images, Filterable):
+            raise AssertionError('images should contain a list of rgb data')
+        images.assert_type('rgb')
+        await aconsume(images, self.save_image, executor, verbose, 'Frame')
@@ -142,11 +142,19 @@ class PlotShow:
         self._next = 0  # next -> # of frames to skip
 
         # Show all figures in the plot
-        n = len(images)
-        for i, image in enumerate(images):
-            if self._closed:
-                break
-            self._show(image, i + 1, n, show_count)
+        n = images._length()
+        if images._random_access():
+            i = 0
+            while i < n and not self._closed:
+                self._show(images[i], i + 1, n, show_count)
+                # skipped frames (e.g. Next 100) are not computed, but the last one is shown
+                i = n if i == n - 1 else min(n - 1, i + 1 + self._next)
+                self._next = 0
+        else:
+            for i, image in enumerate(images):
+                if self._closed:
+                    break
+                self._show(image, i + 1, n, show_count)
 
         # Wait for figure closed
         while not self._closed:
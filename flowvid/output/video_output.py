@@ -1,8 +1,11 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import imageio
-import io
 from ..core.filterable import Filterable
+from ..core.pipeline import Sink, run
+from ..core.util.async_iter import aconsume
+from ..core.util.progress import print_progress
+from ..core.util.axes_to_rgb import axes_to_rgb
 
 
 class VideoOutput:
@@ -27,30 +30,58 @@ class VideoOutput:
         """
         if isinstance(image, plt.Axes):
             # generate image data from Axes to pass to video
-            buffer = io.BytesIO()  # save to temporal buffer
-            self._fig.add_axes(image)
-            self._fig.savefig(buffer, format='png')
-            buffer.seek(0)  # back to the start of the buffer
-            self._video.append_data(imageio.imread(buffer))
-            self._fig.delaxes(image)
+            self._video.append_data(axes_to_rgb(image, self._fig))
         elif isinstance(image, np.ndarray) and image.ndim == 3 and image.shape[2] == 3:
             self._video.append_data(image)
         else:
             raise AssertionError(
                 'Image should be a [h, w, 3] rgb ndarray OR matplotlib axes (figure)')
 
-    def add_all(self, images, verbose=False):
+    def add_all(self, images, verbose=False, pipelined=False):
         """
             Add all frames of images to the video
             :param images: List of rgb OR figure data
             :param verbose: Show progress bar
+            :param pipelined: Read, compute and encode frames at the same time
+                              in different threads (see fv.run)
         """
         if not isinstance(images, Filterable):
             raise AssertionError('images should contain a list of rgb data')
         images.assert_type('rgb', 'figure')
+        if pipelined:
+            run(self.sink(images), verbose, pipelined=True)
+            return
 
-        n = len(images)
+        n = images._length()
         for i, image in enumerate(images):
             if verbose:
-                print(' Frame', i + 1, 'of', n, end='\r')  # TODO prettify
+                print_progress('Frame', i + 1, n)
             self.add_frame(image)
+
+    def sink(self, images):
+        """
+            Add all frames of images to the video when run, so several outputs
+            can be made in one pass over their data (see fv.run)
+            :param images: List of rgb OR figure data
+            :returns: Sink to pass to fv.run(...)
+        """
+        if not isinstance(images, Filterable):
+            raise AssertionError('images should contain a list of rgb data')
+        images.assert_type('rgb', 'figure')
+        return Sink(images, self.add_frame)
+
+    async def add_all_async(self, images, verbose=False, executor=None):
+        """
+            Like add_all, for asyncio code: frames are computed and saved in an
+            executor so the event loop is not blocked, and each rgb frame is saved
+            while the next one is computed
+            :param images: List of rgb OR figure data
+            :param verbose: Show progress bar
+            :param executor: concurrent.futures executor, or None for the loop's default one
+        """
+        if not isinstance(images, Filterable):
+            raise AssertionError('images should contain a list of rgb data')
+        images.assert_type('rgb', 'figure')
+        # figures are drawn with pyplot, so they can't be drawn while the next one is made
+        await aconsume(images, self.add_frame, executor, verbose, 'Frame',
+                       overlap=images.get_type() != 'figure')
@@ -1,4 +1,5 @@
-from .utils import get_arg, ask_string, ask_multichoice, ask_video_or_figure
+from .utils import get_arg, get_proxy_scale, ask_string, ask_multichoice, ask_video_or_figure, \
+    get_shard, shard_frames, shard_filename, normalize_video_shared
 import numpy as np
 import flowvid as fv
 
@@ -29,16 +30,16 @@ def preset_color_epe(kwargs):
         kwargs, 'output_color_epe.mp4')
 
     # Generate EPE data
-    flo_est = fv.input.flo(flo_est_dir)
-    flo_gt = fv.input.flo(flo_gt_dir)
+    scale = get_proxy_scale(kwargs)
+    flo_est = fv.input.flo(flo_est_dir, scale=scale)
+    flo_gt = fv.input.flo(flo_gt_dir, scale=scale)
     epe_data = fv.endpoint_error(flo_est, flo_gt)
 
     # Normalize EPE data and convert to image
     if norm_type == 'frame':
         epe_data = fv.normalize_frame(epe_data)
     elif norm_type == 'video':
-        epe_data = fv.normalize_video(
-            epe_data, clamp_pct=clamp_pct, gamma=gamma, verbose=True)
+        epe_data = normalize_video_shared(epe_data, clamp_pct, gamma, kwargs)
     image_data = fv.epe_to_rgb(epe_data, color=(255, 255, 255))
 
     # Generate output
@@ -49,5 +50,7 @@ def preset_color_epe(kwargs):
         out.show_all(image_data, show_count=True)
     else:
         (framerate, out_name) = out_options
-        out = fv.output.video(out_name, framerate=framerate)
-        out.add_all(image_data, verbose=True)
+        # with --shard, only its part of the video (see python3 -m flowvid merge)
+        shard = get_shard(kwargs)
+        out = fv.output.video(shard_filename(out_name, shard), framerate=framerate)
+        out.add_all(shard_frames(image_data, shard), verbose=True)
@@ -1,4 +1,5 @@
-from .utils import get_arg, ask_string, ask_multichoice, ask_video_or_figure
+from .utils import get_arg, get_proxy_scale, ask_string, ask_multichoice, ask_video_or_figure, \
+    get_shard, shard_frames, shard_filename, normalize_video_shared
 import flowvid as fv
 
 
@@ -22,12 +23,12 @@ def preset_color_flow(kwargs):
         kwargs, 'output_color_flow.mp4')
 
     # Read flow data and normalize
-    flo_data = fv.input.flo(flo_dir)
+    scale = get_proxy_scale(kwargs)
+    flo_data = fv.input.flo(flo_dir, scale=scale)
     if norm_type == 'frame':
         flo_data = fv.normalize_frame(flo_data)
     elif norm_type == 'video':
-        flo_data = fv.normalize_video(
-            flo_data, clamp_pct=clamp_pct, gamma=gamma, verbose=True)
+        flo_data = normalize_video_shared(flo_data, clamp_pct, gamma, kwargs)
     rgb_data = fv.flow_to_rgb(flo_data)
 
     # Generate output
@@ -38,5 +39,7 @@ def preset_color_flow(kwargs):
         out.show_all(rgb_data, show_count=True)
     else:
         (framerate, out_name) = out_options
-        out = fv.output.video(out_name, framerate=framerate)
-        out.add_all(rgb_data, verbose=True)
+        # with --shard, only its part of the video (see python3 -m flowvid merge)
+        shard = get_shard(kwargs)
+        out = fv.output.video(shard_filename(out_name, shard), framerate=framerate)
+        out.add_all(shard_frames(rgb_data, shard), verbose=True)
@@ -1,4 +1,5 @@
-from .utils import get_arg, ask_string, ask_multichoice, ask_video_or_figure
+from .utils import get_arg, get_proxy_scale, ask_string, ask_multichoice, ask_video_or_figure, \
+    get_shard, shard_frames, shard_filename
 import numpy as np
 import flowvid as fv
 
@@ -28,7 +29,8 @@ def preset_flow_arrows(kwargs):
         kwargs, 'output_flow_arrows.mp4')
 
     # Add points and generate image
-    flo_data = fv.input.flo(flo_dir)
+    scale = get_proxy_scale(kwargs)
+    flo_data = fv.input.flo(flo_dir, scale=scale)
     if use_flow:
         flo_data_norm = fv.normalize_frame(flo_data)
         rgb_data = fv.flow_to_rgb(flo_data_norm)
@@ -36,7 +38,7 @@ def preset_flow_arrows(kwargs):
         flat_colors = True
         arrow_color = (0, 0, 0)
     else:
-        rgb_data = fv.input.rgb(rgb_dir)
+        rgb_data = fv.input.rgb(rgb_dir, scale=scale)
         background_attenuation = 0.4
         flat_colors = False
         arrow_color = 'flow'
@@ -54,5 +56,8 @@ def preset_flow_arrows(kwargs):
         out.show_all(arrow_data, show_count=True)
     else:
         (framerate, out_name) = out_options
-        out = fv.output.video(out_name, framerate=framerate)
-        out.add_all(arrow_data, verbose=True)
+        # with --shard, only its part of the video (see python3 -m flowvid merge)
+        shard = get_shard(kwargs)
+        out = fv.output.video(shard_filename(out_name, shard), framerate=framerate)
+        # flow is used twice with flow colors, run reads it once
+        fv.run(out.sink(shard_frames(arrow_data, shard)), verbose=True)
@@ -1,4 +1,4 @@
-from .utils import get_arg, ask_string, ask_multichoice
+from .utils import get_arg, get_proxy_scale, ask_string, ask_multichoice
 import numpy as np
 import flowvid as fv
 import matplotlib.pyplot as plt
@@ -20,13 +20,18 @@ def preset_plot_epe(kwargs):
                                               answer_map={'y': True, 'n': None}, default='y'))
 
     # Flow data and EPE
-    flo_est = fv.input.flo(flo_est_dir)
-    flo_gt = fv.input.flo(flo_gt_dir)
-    epe = fv.endpoint_error(flo_est, flo_gt)
-    [h, w] = flo_est[0].shape[0:2]
-
-    # Flatten all data from all frames
-    epe_flat = np.array([epe_frame for epe_frame in epe]).flatten()
+    scale = get_proxy_scale(kwargs)
+    flo_est = fv.input.flo(flo_est_dir, scale=scale)
+    flo_gt = fv.input.flo(flo_gt_dir, scale=scale)
+    valid = flo_gt.valid_masks()  # one reader, shared with the endpoint error
+    epe = fv.endpoint_error(flo_est, flo_gt, valid)
+    [h, w] = flo_est.shape[0:2]
+
+    # Flatten all data from all frames (only valid pixels if the ground truth has masks)
+    if valid is None:
+        epe_flat = np.array([epe_frame for epe_frame in epe]).flatten()
+    else:
+        epe_flat = np.concatenate([epe_frame[mask] for (epe_frame, mask) in zip(epe, valid)])
 
     # Generate plot
     weights = np.ones(len(epe_flat))
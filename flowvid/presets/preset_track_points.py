@@ -1,4 +1,5 @@
-from .utils import get_arg, ask_string, ask_multichoice, ask_for_points, ask_video_or_figure
+from .utils import get_arg, get_proxy_scale, ask_string, ask_multichoice, ask_for_points, ask_video_or_figure, \
+    rgb_first_cached
 import flowvid as fv
 
 
@@ -17,9 +18,11 @@ def preset_track_points(kwargs):
         kwargs, 'output_track_points.mp4')
 
     # Add points and generate image
-    flo_data = fv.input.flo(flo_dir)
-    rgb_data = fv.input.rgb(rgb_dir)
-    points = ask_for_points(kwargs, rgb_data[0])
+    scale = get_proxy_scale(kwargs)
+    flo_data = fv.input.flo(flo_dir, scale=scale)
+    # first image is used for the points, cache it so it isn't read twice
+    rgb_data = rgb_first_cached(rgb_dir, scale)
+    points = ask_for_points(kwargs, rgb_data[0], scale)
     points = fv.add_flow_points(
         points[0], flo_data, interpolate=True, accumulate=accumulate)
     image_data = fv.draw_points(
@@ -19,6 +19,101 @@ def get_arg(kwargs, arg_name, fallback_prompt=None):
             'No default argument given for {n}'.format(n=arg_name))
 
 
+def get_proxy_scale(kwargs):
+    """ :returns: Proxy scale for the inputs (--proxy), 1.0 for full resolution """
+    scale = kwargs.get('proxy')
+    return 1.0 if scale is None else scale
+
+
+def get_shard(kwargs):
+    """ :returns: (index, count) of the part of the video to render (--shard i/N), or None for all of it """
+    shard = kwargs.get('shard')
+    if shard is None:
+        return None
+    try:
+        [index, count] = [int(n) for n in str(shard).split('/')]
+    except ValueError:
+        raise AssertionError('shard should be i/N (e.g. 0/4) but it is {s}'.format(s=shard))
+    if count < 1 or index < 0 or index >= count:
+        raise AssertionError('shard should be i/N with i in 0..N-1 but it is {s}'.format(s=shard))
+    return (index, count)
+
+
+def shard_frames(data, shard):
+    """
+        :param data: List of data to render
+        :param shard: (index, count), see get_shard, or None
+        :returns: Contiguous range of data's frames for that shard (all of them if shard is None)
+    """
+    if shard is None:
+        return data
+    (index, count) = shard
+    n = len(data)
+    if n < count:
+        raise AssertionError('There are {n} frames, which can\'t be split in {c} shards'.format(n=n, c=count))
+    return data[index * n // count:(index + 1) * n // count]
+
+
+def shard_filename(filename, shard):
+    """
+        :returns: Filename of a shard's segment, e.g. out.mp4 -> out.shard-2-of-8.mp4
+                  (see python3 -m flowvid merge), or filename if shard is None
+    """
+    if shard is None:
+        return filename
+    (index, count) = shard
+    (root, ext) = os.path.splitext(filename)
+    return '{r}.shard-{i:0{w}d}-of-{n}{e}'.format(r=root, i=index, w=len(str(count)), n=count, e=ext)
+
+
+def normalize_video_shared(data, clamp_pct, gamma, kwargs):
+    """
+        fv.normalize_video(...), where the video's maximum can be read from a file
+        (--norm-stats), or saved to it if it doesn't exist, so it is computed once
+        and all shards of a video use the same one (same colors)
+    """
+    stats_path = kwargs.get('norm_stats')
+    if stats_path is None:
+        if get_shard(kwargs) is not None:
+            print('Warning: each shard reads the whole video to normalize it. '
+                  'Use --norm-stats <file> so it is only done once')
+        return fv.normalize_video(data, clamp_pct=clamp_pct, gamma=gamma, verbose=True)
+
+    # stats depend on the data and the proxy resolution
+    expected = {'type': data.get_type(), 'frames': len(data), 'scale': data.scale}
+    if os.path.isfile(stats_path):
+        with open(stats_path, 'r') as stats_file:
+            stats = yaml.safe_load(stats_file)
+        for (key, value) in expected.items():
+            if stats.get(key) != value:
+                raise AssertionError('Normalization stats in {f} are for {k}={s}, not {v}'.format(
+                    f=stats_path, k=key, s=stats.get(key), v=value))
+        print('Using the video\'s maximum from {f}'.format(f=stats_path))
+    else:
+        stats = dict(expected, max=fv.video_max(data, verbose=True))
+        # write and rename, so other shards never read half a file
+        temp_path = '{f}.{p}.tmp'.format(f=stats_path, p=os.getpid())
+        with open(temp_path, 'w') as stats_file:
+            stats_file.write(yaml.dump(stats))
+        os.replace(temp_path, stats_path)
+        print('Saved the video\'s maximum in {f}'.format(f=stats_path))
+    return fv.normalize_video(data, clamp_pct=clamp_pct, gamma=gamma, max_value=stats['max'])
+
+
+def rgb_first_cached(rgb_dir, scale):
+    """
+        Read images whose first frame is also used before rendering (e.g. to
+        place points), with a cache that holds just that frame so it isn't read twice
+        :param rgb_dir: Image directory or video file
+        :param scale: Proxy scale (see get_proxy_scale)
+        :returns: RGB input
+    """
+    # shape and dtype come from the file headers, so nothing is decoded yet
+    rgb_data = fv.input.rgb(rgb_dir, scale=scale)
+    frame_bytes = int(np.prod(rgb_data.shape)) * rgb_data.dtype.itemsize
+    return fv.input.rgb(rgb_dir, cache=fv.input.frame_cache(frame_bytes), scale=scale)
+
+
 def ask_string(format_prompt, default, is_path=False):
     answer = input(format_prompt.format(s='default: ' + default))
     answer = answer or default
@@ -41,7 +136,7 @@ def ask_multichoice(format_prompt, answer_map, default):
         return answer_map[default]
 
 
-def ask_for_points(kwargs, image):
+def ask_for_points(kwargs, image, scale=1.0):
     # Ask for options
     point_type = get_arg(kwargs, 'points_generation',
                          lambda: ask_multichoice('Point generation method ({s}): ',
@@ -49,14 +144,14 @@ def ask_for_points(kwargs, image):
     n_points = get_arg(kwargs, 'points_number',
                        lambda: int(ask_string('Number of points ({s}): ', default='5')))
 
-    # Generate points
+    # Generate points (image can be at proxy scale, points are in full resolution)
     if point_type == 'random':
         [h, w] = image.shape[0:2]
         points = np.reshape([[random.randrange(0, w - 1), random.randrange(0, h - 1)]
                              for i in range(n_points)], (n_points, 2))
-        points = fv.input.points(points)
+        points = fv.input.points(points / scale)
     elif point_type == 'interactive':
-        points = fv.input.prompt_points(n_points, image)
+        points = fv.input.points(fv.input.prompt_points(n_points, image)[0] / scale)
 
     return points
 
@@ -73,6 +168,8 @@ def ask_video_or_figure(kwargs, video_name):
                            lambda: ask_string('Output video name ({s}): ', default=video_name))
         return False, (framerate, out_name)
     elif out_type == 'pyplot':
+        if get_shard(kwargs) is not None:
+            raise AssertionError('--shard renders part of a video, it needs video output type')
         # Output plot option
         framerate = get_arg(kwargs, 'output_framerate',
                             lambda: int(ask_string('Video framerate ({s}): ', default='10')))
@@ -109,6 +206,9 @@ def save_config(kwargs, preset_name):
 
     kwargs.pop('config')
     kwargs.pop('preset')
+    kwargs.pop('proxy', None)  # previews use the same configuration as the final render
+    kwargs.pop('shard', None)  # as well as each shard
+    kwargs.pop('norm_stats', None)
 
     with open(config_filename, 'w+') as f:
         f.write('# flowvid v{v} configuration file: https://pypi.org/project/flowvid/\n'.format(
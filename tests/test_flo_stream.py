@@ -0,0 +1,27 @@
+import io
+import numpy as np
+import pytest
+import flowvid as fv
+
+TAG_FLOAT = 202021.25
+
+
+def _records(n, w=5, h=4):
+    """ :returns: n concatenated .flo files, frame i filled with i """
+    header = np.array([TAG_FLOAT], np.float32).tobytes() + np.array([w, h], np.int32).tobytes()
+    return b''.join(header + np.full((h, w, 2), i, np.float32).tobytes() for i in range(n))
+
+
+def test_list_of_unbounded_stream():
+    # len() of a stream without frames is unknown, list() can't use it to preallocate
+    frames = list(fv.input.flo_stream(io.BytesIO(_records(3))))
+    assert [frame[0, 0, 0] for frame in frames] == [0, 1, 2]
+    rgb = list(fv.flow_to_rgb(fv.normalize_frame(fv.input.flo_stream(io.BytesIO(_records(3))))))
+    assert len(rgb) == 3
+
+
+def test_len_of_stream():
+    with pytest.raises(TypeError):
+        len(fv.input.flo_stream(io.BytesIO(_records(3))))
+    assert len(fv.input.flo_stream(io.BytesIO(_records(3)), frames=2)) == 2
+    assert len(list(fv.input.flo_stream(io.BytesIO(_records(3)))[0:2])) == 2